@@ -0,0 +1,596 @@
+import argparse
+import functools
+import itertools
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import logging
+import main as pipeline
+from utils import databaseManager
+from utils import dataGenerator
+from utils import dataImporter
+from utils import fileManager
+from utils import compressionCodecs
+from utils import metrics
+from utils import shardedDatabaseManager
+
+try:
+    from utils import report
+except ImportError:  # reportlab is not installed, the report stages are skipped
+    report = None
+
+# Command line entry point, started in a new interpreter by benchmark_cold_start
+CLI_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cli.py')
+
+# Modules that the export-only and stats-only runs of the command line should not import
+HEAVY_MODULES = ['reportlab', 'utils.report', 'utils.dataImporter', 'utils.fileManager']
+
+
+def populate_database(db_path, row_count, generator):
+    """
+    Create the 'data' table and fill it with synthetic records.
+    :param db_path: Path of the SQLite database to create
+    :param row_count: Number of records to insert
+    :param generator: DataGenerator producing the records
+    :return: DatabaseManager connected to the populated database
+    """
+    db_manager = databaseManager.DatabaseManager(db_path)
+    db_manager.create_table()
+    db_manager.bulk_insert(generator.iter_records(row_count), pragmas=databaseManager.BULK_LOAD_PRAGMAS)
+    return db_manager
+
+
+def measure(func, *args, **kwargs):
+    """
+    Run a function twice: once to time it, and once under tracemalloc to get its peak memory.
+    :param func: The function to measure
+    :return: Tuple of (result, elapsed seconds, peak traced memory in bytes)
+    """
+    start_time = time.perf_counter()
+    result = func(*args, **kwargs)
+    elapsed = time.perf_counter() - start_time
+
+    tracemalloc.start()
+    func(*args, **kwargs)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def report_result(stage, row_count, elapsed, peak):
+    """
+    Print one benchmark result line.
+    :return: None
+    """
+    rows_per_second = row_count / elapsed if elapsed > 0 else 0
+    print(f"{stage:<24} rows={row_count:<10} time={elapsed:8.3f}s "
+          f"rows/s={rows_per_second:12.0f} peak_memory={peak / (1024 * 1024):8.2f}MiB")
+
+
+def benchmark_bulk_insert(work_dir, row_count, generator):
+    """
+    Benchmark the bulk load, with the default settings and with BULK_LOAD_PRAGMAS.
+    :return: None
+    """
+    for stage, pragmas in (('bulk_insert', None), ('bulk_insert_pragmas', databaseManager.BULK_LOAD_PRAGMAS)):
+        def load():
+            db_path = os.path.join(work_dir, f'{stage}.db')
+            if os.path.exists(db_path):
+                os.remove(db_path)
+            db_manager = databaseManager.DatabaseManager(db_path)
+            db_manager.create_table()
+            inserted = db_manager.bulk_insert(generator.iter_records(row_count), pragmas=pragmas)
+            db_manager.close_connection()
+            return inserted
+        inserted, elapsed, peak = measure(load)
+        report_result(stage, inserted, elapsed, peak)
+
+
+def generate_duplicate_records(generator, row_count, duplicate_ratio):
+    """
+    Generate synthetic records where only a share of the emails is unique: the first
+    row_count * (1 - duplicate_ratio) records of the generator, repeated until row_count records,
+    every repetition alternately unchanged and with the next title.
+    :return: Generator of (name, email, zip_code, title) tuples
+    """
+    distinct_count = max(1, round(row_count * (1 - duplicate_ratio)))
+    title_indexes = {title: index for index, title in enumerate(generator.titles)}
+    for repetition in range(-(-row_count // distinct_count)):
+        records = generator.iter_records(min(distinct_count, row_count - repetition * distinct_count))
+        for name, email, zip_code, title in records:
+            title_index = (title_indexes[title] + repetition // 2) % len(generator.titles)
+            yield name, email, zip_code, generator.titles[title_index]
+
+
+def benchmark_upsert(work_dir, row_count, generator, duplicate_ratio=0.8):
+    """
+    Benchmark the de-duplicated load of records with a high duplicate ratio: bulk_upsert on the email
+    in its update and ignore modes, loading the same records again, and a plain bulk_insert followed
+    by deduplicate. Only timed, tracing the memory of such loads takes too long.
+    :return: None
+    """
+    def records():
+        return generate_duplicate_records(generator, row_count, duplicate_ratio)
+
+    def new_database(name):
+        db_path = os.path.join(work_dir, f'{name}.db')
+        if os.path.exists(db_path):
+            os.remove(db_path)
+        db_manager = databaseManager.DatabaseManager(db_path)
+        db_manager.create_table()
+        return db_manager
+
+    pragmas = databaseManager.BULK_LOAD_PRAGMAS
+    update_db = new_database('upsert_update')
+    ignore_db = new_database('upsert_ignore')
+    dedup_db = new_database('insert_deduplicate')
+    stages = [
+        ('upsert_update', lambda: update_db.bulk_upsert(records(), on_conflict='update', pragmas=pragmas)),
+        ('upsert_ignore', lambda: ignore_db.bulk_upsert(records(), on_conflict='ignore', pragmas=pragmas)),
+        ('upsert_update_again', lambda: update_db.bulk_upsert(records(), on_conflict='update', pragmas=pragmas)),
+        ('insert_deduplicate', lambda: {'inserted': dedup_db.bulk_insert(records(), pragmas=pragmas),
+                                        'deleted': dedup_db.deduplicate()}),
+    ]
+    for stage, load in stages:
+        start_time = time.perf_counter()
+        counts = load()
+        report_result(stage, row_count, time.perf_counter() - start_time, 0)
+        print(f"{'':<24} {', '.join(f'{name}={count}' for name, count in counts.items())}")
+    for db_manager in (update_db, ignore_db, dedup_db):
+        db_manager.close_connection()
+
+
+def benchmark_csv_export(db_manager, work_dir, row_count):
+    """
+    Benchmark the streaming CSV export.
+    :return: None
+    """
+    output_file = os.path.join(work_dir, 'data.csv')
+    exported, elapsed, peak = measure(db_manager.export_to_csv, output_file)
+    report_result('export_to_csv', exported, elapsed, peak)
+
+
+def benchmark_json_export(db_manager, work_dir, row_count):
+    """
+    Benchmark the streaming JSON export in its indented, compact and NDJSON variants.
+    :return: None
+    """
+    variants = [
+        ('export_to_json', {}),
+        ('export_to_json_compact', {'indent': None}),
+        ('export_to_ndjson', {'json_format': 'ndjson'}),
+    ]
+    for stage, options in variants:
+        output_file = os.path.join(work_dir, f'{stage}.json')
+        exported, elapsed, peak = measure(db_manager.export_to_json, output_file, **options)
+        report_result(stage, exported, elapsed, peak)
+
+
+def benchmark_single_scan_export(db_manager, work_dir, row_count):
+    """
+    Benchmark the single scan export writing CSV and JSON at once, with and without the writer thread.
+    :return: None
+    """
+    for stage, use_writer_thread in (('export_csv_json', False), ('export_csv_json_thread', True)):
+        def export():
+            sinks = [
+                databaseManager.CsvSink(os.path.join(work_dir, f'{stage}.csv')),
+                databaseManager.JsonSink(os.path.join(work_dir, f'{stage}.json')),
+            ]
+            return db_manager.export(sinks, use_writer_thread=use_writer_thread)
+        exported, elapsed, peak = measure(export)
+        report_result(stage, exported, elapsed, peak)
+
+
+def benchmark_columnar(db_manager, work_dir, row_count):
+    """
+    Benchmark the columnar export, and compare the size and the time to count the titles of the
+    CSV, JSON and columnar files.
+    :return: None
+    """
+    outputs = {
+        'csv': os.path.join(work_dir, 'scan.csv'),
+        'json': os.path.join(work_dir, 'scan.json'),
+        'columnar': os.path.join(work_dir, 'scan.col'),
+    }
+    db_manager.export([databaseManager.CsvSink(outputs['csv']), databaseManager.JsonSink(outputs['json'])])
+    exported, elapsed, peak = measure(db_manager.export_to_columnar, outputs['columnar'])
+    report_result('export_to_columnar', exported, elapsed, peak)
+
+    file_manager = fileManager.FileManager()
+
+    def count_titles(records):
+        counts = {}
+        for record in records:
+            counts[record['title']] = counts.get(record['title'], 0) + 1
+        return counts
+
+    def count_columnar_titles():
+        columnar = file_manager.read_columnar(outputs['columnar'])
+        try:
+            return columnar.column('title').value_counts()
+        finally:
+            columnar.close()
+
+    scans = [
+        ('scan_csv', 'csv', lambda: count_titles(file_manager.iter_csv(outputs['csv']))),
+        ('scan_json', 'json', lambda: count_titles(file_manager.iter_json(outputs['json']))),
+        ('scan_columnar_records', 'columnar', lambda: count_titles(file_manager.iter_columnar(outputs['columnar']))),
+        ('scan_columnar_column', 'columnar', count_columnar_titles),
+    ]
+    for stage, output, scan in scans:
+        _, elapsed, peak = measure(scan)
+        report_result(stage, row_count, elapsed, peak)
+        print(f"{'':<24} size={os.path.getsize(outputs[output]) / (1024 * 1024):10.2f}MiB")
+
+
+def benchmark_compression(db_manager, work_dir, row_count):
+    """
+    Benchmark the compressed CSV and NDJSON exports of every available codec, with and without the
+    compression thread: the export time, the file size and the time to read the file back.
+    :return: None
+    """
+    file_manager = fileManager.FileManager()
+    for codec in [None] + compressionCodecs.available_codecs():
+        for compress_on_thread in ((False,) if codec is None else (False, True)):
+            suffix = f"{codec or 'none'}{'_thread' if compress_on_thread else ''}"
+            for export_name, output_file, export, read in (
+                    ('csv', os.path.join(work_dir, f'compressed_{suffix}.csv'), db_manager.export_to_csv,
+                     file_manager.iter_csv),
+                    ('ndjson', os.path.join(work_dir, f'compressed_{suffix}.ndjson'),
+                     functools.partial(db_manager.export_to_json, json_format='ndjson'), file_manager.iter_json)):
+                stage = f'{export_name}_{suffix}'
+                exported, elapsed, peak = measure(export, output_file, compression=codec,
+                                                  compress_on_thread=compress_on_thread)
+                report_result(stage, exported, elapsed, peak)
+                start_time = time.perf_counter()
+                read_count = sum(1 for _ in read(output_file))
+                print(f"{'':<24} size={os.path.getsize(output_file) / (1024 * 1024):10.2f}MiB "
+                      f"read_time={time.perf_counter() - start_time:8.3f}s read_rows={read_count}")
+
+
+def benchmark_record_memory(db_manager, work_dir, row_count):
+    """
+    Compare the memory held by the records read from the exported files: lists of dictionaries,
+    the compact RecordTable, and the lazy iterators which hold a single record at a time.
+    :return: None
+    """
+    csv_file = os.path.join(work_dir, 'records.csv')
+    json_file = os.path.join(work_dir, 'records.json')
+    db_manager.export([databaseManager.CsvSink(csv_file), databaseManager.JsonSink(json_file)])
+    file_manager = fileManager.FileManager()
+
+    approaches = [
+        ('read_csv_dicts', lambda: file_manager.read_csv(csv_file)),
+        ('read_json_dicts', lambda: file_manager.read_json(json_file)),
+        ('read_csv_compact', lambda: file_manager.read_csv_compact(csv_file)),
+        ('read_json_compact', lambda: file_manager.read_json_compact(json_file)),
+        ('iter_csv_lazy', lambda: sum(1 for _ in file_manager.iter_csv(csv_file))),
+        ('iter_json_lazy', lambda: sum(1 for _ in file_manager.iter_json(json_file))),
+    ]
+    for stage, read in approaches:
+        tracemalloc.start()
+        start_time = time.perf_counter()
+        records = read()
+        elapsed = time.perf_counter() - start_time
+        retained, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del records
+        print(f"{stage:<24} rows={row_count:<10} time={elapsed:8.3f}s "
+              f"retained_memory={retained / (1024 * 1024):8.2f}MiB peak_memory={peak / (1024 * 1024):8.2f}MiB")
+
+
+def benchmark_parallel_export(db_manager, work_dir, row_count):
+    """
+    Benchmark the multi-process CSV and JSON export with an increasing number of workers.
+    :return: None
+    """
+    worker_counts = sorted({1, 2, 4, os.cpu_count() or 1})
+    for workers in worker_counts:
+        stage = f'export_parallel_{workers}'
+
+        def export():
+            sinks = [
+                databaseManager.CsvSink(os.path.join(work_dir, f'{stage}.csv')),
+                databaseManager.JsonSink(os.path.join(work_dir, f'{stage}.json')),
+            ]
+            row_count, _ = db_manager.export_parallel(sinks, workers=workers)
+            return row_count
+        exported, elapsed, peak = measure(export)
+        report_result(stage, exported, elapsed, peak)
+
+
+def benchmark_metrics_overhead(db_path, work_dir, row_count):
+    """
+    Benchmark the CSV export and the CSV read with the metrics disabled and enabled, and print the
+    metrics recorded in the Prometheus text format.
+    :return: None
+    """
+    output_file = os.path.join(work_dir, 'metrics.csv')
+    file_manager = fileManager.FileManager()
+
+    def export_and_read():
+        # A new connection, instrumented when the metrics are enabled
+        db_manager = databaseManager.DatabaseManager(db_path)
+        db_manager.export_to_csv(output_file)
+        db_manager.close_connection()
+        return sum(1 for _ in file_manager.iter_csv(output_file))
+
+    for stage, enabled in (('metrics_disabled', False), ('metrics_enabled', True)):
+        metrics.reset()
+        if enabled:
+            metrics.enable()
+        try:
+            start_time = time.perf_counter()
+            rows = export_and_read()
+            report_result(stage, rows, time.perf_counter() - start_time, 0)
+        finally:
+            metrics.disable()
+    print(metrics.to_prometheus(), end='')
+    metrics.reset()
+
+
+def benchmark_result_cache(db_path, work_dir, row_count):
+    """
+    Benchmark the CSV export and the report aggregates of an unchanged database without and with a result
+    cache: the first run computes them, the repeated one reuses the exported file and the aggregates.
+    :return: None
+    """
+    output_file = os.path.join(work_dir, 'result_cache.csv')
+
+    def export_and_aggregate(db_manager):
+        db_manager.export_to_csv(output_file)
+        db_manager.count_records()
+        db_manager.get_companies()
+        db_manager.get_title_counts()
+
+    for stage, cache_size in (('no_result_cache', None), ('result_cache', 64)):
+        db_manager = databaseManager.DatabaseManager(db_path, result_cache_size=cache_size)
+        for run in ('first', 'repeated'):
+            start_time = time.perf_counter()
+            export_and_aggregate(db_manager)
+            report_result(f'{stage}_{run}', row_count, time.perf_counter() - start_time, 0)
+        db_manager.close_connection()
+
+
+def benchmark_sharding(work_dir, row_count, generator, shard_counts=(1, 2, 4)):
+    """
+    Benchmark the load, CSV export and report aggregates of a table hash-partitioned on the email
+    across several database files. Only timed, the loads are too long to trace.
+    :return: None
+    """
+    for shard_count in shard_counts:
+        db_files = shardedDatabaseManager.get_shard_files(os.path.join(work_dir, f'sharded{shard_count}.db'),
+                                                          shard_count)
+        sharded_manager = shardedDatabaseManager.ShardedDatabaseManager(db_files)
+        sharded_manager.create_table()
+        stages = [
+            ('insert', lambda: sharded_manager.bulk_insert(generator.iter_records(row_count),
+                                                           pragmas=databaseManager.BULK_LOAD_PRAGMAS)),
+            ('export_to_csv', lambda: sharded_manager.export_to_csv(os.path.join(work_dir, 'sharded.csv'))),
+            ('aggregates', lambda: (sharded_manager.count_records(), sharded_manager.get_companies(),
+                                    sharded_manager.get_title_counts())),
+        ]
+        for stage, func in stages:
+            start_time = time.perf_counter()
+            func()
+            report_result(f'sharded{shard_count}_{stage}', row_count, time.perf_counter() - start_time, 0)
+        sharded_manager.close_connection()
+
+
+def benchmark_in_memory(work_dir, row_count, generator, chunk_size=10000):
+    """
+    Benchmark a main.main()-style batch run on an existing database of row_count records, on the database
+    file and in memory: open it, upsert 10% new records in chunks, create the indexes, export to CSV and
+    JSON, compute the report statistics and close it. In memory, the database is loaded with the backup
+    API when it is opened and written back when it is closed.
+    :return: None
+    """
+    source_path = os.path.join(work_dir, 'pipeline_source.db')
+    populate_database(source_path, row_count, generator).close_connection()
+    # The records following the ones in the table, their emails are new
+    new_records = list(itertools.islice(generator.iter_records(row_count + max(1, row_count // 10)), row_count, None))
+
+    for stage, in_memory in (('pipeline_on_disk', False), ('pipeline_in_memory', True)):
+        db_path = os.path.join(work_dir, f'{stage}.db')
+        shutil.copyfile(source_path, db_path)
+        timings = {}
+        state = {}
+
+        def open_database():
+            state['db_manager'] = pipeline.create_database(db_path, in_memory=in_memory)
+
+        def insert_records():
+            # A single call, bulk_upsert builds its unique index once per call
+            state['db_manager'].bulk_upsert(new_records, key='email', chunk_size=chunk_size)
+
+        def compute_statistics():
+            db_manager = state['db_manager']
+            db_manager.count_records()
+            db_manager.get_companies()
+            db_manager.get_title_counts()
+
+        steps = [
+            ('open', open_database),
+            ('insert', insert_records),
+            ('indexes', lambda: state['db_manager'].create_indexes()),
+            ('export', lambda: pipeline.export_data(state['db_manager'], os.path.join(work_dir, f'{stage}.csv'),
+                                                    os.path.join(work_dir, f'{stage}.json'))),
+            ('statistics', compute_statistics),
+            ('close', lambda: state['db_manager'].close_connection()),
+        ]
+        for step, func in steps:
+            start_time = time.perf_counter()
+            func()
+            timings[step] = time.perf_counter() - start_time
+        report_result(stage, row_count, sum(timings.values()), 0)
+        print(f"{'':<24} {' '.join(f'{step}={elapsed:.3f}s' for step, elapsed in timings.items())}")
+
+
+def measure_cold_start(arguments):
+    """
+    Run the command line in a new interpreter with -X importtime.
+    :param arguments: Arguments of cli.py
+    :return: Tuple of (total import time in seconds, imported module names, wall time in seconds)
+    """
+    start_time = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime', CLI_PATH] + arguments,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True)
+    elapsed = time.perf_counter() - start_time
+    import_time = 0
+    modules = []
+    for line in result.stderr.splitlines():
+        # import time: <self us> | <cumulative us> | <indented module name>
+        fields = line[len('import time:'):].split('|') if line.startswith('import time:') else []
+        if len(fields) == 3 and fields[0].strip().isdigit():
+            import_time += int(fields[0])
+            modules.append(fields[2].strip())
+    return import_time / 1e6, modules, elapsed
+
+
+def benchmark_cold_start(db_path, work_dir, runs=5):
+    """
+    Benchmark the start of stats-only and export-only runs of the command line: the time spent importing
+    modules (as reported by -X importtime) and the wall time, the median of several runs.
+    :return: None
+    """
+    commands = [
+        ('cold_start_stats', ['stats', '--db', db_path]),
+        ('cold_start_export_csv', ['export', '--db', db_path, '--csv', os.path.join(work_dir, 'cli.csv')]),
+    ]
+    for stage, arguments in commands:
+        measurements = [measure_cold_start(arguments) for _ in range(runs)]
+        import_time = statistics.median(import_time for import_time, _, _ in measurements)
+        elapsed = statistics.median(elapsed for _, _, elapsed in measurements)
+        modules = measurements[0][1]
+        heavy_modules = [module for module in HEAVY_MODULES if module in modules]
+        print(f"{stage:<24} imports={import_time * 1000:7.1f}ms modules={len(modules):<4} "
+              f"time={elapsed:8.3f}s heavy_modules={', '.join(heavy_modules) or 'none'}")
+
+
+def benchmark_import(db_manager, work_dir, row_count):
+    """
+    Benchmark the streaming import of CSV and NDJSON files into an empty database.
+    :return: None
+    """
+    csv_file = os.path.join(work_dir, 'import.csv')
+    ndjson_file = os.path.join(work_dir, 'import.ndjson')
+    db_manager.export([databaseManager.CsvSink(csv_file), databaseManager.JsonSink(ndjson_file, json_format='ndjson')])
+
+    for stage, input_file, method_name in (('import_csv', csv_file, 'import_csv'),
+                                           ('import_ndjson', ndjson_file, 'import_json')):
+        def load():
+            db_path = os.path.join(work_dir, f'{stage}.db')
+            if os.path.exists(db_path):
+                os.remove(db_path)
+            target_db = databaseManager.DatabaseManager(db_path)
+            target_db.create_table()
+            importer = dataImporter.DataImporter(target_db)
+            imported = getattr(importer, method_name)(input_file, pragmas=databaseManager.BULK_LOAD_PRAGMAS)
+            target_db.close_connection()
+            return imported
+        imported, elapsed, peak = measure(load)
+        report_result(stage, imported, elapsed, peak)
+
+
+def benchmark_queries(db_manager, row_count, generator, lookups=200):
+    """
+    Benchmark lookups by email, zip_code, title and company, without and with the secondary indexes.
+    :return: None
+    """
+    filters = [
+        ('email', [record[1] for record in itertools.islice(generator.iter_records(row_count), 0, None,
+                                                               max(1, row_count // lookups))]),
+        ('zip_code', [f'{i % generator.zip_code_count:05d}' for i in range(lookups)]),
+        ('title', generator.titles),
+        ('company', generator.companies),
+    ]
+    # Title and company lookups match many rows, only the first page is fetched
+    limit = 100
+
+    def run_lookups(column, values):
+        for value in values:
+            db_manager.query({column: value}, limit=limit)
+        return len(values)
+
+    db_manager.drop_indexes()
+    for indexed in (False, True):
+        if indexed:
+            start_time = time.perf_counter()
+            db_manager.create_indexes()
+            print(f"{'create_indexes':<24} rows={row_count:<10} time={time.perf_counter() - start_time:8.3f}s")
+        for column, values in filters:
+            start_time = time.perf_counter()
+            count = run_lookups(column, values)
+            elapsed = time.perf_counter() - start_time
+            stage = f"query_{column}_{'indexed' if indexed else 'scan'}"
+            print(f"{stage:<24} rows={row_count:<10} lookups={count:<6} "
+                  f"time/lookup={elapsed / count * 1000:10.3f}ms")
+    db_manager.drop_indexes()
+
+
+def benchmark_report(db_path, work_dir, row_count, pages_per_file=1000):
+    """
+    Benchmark the paginated PDF report with the full records table, and the time spent per page.
+    :return: None
+    """
+    if report is None:
+        print(f"{'report_records_table':<24} skipped: reportlab is not installed")
+        return
+
+    def render():
+        report_generator = report.ReportGenerator(None, None, os.path.join(work_dir, 'report.pdf'), db_file=db_path,
+                                                  include_records=True, pages_per_file=pages_per_file)
+        report_generator.generate_report()
+        return report_generator.page_count
+
+    pages, elapsed, peak = measure(render)
+    report_result('report_records_table', row_count, elapsed, peak)
+    print(f"{'report_pages':<24} pages={pages:<9} time/page={elapsed / pages * 1000:10.3f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the export pipeline on synthetic data.")
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000000, 10000000],
+                        help="Row counts to benchmark (default: 1M and 10M)")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the data generator")
+    args = parser.parse_args()
+    # The same synthetic records as benchmarkRunner.py for the same seed
+    generator = dataGenerator.DataGenerator(args.seed)
+
+    # Only keep warnings so the log lines don't drown the results
+    logging.basicConfig(level=logging.WARNING)
+    for module in (databaseManager, dataImporter, fileManager, report):
+        if module is not None:
+            logging.getLogger(module.__name__).setLevel(logging.WARNING)
+
+    for row_count in args.rows:
+        with tempfile.TemporaryDirectory() as work_dir:
+            benchmark_bulk_insert(work_dir, row_count, generator)
+            benchmark_upsert(work_dir, row_count, generator)
+            db_manager = populate_database(os.path.join(work_dir, 'bench.db'), row_count, generator)
+            benchmark_csv_export(db_manager, work_dir, row_count)
+            benchmark_json_export(db_manager, work_dir, row_count)
+            benchmark_single_scan_export(db_manager, work_dir, row_count)
+            benchmark_parallel_export(db_manager, work_dir, row_count)
+            benchmark_columnar(db_manager, work_dir, row_count)
+            benchmark_compression(db_manager, work_dir, row_count)
+            benchmark_record_memory(db_manager, work_dir, row_count)
+            benchmark_import(db_manager, work_dir, row_count)
+            benchmark_metrics_overhead(os.path.join(work_dir, 'bench.db'), work_dir, row_count)
+            benchmark_result_cache(os.path.join(work_dir, 'bench.db'), work_dir, row_count)
+            benchmark_queries(db_manager, row_count, generator)
+            benchmark_cold_start(os.path.join(work_dir, 'bench.db'), work_dir)
+            benchmark_in_memory(work_dir, row_count, generator)
+            benchmark_sharding(work_dir, row_count, generator)
+            benchmark_report(os.path.join(work_dir, 'bench.db'), work_dir, row_count)
+            db_manager.close_connection()
+
+
+if __name__ == '__main__':
+    main()
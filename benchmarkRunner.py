@@ -0,0 +1,151 @@
+import argparse
+import datetime
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+import main
+from utils import dataGenerator
+from utils import databaseManager
+
+try:
+    import resource
+except ImportError:  # Not available on Windows, the maximum resident set size is not recorded
+    resource = None
+
+try:
+    import reportlab
+except ImportError:  # The report stage is skipped
+    reportlab = None
+
+# Version of the layout of the results file
+RESULTS_VERSION = 1
+
+
+def get_max_rss():
+    """
+    :return: Maximum resident set size of the process so far, in bytes, None if unknown
+    """
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss if sys.platform == 'darwin' else max_rss * 1024  # Kilobytes on Linux
+
+
+def run_stage(stage, row_count, func, trace_memory=False):
+    """
+    Run one stage of main() once, timing it and optionally tracing its peak memory.
+    :param stage: Name of the stage
+    :param row_count: Number of rows of the dataset
+    :param func: Function running the stage
+    :param trace_memory: Trace the Python allocations with tracemalloc, which slows the stage down
+    :return: Dictionary of the stage results
+    """
+    if trace_memory:
+        tracemalloc.start()
+    start_time = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start_time
+    peak = None
+    if trace_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    result = {
+        'stage': stage,
+        'rows': row_count,
+        'seconds': elapsed,
+        'rows_per_second': row_count / elapsed if elapsed > 0 else None,
+        'peak_traced_bytes': peak,
+        'max_rss_bytes': get_max_rss(),
+    }
+    peak_text = f"{peak / (1024 * 1024):8.2f}MiB" if peak is not None else 'n/a'
+    print(f"{stage:<16} rows={row_count:<10} time={elapsed:8.3f}s "
+          f"rows/s={result['rows_per_second'] or 0:12.0f} peak_memory={peak_text}")
+    return result
+
+
+def run_main_stages(generator, row_count, work_dir, chunk_size=100000, trace_memory=False):
+    """
+    Run the stages of main() on a synthetic dataset: generate, create_table, insert_data, export and report.
+    The records are generated while they are upserted with a single call, so insert_data also includes
+    their generation, which is timed on its own by the generate stage.
+    :return: List of the results of each stage
+    """
+    db_path = os.path.join(work_dir, 'bench.db')
+    csv_file_path = os.path.join(work_dir, 'data.csv')
+    json_file_path = os.path.join(work_dir, 'data.json')
+    report_file_path = os.path.join(work_dir, 'report.pdf')
+    state = {}
+
+    def generate():
+        for _ in generator.iter_records(row_count):
+            pass
+
+    def create_table():
+        state['db_manager'] = main.create_database(db_path)
+
+    def insert_data():
+        main.insert_records(state['db_manager'], generator.iter_records(row_count), chunk_size)
+
+    def export():
+        main.export_data(state['db_manager'], csv_file_path, json_file_path)
+        state['db_manager'].close_connection()
+
+    def report():
+        main.generate_report(csv_file_path, json_file_path, report_file_path, db_path)
+
+    stages = [('generate', generate), ('create_table', create_table), ('insert_data', insert_data),
+              ('export', export)]
+    if reportlab is not None:
+        stages.append(('report', report))
+    else:
+        print(f"{'report':<16} skipped: reportlab is not installed")
+    return [run_stage(stage, row_count, func, trace_memory) for stage, func in stages]
+
+
+def main_runner():
+    parser = argparse.ArgumentParser(description="Time each stage of main.main() on reproducible synthetic data.")
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 1000000, 10000000],
+                        help="Row counts to benchmark (default: 10k, 1M and 10M)")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the data generator")
+    parser.add_argument('--titles', type=int, default=len(dataGenerator.BASE_TITLES), help="Number of distinct titles")
+    parser.add_argument('--companies', type=int, default=len(dataGenerator.BASE_COMPANIES),
+                        help="Number of distinct companies")
+    parser.add_argument('--name-length', type=int, nargs=2, default=[4, 12], metavar=('MIN', 'MAX'),
+                        help="Length range of the first and last names")
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="Record the peak Python memory of each stage with tracemalloc (slower)")
+    parser.add_argument('--output', default='benchmark_results.json', help="JSON file the results are written to")
+    args = parser.parse_args()
+
+    # Only keep warnings so the log lines don't drown the results
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger(databaseManager.__name__).setLevel(logging.WARNING)
+    logging.getLogger('utils.report').setLevel(logging.WARNING)
+
+    generator = dataGenerator.DataGenerator(args.seed, args.titles, args.companies, args.name_length)
+    results = []
+    for row_count in args.rows:
+        with tempfile.TemporaryDirectory() as work_dir:
+            results += run_main_stages(generator, row_count, work_dir, trace_memory=args.trace_memory)
+
+    with open(args.output, 'w') as file:
+        json.dump({
+            'version': RESULTS_VERSION,
+            'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'generator': generator.get_settings(),
+            'trace_memory': args.trace_memory,
+            'results': results,
+        }, file, indent=4)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main_runner()
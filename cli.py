@@ -0,0 +1,191 @@
+import argparse
+import json
+import os
+import sys
+from sqlite3 import Error
+import main
+import setupEnvironment
+from utils import compressionCodecs
+from utils import databaseManager
+
+# The modules only some subcommands need (utils.dataImporter and utils.fileManager for ingest,
+# utils.report and reportlab for report) are imported inside them, so that every run starts quickly.
+
+
+def get_input_format(input_file):
+    """
+    Get the format of an input file from its extension, ignoring a compression extension (data.csv.gz).
+    :param input_file: Path of the file
+    :return: 'csv' or 'json'
+    """
+    base, extension = os.path.splitext(input_file)
+    if extension in compressionCodecs.EXTENSIONS.values():
+        extension = os.path.splitext(base)[1]
+    return 'csv' if extension.lower() == '.csv' else 'json'
+
+
+def ingest(args, config):
+    """
+    Insert records into the 'data' table: the sample records, de-duplicated on the email,
+    or the records of CSV, JSON and NDJSON files, de-duplicated on --key if given.
+    :return: Exit status
+    """
+    db_manager = main.create_database(args.db)
+    try:
+        if not args.files:
+            return 0 if main.insert_records(db_manager, config['sample_records']) is not None else 1
+
+        from utils import dataImporter  # Imported here, only the file imports need it
+
+        importer = dataImporter.DataImporter(db_manager)
+        for input_file in args.files:
+            if get_input_format(input_file) == 'csv':
+                result = importer.import_csv(input_file, chunk_size=args.chunk_size, key=args.key,
+                                             on_conflict=args.on_conflict)
+            else:
+                result = importer.import_json(input_file, chunk_size=args.chunk_size, key=args.key,
+                                              on_conflict=args.on_conflict)
+            if result is None:
+                return 1
+        return 0
+    finally:
+        db_manager.close_connection()
+
+
+def export(args, config):
+    """
+    Export the 'data' table to CSV and/or JSON with a single table scan.
+    :return: Exit status
+    """
+    if not os.path.exists(args.db):
+        print(f"Database not found: {args.db}", file=sys.stderr)
+        return 1
+    csv_file, json_file = args.csv, args.json
+    if csv_file is None and json_file is None:
+        csv_file, json_file = config['CSV_file_path'], config['json_file_path']
+
+    sinks = []
+    try:
+        if csv_file is not None:
+            sinks.append(databaseManager.CsvSink(csv_file, compression=args.compression))
+        if json_file is not None:
+            indent = None if args.json_format == 'ndjson' else 4
+            sinks.append(databaseManager.JsonSink(json_file, json_format=args.json_format, indent=indent,
+                                                  compression=args.compression))
+    except ValueError as e:  # Unknown or unavailable compression codec
+        print(e, file=sys.stderr)
+        return 1
+
+    db_manager = databaseManager.DatabaseManager(args.db, read_only=True)
+    try:
+        db_manager.export(sinks, use_writer_thread=True)
+        return 0
+    except (Error, OSError) as e:
+        print(f"Error exporting data: {e}", file=sys.stderr)
+        return 1
+    finally:
+        db_manager.close_connection()
+
+
+def report(args, config):
+    """
+    Generate the PDF report, computing the statistics in the database.
+    :return: Exit status
+    """
+    if not os.path.exists(args.db):
+        print(f"Database not found: {args.db}", file=sys.stderr)
+        return 1
+    try:
+        generated = main.generate_report(args.csv or config['CSV_file_path'], args.json or config['json_file_path'],
+                                         args.output or config['report_file_path'], args.db)
+    except ImportError as e:
+        print(f"The report needs reportlab: {e}", file=sys.stderr)
+        return 1
+    return 0 if generated else 1
+
+
+def stats(args, config):
+    """
+    Print the report statistics (total records, unique companies, title counts) computed in the database.
+    :return: Exit status
+    """
+    if not os.path.exists(args.db):
+        print(f"Database not found: {args.db}", file=sys.stderr)
+        return 1
+    db_manager = databaseManager.DatabaseManager(args.db, read_only=True)
+    try:
+        statistics = {
+            'total_records': db_manager.count_records(),
+            'unique_companies': db_manager.get_companies(),
+            'title_counts': db_manager.get_title_counts(),
+        }
+    finally:
+        db_manager.close_connection()
+    if None in statistics.values():
+        return 1
+
+    if args.json_output:
+        print(json.dumps(statistics, indent=4))
+    else:
+        print(f"Total Records: {statistics['total_records']}")
+        print(f"Unique Companies: {', '.join(statistics['unique_companies'])}")
+        for title, count in statistics['title_counts'].items():
+            print(f"{title}: {count}")
+    return 0
+
+
+def build_parser():
+    """
+    :return: ArgumentParser of the command line, one subcommand per stage of main.main()
+    """
+    common_parser = argparse.ArgumentParser(add_help=False)
+    common_parser.add_argument('--db', help="Path of the SQLite database (default: sample.db)")
+    parser = argparse.ArgumentParser(description="Manage the 'data' table: ingest, export, report and stats.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    ingest_parser = subparsers.add_parser('ingest', parents=[common_parser],
+                                          help="Insert the sample records, or the records of files")
+    ingest_parser.add_argument('files', nargs='*', help="CSV, JSON or NDJSON files to import, optionally compressed")
+    ingest_parser.add_argument('--chunk-size', type=int, default=100000, help="Records inserted per transaction")
+    ingest_parser.add_argument('--key', action='append', choices=databaseManager.DATA_COLUMNS,
+                               help="Uniqueness key of the records imported from files, e.g. --key email, "
+                                    "repeated for a key of several columns")
+    ingest_parser.add_argument('--on-conflict', choices=databaseManager.UPSERT_MODES, default='update',
+                               help="Update or ignore the records whose key is already in the table")
+    ingest_parser.set_defaults(func=ingest)
+
+    export_parser = subparsers.add_parser('export', parents=[common_parser],
+                                          help="Export the table to CSV and/or JSON (default: both)")
+    export_parser.add_argument('--csv', help="Path of the CSV file")
+    export_parser.add_argument('--json', help="Path of the JSON file")
+    export_parser.add_argument('--json-format', choices=['array', 'ndjson'], default='array')
+    export_parser.add_argument('--compression', choices=sorted(compressionCodecs.EXTENSIONS),
+                               help="Compress the files while they are written")
+    export_parser.set_defaults(func=export)
+
+    report_parser = subparsers.add_parser('report', parents=[common_parser], help="Generate the PDF report")
+    report_parser.add_argument('--csv', help="Path of the exported CSV file")
+    report_parser.add_argument('--json', help="Path of the exported JSON file")
+    report_parser.add_argument('--output', help="Path of the PDF report")
+    report_parser.set_defaults(func=report)
+
+    stats_parser = subparsers.add_parser('stats', parents=[common_parser], help="Print the report statistics")
+    stats_parser.add_argument('--json', dest='json_output', action='store_true', help="Print them as JSON")
+    stats_parser.set_defaults(func=stats)
+    return parser
+
+
+def run(argv=None):
+    """
+    Run one subcommand.
+    :param argv: Command line arguments, sys.argv[1:] by default
+    :return: Exit status
+    """
+    args = build_parser().parse_args(argv)
+    config = setupEnvironment.setup_sample_environment()
+    args.db = args.db or config['db_path']
+    return args.func(args, config)
+
+
+if __name__ == '__main__':
+    sys.exit(run())
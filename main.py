@@ -1,7 +1,56 @@
 from utils import databaseManager
-from utils import report
 import setupEnvironment
 
+
+def create_database(db_path, in_memory=False):
+    """
+    Connect to the database and create the table.
+    :param db_path: Path of the SQLite database
+    :param in_memory: Work on an in-memory copy of the database, written back when the connection is closed
+    :return: DatabaseManager connected to the database
+    """
+    # connect to database
+    db_manager = databaseManager.DatabaseManager(db_path, in_memory=in_memory)
+
+    # Create the table
+    db_manager.create_table()
+    return db_manager
+
+
+def insert_records(db_manager, records, chunk_size=100000):
+    """
+    Insert the records into the 'data' table, de-duplicated on the email: running again
+    updates the records instead of inserting copies of them.
+    :param db_manager: DatabaseManager connected to the database
+    :param records: Iterable of (name, email, zip_code, title) tuples, all loaded with a single upsert
+    :param chunk_size: Number of records upserted per transaction
+    :return: Dictionary of the numbers of records inserted, updated and skipped
+    """
+    return db_manager.bulk_upsert(records, key='email', chunk_size=chunk_size)
+
+
+def export_data(db_manager, CSV_file_path, json_file_path):
+    """
+    Export data to CSV and JSON (data.csv, data.json) with a single table scan.
+    :return: Number of rows exported
+    """
+    sinks = [databaseManager.CsvSink(CSV_file_path), databaseManager.JsonSink(json_file_path)]
+    return db_manager.export(sinks, use_writer_thread=True)
+
+
+def generate_report(CSV_file_path, json_file_path, report_file_path, db_path):
+    """
+    Generate the report (report.pdf), computing the statistics in the database
+    and only processing the records added since the previous report.
+    :return: True if the report was generated, False if it failed
+    """
+    from utils import report  # Imported here, so the other stages run without reportlab
+
+    report_generator = report.ReportGenerator(CSV_file_path, json_file_path, report_file_path, db_file=db_path,
+                                              use_cache=True)
+    return report_generator.generate_report()
+
+
 def main():
 
     # Get the configuration and sample data
@@ -14,27 +63,18 @@ def main():
     report_file_path = config['report_file_path']
     sample_records = config['sample_records']
 
-    # connect to database
-    db_manager = databaseManager.DatabaseManager(db_path)
-
-    # Create the table
-    db_manager.create_table()
-
-    # Insert data
-    db_manager.insert_data(sample_records)
-
-    # Export data to CSV to output folder (data.csv)
-    db_manager.export_to_csv(CSV_file_path)
+    # Create the database and insert data
+    db_manager = create_database(db_path)
+    insert_records(db_manager, sample_records)
 
-    # Export data to JSON to output folder (data.json)
-    db_manager.export_to_json(json_file_path)
+    # Export data to CSV and JSON to output folder
+    export_data(db_manager, CSV_file_path, json_file_path)
 
     # Close the connection
     db_manager.close_connection()
 
-    # Generate report to output folder (report.pdf)
-    report_generator = report.ReportGenerator(CSV_file_path, json_file_path, report_file_path)
-    report_generator.generate_report()
+    # Generate report to output folder
+    generate_report(CSV_file_path, json_file_path, report_file_path, db_path)
 
 if __name__ == '__main__':
     main()
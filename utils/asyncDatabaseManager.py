@@ -0,0 +1,116 @@
+from utils import databaseManager
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import functools
+import logging
+
+class AsyncDatabaseManager:
+    """
+    An asyncio front end for DatabaseManager. The blocking SQLite and file operations run on a
+    bounded thread pool, so many concurrent requests can be served without blocking the event loop.
+    """
+    def __init__(self, db_file, max_workers=4):
+        """
+        Initializes the AsyncDatabaseManager with the database file.
+
+        :param db_file: database file
+        :param max_workers: Maximum number of operations running at the same time.
+        """
+        self.logger = logging.getLogger(__name__)
+        logging.basicConfig(level=logging.INFO)
+        # The pool mode gives each worker thread its own read connection
+        self.db_manager = databaseManager.DatabaseManager(db_file, use_pool=True)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="async-db")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close_connection()
+
+    async def run(self, func, *args, **kwargs):
+        """
+        Runs a blocking function on the thread pool and waits for its result.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+
+    async def create_table(self):
+        """
+        Creates the 'data' table, see DatabaseManager.create_table.
+        """
+        return await self.run(self.db_manager.create_table)
+
+    async def insert_data(self, data):
+        """
+        Inserts a list of records, see DatabaseManager.insert_data.
+        """
+        return await self.run(self.db_manager.insert_data, data)
+
+    async def bulk_insert(self, records, chunk_size=100000, pragmas=None):
+        """
+        Inserts records from an iterable in chunks, see DatabaseManager.bulk_insert.
+        The iterable is consumed on the worker thread.
+        """
+        return await self.run(self.db_manager.bulk_insert, records, chunk_size, pragmas)
+
+    async def export(self, sinks, batch_size=1000, use_writer_thread=False):
+        """
+        Exports the 'data' table to several sinks with a single scan, see DatabaseManager.export.
+        """
+        return await self.run(self.db_manager.export, sinks, batch_size, use_writer_thread)
+
+    async def export_to_csv(self, output_file, **options):
+        """
+        Exports the 'data' table to a CSV file, see DatabaseManager.export_to_csv.
+        """
+        return await self.run(self.db_manager.export_to_csv, output_file, **options)
+
+    async def export_to_json(self, output_file, **options):
+        """
+        Exports the 'data' table to a JSON file, see DatabaseManager.export_to_json.
+        """
+        return await self.run(self.db_manager.export_to_json, output_file, **options)
+
+    async def count_records(self):
+        """
+        Counts the records, see DatabaseManager.count_records.
+        """
+        return await self.run(self.db_manager.count_records)
+
+    async def get_companies(self):
+        """
+        Gets the unique companies, see DatabaseManager.get_companies.
+        """
+        return await self.run(self.db_manager.get_companies)
+
+    async def get_title_counts(self):
+        """
+        Counts the records of each title, see DatabaseManager.get_title_counts.
+        """
+        return await self.run(self.db_manager.get_title_counts)
+
+    async def iter_rows(self, batch_size=1000):
+        """
+        Streams the rows of the 'data' table in id order. Each batch is read on the thread pool
+        with keyset pagination, so no cursor is kept open between two batches.
+
+        :param batch_size: Number of rows read at a time.
+        :return: Async generator of row tuples.
+        """
+        last_id = 0
+        while True:
+            rows = await self.run(self.db_manager.get_rows_after, last_id, batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield row
+            last_id = rows[-1][0]
+
+    async def close_connection(self):
+        """
+        Waits for the running operations and closes the database connections.
+        """
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.executor.shutdown)
+        self.db_manager.close_connection()
@@ -0,0 +1,521 @@
+"""
+Columnar binary file format written with the stdlib 'array' module.
+
+A file holds one column after the other, each as one or more contiguous buffers, and a footer
+describing them, in the spirit of Parquet:
+
+    MAGIC                 8 bytes, b'DBMCOL01'
+    buffers               each one starting at an offset aligned on 8 bytes
+    footer                UTF-8 JSON: {"row_count": n, "columns": [{"name", "encoding", "buffers", ...}]}
+    footer length         8 bytes, unsigned little-endian
+    MAGIC                 8 bytes
+
+"buffers" maps each buffer name of a column to its [offset, length] in bytes. Numbers are stored
+little-endian. The column encodings are:
+
+    int64       'values': one signed 64-bit integer per row
+    string      'offsets': n + 1 unsigned 32-bit offsets into 'data', the UTF-8 bytes of the values,
+                so a string column holds up to 4 GiB
+    dictionary  'codes': one signed 32-bit index per row into the "dictionary" list of the footer,
+                for low-cardinality columns such as the title
+    email       the part before the '@' as a string column ('offsets', 'data') and the domain as a
+                dictionary column ('codes', "dictionary"), code -1 for an email without '@'
+
+A column holding NULLs has a 'validity' buffer as well, one bit per row (least significant bit first)
+set when the value isn't NULL. The NULL rows hold 0, an empty string or the code -1 in the other buffers.
+
+The reader memory-maps the file: the int64 values and the dictionary codes are exposed as
+memoryviews over the mapping, without copying, and the strings are decoded on access. The columns
+with a 'validity' buffer are read as a NullableColumn, which gives None for the NULL rows.
+"""
+from array import array
+import json
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+
+MAGIC = b'DBMCOL01'
+ALIGNMENT = 8
+FOOTER_LENGTH = struct.Struct('<Q')
+MAX_STRING_DATA_SIZE = 2 ** 32 - 1
+
+# Encoding of the columns of the 'data' table, the other columns are written as strings
+DATA_COLUMN_ENCODINGS = {'id': 'int64', 'email': 'email', 'title': 'dictionary'}
+
+BIG_ENDIAN = sys.byteorder == 'big'
+
+
+def _to_bytes(values):
+    """
+    Little-endian bytes of an array.
+    """
+    if BIG_ENDIAN:
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+class _Buffer:
+    """
+    A buffer being written, spilled to a temporary file so memory does not grow with the row count.
+    """
+    def __init__(self, name):
+        self.name = name
+        self.file = tempfile.TemporaryFile()
+
+    def write(self, data):
+        self.file.write(data)
+
+
+class _Validity:
+    """
+    Validity bitmap of a column being written, only written once the column holds a NULL.
+    """
+    def __init__(self):
+        self.buffer = None
+        self.row_count = 0
+        # Bits of the last byte, not written yet
+        self.bits = []
+
+    def write(self, values):
+        if self.buffer is None:
+            if all(value is not None for value in values):
+                self.row_count += len(values)
+                return
+            # First NULL: the rows before it are all valid
+            self.buffer = _Buffer('validity')
+            self.buffer.write(b'\xff' * (self.row_count // 8))
+            self.bits = [True] * (self.row_count % 8)
+        bits = self.bits + [value is not None for value in values]
+        end = len(bits) - len(bits) % 8
+        self.buffer.write(bytes(sum(bit << shift for shift, bit in enumerate(bits[start:start + 8]))
+                                for start in range(0, end, 8)))
+        self.bits = bits[end:]
+
+    def flush(self):
+        if self.buffer is not None and self.bits:
+            self.buffer.write(bytes([sum(bit << shift for shift, bit in enumerate(self.bits))]))
+            self.bits = []
+
+    def buffers(self):
+        return [] if self.buffer is None else [self.buffer]
+
+
+class _Int64Encoder:
+    encoding = 'int64'
+
+    def __init__(self):
+        self.values = _Buffer('values')
+
+    def write(self, values):
+        self.values.write(_to_bytes(array('q', (0 if value is None else value for value in values))))
+
+    def buffers(self):
+        return [self.values]
+
+    def metadata(self):
+        return {}
+
+
+class _StringEncoder:
+    encoding = 'string'
+
+    def __init__(self):
+        self.offsets = _Buffer('offsets')
+        self.data = _Buffer('data')
+        self.end = 0
+        self.offsets.write(_to_bytes(array('I', [0])))
+
+    def write(self, values):
+        encoded = [b'' if value is None else value.encode() for value in values]
+        offsets = array('I')
+        end = self.end
+        for value in encoded:
+            end += len(value)
+            offsets.append(end)
+        if end > MAX_STRING_DATA_SIZE:
+            raise ValueError("A string column can't hold more than 4 GiB, export smaller partitions")
+        self.end = end
+        self.offsets.write(_to_bytes(offsets))
+        self.data.write(b''.join(encoded))
+
+    def buffers(self):
+        return [self.offsets, self.data]
+
+    def metadata(self):
+        return {}
+
+
+class _DictionaryEncoder:
+    encoding = 'dictionary'
+
+    def __init__(self):
+        self.codes = _Buffer('codes')
+        self.dictionary = {}
+
+    def encode(self, values):
+        dictionary = self.dictionary
+        codes = array('i')
+        for value in values:
+            if value is None:
+                codes.append(-1)
+                continue
+            code = dictionary.get(value)
+            if code is None:
+                code = dictionary[value] = len(dictionary)
+            codes.append(code)
+        return codes
+
+    def write(self, values):
+        self.codes.write(_to_bytes(self.encode(values)))
+
+    def buffers(self):
+        return [self.codes]
+
+    def metadata(self):
+        return {'dictionary': list(self.dictionary)}
+
+
+class _EmailEncoder:
+    encoding = 'email'
+
+    def __init__(self):
+        self.local_parts = _StringEncoder()
+        self.domains = _DictionaryEncoder()
+
+    def write(self, values):
+        local_parts = []
+        domains = []
+        for value in values:
+            if value is None:
+                local_parts.append(None)
+                domains.append(None)
+                continue
+            local_part, at, domain = value.rpartition('@')
+            if at:
+                local_parts.append(local_part)
+                domains.append(domain)
+            else:
+                local_parts.append(value)
+                domains.append(None)
+        self.local_parts.write(local_parts)
+        codes = self.domains.encode(domain for domain in domains if domain is not None)
+        if len(codes) < len(domains):
+            codes = iter(codes)
+            codes = array('i', (-1 if domain is None else next(codes) for domain in domains))
+        self.domains.codes.write(_to_bytes(codes))
+
+    def buffers(self):
+        return self.local_parts.buffers() + self.domains.buffers()
+
+    def metadata(self):
+        return self.domains.metadata()
+
+
+ENCODERS = {
+    'int64': _Int64Encoder,
+    'string': _StringEncoder,
+    'dictionary': _DictionaryEncoder,
+    'email': _EmailEncoder,
+}
+
+
+class ColumnarWriter:
+    """
+    Writes rows to a columnar file. The columns are encoded batch by batch into temporary files,
+    which are copied into the output file by close().
+    """
+    def __init__(self, output_file, columns, encodings=None, buffer_size=1024 * 1024):
+        """
+        :param output_file: Path of the columnar file
+        :param columns: Names of the columns, in the order of the values of the rows
+        :param encodings: Dictionary mapping column names to encodings, DATA_COLUMN_ENCODINGS by default.
+                          Columns left out are written as strings.
+        :param buffer_size: Size in bytes of the copy buffer
+        """
+        encodings = DATA_COLUMN_ENCODINGS if encodings is None else encodings
+        self.output_file = output_file
+        self.columns = list(columns)
+        self.buffer_size = buffer_size
+        self.encoders = [ENCODERS[encodings.get(name, 'string')]() for name in self.columns]
+        self.validities = [_Validity() for _ in self.columns]
+        self.row_count = 0
+
+    def write(self, rows):
+        """
+        Encode a batch of rows.
+        :param rows: List of tuples of values, in the order of the columns
+        :return: None
+        """
+        if not rows:
+            return
+        for encoder, validity, values in zip(self.encoders, self.validities, zip(*rows)):
+            encoder.write(values)
+            validity.write(values)
+        self.row_count += len(rows)
+
+    def close(self):
+        """
+        Write the output file: the buffers of every column followed by the footer.
+        :return: None
+        """
+        columns = []
+        try:
+            with open(self.output_file, 'wb') as output:
+                output.write(MAGIC)
+                for name, encoder, validity in zip(self.columns, self.encoders, self.validities):
+                    buffers = {}
+                    validity.flush()
+                    for buffer in encoder.buffers() + validity.buffers():
+                        output.write(b'\0' * (-output.tell() % ALIGNMENT))
+                        offset = output.tell()
+                        buffer.file.seek(0)
+                        shutil.copyfileobj(buffer.file, output, self.buffer_size)
+                        buffers[buffer.name] = [offset, output.tell() - offset]
+                    columns.append({'name': name, 'encoding': encoder.encoding, 'buffers': buffers,
+                                    **encoder.metadata()})
+                footer = json.dumps({'row_count': self.row_count, 'columns': columns}).encode()
+                output.write(footer + FOOTER_LENGTH.pack(len(footer)) + MAGIC)
+        finally:
+            for encoder, validity in zip(self.encoders, self.validities):
+                for buffer in encoder.buffers() + validity.buffers():
+                    buffer.file.close()
+
+
+class Int64Column:
+    """
+    An int64 column. 'values' is a memoryview of the integers over the file mapping.
+    """
+    def __init__(self, values):
+        self.values = values
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, index):
+        return self.values[index]
+
+
+class StringColumn:
+    """
+    A string column, decoded row by row from the file mapping.
+    """
+    def __init__(self, offsets, data):
+        self.offsets = offsets
+        self.data = data
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        return str(self.data[self.offsets[index]:self.offsets[index + 1]], 'utf-8')
+
+    def __iter__(self):
+        offsets, data = self.offsets, self.data
+        start = offsets[0]
+        for index in range(1, len(offsets)):
+            end = offsets[index]
+            yield str(data[start:end], 'utf-8')
+            start = end
+
+
+class DictionaryColumn:
+    """
+    A dictionary-encoded column. 'codes' is a memoryview of the indexes into 'dictionary' over the
+    file mapping, so counting the values only needs the codes.
+    """
+    def __init__(self, codes, dictionary):
+        self.codes = codes
+        self.dictionary = dictionary
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, index):
+        code = self.codes[index]
+        return None if code < 0 else self.dictionary[code]
+
+    def __iter__(self):
+        dictionary = self.dictionary
+        return (None if code < 0 else dictionary[code] for code in self.codes)
+
+    def value_counts(self):
+        """
+        :return: Dictionary mapping every value to its number of rows, in dictionary order, without the NULLs
+        """
+        counts = [0] * len(self.dictionary)
+        for code in self.codes:
+            if code >= 0:
+                counts[code] += 1
+        return {value: count for value, count in zip(self.dictionary, counts) if count}
+
+
+class EmailColumn:
+    """
+    An email column, split into a string column of the parts before the '@' and a dictionary
+    column of the domains.
+    """
+    def __init__(self, local_parts, domains):
+        self.local_parts = local_parts
+        self.domains = domains
+
+    def __len__(self):
+        return len(self.local_parts)
+
+    def __getitem__(self, index):
+        code = self.domains.codes[index]
+        local_part = self.local_parts[index]
+        return local_part if code < 0 else f"{local_part}@{self.domains.dictionary[code]}"
+
+    def __iter__(self):
+        dictionary = self.domains.dictionary
+        for local_part, code in zip(self.local_parts, self.domains.codes):
+            yield local_part if code < 0 else f"{local_part}@{dictionary[code]}"
+
+
+class NullableColumn:
+    """
+    A column holding NULLs: the rows whose bit is clear in the 'validity' bitmap are None, the other
+    ones are read from 'column'. The attributes of 'column' (values, codes, value_counts, ...) are
+    available on the NullableColumn.
+    """
+    def __init__(self, column, validity):
+        self.column = column
+        self.validity = validity
+
+    def __len__(self):
+        return len(self.column)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self.column)
+        if not self.validity[index >> 3] >> (index & 7) & 1:
+            return None
+        return self.column[index]
+
+    def __iter__(self):
+        validity = self.validity
+        for index, value in enumerate(self.column):
+            yield value if validity[index >> 3] >> (index & 7) & 1 else None
+
+    def __getattr__(self, name):
+        if name == 'column':
+            raise AttributeError(name)
+        return getattr(self.column, name)
+
+
+class ColumnarFile:
+    """
+    A columnar file opened for reading through a read-only memory mapping.
+    """
+    def __init__(self, path):
+        """
+        :param path: Path of the columnar file
+        """
+        self.path = path
+        self.file = open(path, 'rb')
+        self.mapping = None
+        self.view = None
+        try:
+            size = os.fstat(self.file.fileno()).st_size
+            if size < 2 * len(MAGIC) + FOOTER_LENGTH.size:
+                raise ValueError(f"{path} is not a columnar file")
+            self.mapping = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.view = memoryview(self.mapping)
+            trailer_start = size - FOOTER_LENGTH.size - len(MAGIC)
+            if self.mapping[:len(MAGIC)] != MAGIC or self.mapping[size - len(MAGIC):] != MAGIC:
+                raise ValueError(f"{path} is not a columnar file")
+            footer_length, = FOOTER_LENGTH.unpack_from(self.mapping, trailer_start)
+            footer = json.loads(self.mapping[trailer_start - footer_length:trailer_start])
+        except Exception:
+            self.close()
+            raise
+        self.row_count = footer['row_count']
+        self.column_metadata = {column['name']: column for column in footer['columns']}
+        self.column_names = [column['name'] for column in footer['columns']]
+        self.columns = {}
+
+    def _buffer(self, column, name, typecode=None):
+        """
+        View of one buffer of a column, cast to numbers when typecode is given.
+        """
+        offset, length = column['buffers'][name]
+        buffer = self.view[offset:offset + length]
+        if typecode is None:
+            return buffer
+        if BIG_ENDIAN:
+            values = array(typecode, buffer.tobytes())
+            values.byteswap()
+            return memoryview(values)
+        return buffer.cast(typecode)
+
+    def column(self, name):
+        """
+        Access a column without reading the others.
+        :param name: Name of the column
+        :return: Int64Column, StringColumn, DictionaryColumn or EmailColumn, wrapped in a NullableColumn
+                 when the column holds NULLs
+        """
+        if name not in self.columns:
+            if name not in self.column_metadata:
+                raise KeyError(name)
+            metadata = self.column_metadata[name]
+            encoding = metadata['encoding']
+            if encoding == 'int64':
+                column = Int64Column(self._buffer(metadata, 'values', 'q'))
+            elif encoding == 'string':
+                column = StringColumn(self._buffer(metadata, 'offsets', 'I'), self._buffer(metadata, 'data'))
+            elif encoding == 'dictionary':
+                column = DictionaryColumn(self._buffer(metadata, 'codes', 'i'), metadata['dictionary'])
+            elif encoding == 'email':
+                column = EmailColumn(StringColumn(self._buffer(metadata, 'offsets', 'I'), self._buffer(metadata, 'data')),
+                                     DictionaryColumn(self._buffer(metadata, 'codes', 'i'), metadata['dictionary']))
+            else:
+                raise ValueError(f"Unknown column encoding: {encoding}")
+            if 'validity' in metadata['buffers']:
+                column = NullableColumn(column, self._buffer(metadata, 'validity'))
+            self.columns[name] = column
+        return self.columns[name]
+
+    def iter_rows(self, columns=None):
+        """
+        Iterate over the rows.
+        :param columns: Names of the columns to read, all of them by default
+        :return: Generator of tuples of values
+        """
+        return zip(*(self.column(name) for name in (columns or self.column_names)))
+
+    def iter_records(self, columns=None):
+        """
+        Iterate over the rows as dictionaries, like FileManager.iter_csv().
+        :param columns: Names of the columns to read, all of them by default
+        :return: Generator of dictionaries
+        """
+        columns = columns or self.column_names
+        return (dict(zip(columns, row)) for row in self.iter_rows(columns))
+
+    def close(self):
+        """
+        Close the file. The memory mapping is released once the columns obtained from it are too.
+        :return: None
+        """
+        self.columns = {}
+        if self.view is not None:
+            self.view.release()
+            self.view = None
+        if self.mapping is not None:
+            try:
+                self.mapping.close()
+            except BufferError:
+                pass  # A column view is still in use, the mapping is released with it
+            self.mapping = None
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,105 @@
+from collections.abc import Mapping
+
+# Fields with few distinct values, stored once and shared by every row holding them
+DEFAULT_INTERN_FIELDS = ('title',)
+
+
+class Record(Mapping):
+    """
+    A read-only record, used like the dictionaries returned by FileManager.read_csv
+    (record['email'], record.get('title'), record.items()) but without a dictionary per row:
+    the values are kept in a tuple and the field positions are shared by all the records.
+    """
+    __slots__ = ('positions', 'values')
+
+    def __init__(self, positions, values):
+        """
+        :param positions: Dictionary mapping each field name to its position in values, shared by the records
+        :param values: Tuple of the values of the record
+        """
+        self.positions = positions
+        self.values = values
+
+    def __getitem__(self, field):
+        return self.values[self.positions[field]]
+
+    def __iter__(self):
+        return iter(self.positions)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class RecordTable:
+    """
+    Compact in-memory container of records, stored column by column: one list per field, with the
+    values of the low-cardinality fields (e.g. the title) deduplicated so every row points to the
+    same string. Iterating yields Record objects, which ReportGenerator consumes like dictionaries.
+    """
+    def __init__(self, fields, intern_fields=DEFAULT_INTERN_FIELDS):
+        """
+        :param fields: Names of the fields, in order
+        :param intern_fields: Names of the fields whose repeated values are stored once
+        """
+        self.fields = tuple(fields)
+        self.positions = {field: position for position, field in enumerate(self.fields)}
+        self.columns = [[] for _ in self.fields]
+        self.interned_values = [{} if field in intern_fields else None for field in self.fields]
+
+    @classmethod
+    def from_records(cls, records, intern_fields=DEFAULT_INTERN_FIELDS):
+        """
+        Build a table from records, e.g. the lazy FileManager.iter_csv(), so they are never all held as dictionaries.
+        :param records: Iterable of dictionaries, the fields are those of the first one
+        :param intern_fields: Names of the fields whose repeated values are stored once
+        :return: RecordTable
+        """
+        records = iter(records)
+        first_record = next(records, None)
+        table = cls(first_record.keys() if first_record is not None else (), intern_fields)
+        if first_record is not None:
+            table.append(first_record)
+            table.extend(records)
+        return table
+
+    def append(self, record):
+        """
+        Add a record.
+        :param record: Dictionary (or Record) holding every field of the table
+        :return: None
+        """
+        for field, column, interned_values in zip(self.fields, self.columns, self.interned_values):
+            value = record[field]
+            if interned_values is not None:
+                value = interned_values.setdefault(value, value)
+            column.append(value)
+
+    def extend(self, records):
+        """
+        Add records.
+        :param records: Iterable of dictionaries
+        :return: None
+        """
+        for record in records:
+            self.append(record)
+
+    def column(self, field):
+        """
+        :param field: Name of the field
+        :return: List of the values of the field, in row order
+        """
+        return self.columns[self.positions[field]]
+
+    def __len__(self):
+        return len(self.columns[0]) if self.columns else 0
+
+    def __getitem__(self, index):
+        return Record(self.positions, tuple(column[index] for column in self.columns))
+
+    def __iter__(self):
+        positions = self.positions
+        for values in zip(*self.columns):
+            yield Record(positions, values)
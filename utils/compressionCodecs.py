@@ -0,0 +1,184 @@
+"""
+Streaming compression of the export files. gzip comes with the standard library, zstd and lz4
+are used when the 'zstandard' and 'lz4' packages are installed. Every codec writes a format whose
+frames can be concatenated, so compressed CSV and NDJSON files can still be appended to.
+"""
+import gzip
+import importlib
+import io
+import queue
+import threading
+
+# Magic numbers at the start of the files written by each codec
+MAGIC_NUMBERS = {
+    'gzip': b'\x1f\x8b',
+    'zstd': b'\x28\xb5\x2f\xfd',
+    'lz4': b'\x04\x22\x4d\x18',
+}
+
+# Usual file extension of each codec
+EXTENSIONS = {'gzip': '.gz', 'zstd': '.zst', 'lz4': '.lz4'}
+
+# Compression level used when none is given: fast levels, the exports are written often
+DEFAULT_LEVELS = {'gzip': 6, 'zstd': 3, 'lz4': 0}
+
+# Modules of the optional codecs, imported on first use so that importing this module stays fast
+CODEC_MODULES = {'zstd': 'zstandard', 'lz4': 'lz4.frame'}
+
+# Imported modules of the optional codecs, None for a package that is not installed
+_codec_modules = {}
+
+
+def _get_codec_module(codec):
+    """
+    Import the module of an optional codec, once.
+    :param codec: 'zstd' or 'lz4'
+    :return: The module, None if its package is not installed
+    """
+    if codec not in _codec_modules:
+        try:
+            _codec_modules[codec] = importlib.import_module(CODEC_MODULES[codec])
+        except ImportError:
+            _codec_modules[codec] = None
+    return _codec_modules[codec]
+
+
+def available_codecs():
+    """
+    :return: Names of the codecs usable in this environment
+    """
+    return ['gzip'] + [codec for codec in CODEC_MODULES if _get_codec_module(codec) is not None]
+
+
+def check_codec(codec):
+    """
+    Raise ValueError if the codec is unknown or its package is not installed.
+    :param codec: Name of the codec
+    :return: None
+    """
+    if codec not in MAGIC_NUMBERS:
+        raise ValueError(f"Unknown compression codec: {codec}")
+    if codec not in available_codecs():
+        package = 'zstandard' if codec == 'zstd' else codec
+        raise ValueError(f"The {codec} codec requires the '{package}' package")
+
+
+def open_output(path, codec, append=False, buffer_size=1024 * 1024, level=None, use_thread=False):
+    """
+    Open a binary stream compressing what is written to it into a file.
+    :param path: Path of the compressed file
+    :param codec: 'gzip', 'zstd' or 'lz4'
+    :param append: Add a new frame at the end of the file instead of overwriting it
+    :param buffer_size: Size in bytes of the write buffer, and of the chunks handed to the compression thread
+    :param level: Compression level, DEFAULT_LEVELS by default
+    :param use_thread: Compress on a separate thread while the caller produces the next chunks
+    :return: Writable binary stream, closing it finishes the compressed file
+    """
+    check_codec(codec)
+    level = DEFAULT_LEVELS[codec] if level is None else level
+    mode = 'ab' if append else 'wb'
+    if codec == 'gzip':
+        stream = gzip.open(path, mode, compresslevel=level)
+    elif codec == 'zstd':
+        zstandard = _get_codec_module('zstd')
+        stream = zstandard.ZstdCompressor(level=level).stream_writer(open(path, mode, buffering=buffer_size),
+                                                                     closefd=True)
+    else:
+        stream = _get_codec_module('lz4').LZ4FrameFile(path, mode, compression_level=level)
+    return io.BufferedWriter(CompressionThread(stream) if use_thread else stream, buffer_size)
+
+
+def detect_compression(path):
+    """
+    Detect the codec of a file from its first bytes.
+    :param path: Path of the file
+    :return: Name of the codec, None for an uncompressed file
+    """
+    with open(path, 'rb') as file:
+        head = file.read(4)
+    for codec, magic_number in MAGIC_NUMBERS.items():
+        if head[:len(magic_number)] == magic_number:
+            return codec
+    return None
+
+
+def open_binary_input(path):
+    """
+    Open a file for reading, decompressing it if it was written by one of the codecs.
+    :param path: Path of the file
+    :return: Readable binary stream
+    """
+    codec = detect_compression(path)
+    if codec is None:
+        return open(path, 'rb')
+    check_codec(codec)
+    if codec == 'gzip':
+        return gzip.open(path, 'rb')
+    if codec == 'zstd':
+        zstandard = _get_codec_module('zstd')
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), read_across_frames=True,
+                                                                            closefd=True))
+    return _get_codec_module('lz4').open(path, 'rb')
+
+
+def open_input(path, newline=None):
+    """
+    Open a file for reading as text, decompressing it if it was written by one of the codecs.
+    :param path: Path of the file
+    :param newline: Newline handling, as for open()
+    :return: Readable text stream
+    """
+    if detect_compression(path) is None:
+        return open(path, mode='r', newline=newline)
+    return io.TextIOWrapper(open_binary_input(path), newline=newline)
+
+
+class CompressionThread(io.RawIOBase):
+    """
+    Writable stream handing the chunks written to it over a bounded queue to a thread that
+    compresses them, so the compression overlaps with the production of the next chunks.
+    """
+    def __init__(self, stream, queue_size=4):
+        """
+        :param stream: Compressing stream, e.g. a gzip.GzipFile
+        :param queue_size: Maximum number of chunks waiting for the compression thread
+        """
+        super().__init__()
+        self.stream = stream
+        self.chunks = queue.Queue(maxsize=queue_size)
+        self.errors = []
+        self.thread = threading.Thread(target=self._compress, name="export-compressor", daemon=True)
+        self.thread.start()
+
+    def _compress(self):
+        try:
+            while True:
+                chunk = self.chunks.get()
+                if chunk is None:
+                    break
+                self.stream.write(chunk)
+        except Exception as e:
+            self.errors.append(e)
+            # Keep draining so the producer never blocks on a full queue
+            while self.chunks.get() is not None:
+                pass
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        if self.errors:
+            raise self.errors[0]
+        self.chunks.put(bytes(data))
+        return len(data)
+
+    def close(self):
+        if not self.closed:
+            try:
+                self.chunks.put(None)
+                self.thread.join()
+                self.stream.close()
+            finally:
+                super().close()
+            if self.errors:
+                raise self.errors[0]
@@ -0,0 +1,99 @@
+import itertools
+import random
+import string
+
+# Titles and companies of the sample records, extended with numbered ones for higher cardinalities
+BASE_TITLES = ['Engineer', 'Manager', 'Technician', 'Analyst', 'Director', 'Consultant', 'Assistant']
+BASE_COMPANIES = ['siemens', 'valeo', 'we', 'vodafone', 'orange']
+
+# Number of distinct first names and last names, a power of two
+NAME_POOL_SIZE = 4096
+
+
+class DataGenerator:
+    """
+    Reproducible generator of synthetic records following the 'data' table template
+    (name, email, zip_code, title). The same seed and settings always produce the same records.
+    """
+    def __init__(self, seed=0, title_count=len(BASE_TITLES), company_count=len(BASE_COMPANIES),
+                 name_length=(4, 12), zip_code_count=100000):
+        """
+        :param seed: Seed of the random generator
+        :param title_count: Number of distinct titles
+        :param company_count: Number of distinct companies in the emails
+        :param name_length: Tuple of the minimum and maximum length of the first and last names
+        :param zip_code_count: Number of distinct zip codes
+        """
+        if title_count < 1 or company_count < 1 or zip_code_count < 1:
+            raise ValueError("The title, company and zip code counts must be at least 1")
+        if not 1 <= name_length[0] <= name_length[1]:
+            raise ValueError(f"Invalid name length range: {name_length}")
+        self.seed = seed
+        self.title_count = title_count
+        self.company_count = company_count
+        self.name_length = tuple(name_length)
+        self.zip_code_count = zip_code_count
+        self.titles = self._values(BASE_TITLES, title_count, 'Title')
+        self.companies = self._values(BASE_COMPANIES, company_count, 'company')
+
+    @staticmethod
+    def _values(base_values, count, prefix):
+        """
+        The first count base values, completed with numbered values.
+        """
+        return (base_values + [f'{prefix}{i}' for i in range(len(base_values), count)])[:count]
+
+    def get_settings(self):
+        """
+        :return: Dictionary of the generator settings, to record next to the results produced with it
+        """
+        return {
+            'seed': self.seed,
+            'title_count': self.title_count,
+            'company_count': self.company_count,
+            'name_length': list(self.name_length),
+            'zip_code_count': self.zip_code_count,
+        }
+
+    def iter_records(self, row_count):
+        """
+        Generate records one at a time. The first and last names are drawn from pools of
+        NAME_POOL_SIZE random names, and every field of a record comes from a single random number.
+        :param row_count: Number of records to generate
+        :return: Generator of (name, email, zip_code, title) tuples
+        """
+        rng = random.Random(self.seed)
+        min_length, max_length = self.name_length
+        first_names, last_names = (
+            [''.join(rng.choices(string.ascii_lowercase, k=rng.randint(min_length, max_length))).capitalize()
+             for _ in range(NAME_POOL_SIZE)]
+            for _ in range(2))
+        titles, companies, zip_code_count = self.titles, self.companies, self.zip_code_count
+        title_count, company_count = len(titles), len(companies)
+        name_mask = NAME_POOL_SIZE - 1
+        name_bits = NAME_POOL_SIZE.bit_length() - 1
+        for i in range(row_count):
+            bits = rng.getrandbits(2 * name_bits + 96)
+            first_name = first_names[bits & name_mask]
+            bits >>= name_bits
+            last_name = last_names[bits & name_mask]
+            bits >>= name_bits
+            company = companies[(bits & 0xFFFFFFFF) % company_count]
+            title = titles[((bits >> 32) & 0xFFFFFFFF) % title_count]
+            zip_code = f'{(bits >> 64) % zip_code_count:05d}'
+            # The index keeps the emails unique
+            yield f'{first_name} {last_name}', f'{first_name.lower()}.{last_name.lower()}{i}@{company}.com', zip_code, title
+
+    def iter_chunks(self, row_count, chunk_size=100000):
+        """
+        Generate records in chunks, e.g. for DatabaseManager.insert_data.
+        :param row_count: Number of records to generate
+        :param chunk_size: Number of records in each chunk
+        :return: Generator of lists of (name, email, zip_code, title) tuples
+        """
+        records = self.iter_records(row_count)
+        while True:
+            chunk = list(itertools.islice(records, chunk_size))
+            if not chunk:
+                break
+            yield chunk
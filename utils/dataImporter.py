@@ -0,0 +1,131 @@
+from utils import databaseManager
+from utils import fileManager
+import itertools
+import logging
+import queue
+import threading
+
+
+class DataImporter:
+    """
+    A class to load CSV, JSON and NDJSON files (e.g. produced by the exporters) into the 'data' table.
+    The files are read lazily and inserted in chunks, so memory does not grow with the file size.
+    """
+    def __init__(self, db_manager, column_mapping=None):
+        """
+        Initializes the DataImporter with the database to load into.
+
+        :param db_manager: DatabaseManager connected to the target database.
+        :param column_mapping: Dictionary mapping each column of the 'data' table to the field holding it
+                               in the input files. Columns left out are read from the field of the same name.
+                               The 'id' field is ignored, the table assigns new ids.
+        """
+        self.logger = logging.getLogger(__name__)
+        logging.basicConfig(level=logging.INFO)
+        self.db_manager = db_manager
+        self.file_manager = fileManager.FileManager()
+        column_mapping = column_mapping or {}
+        self.fields = [column_mapping.get(column, column) for column in databaseManager.DATA_COLUMNS]
+
+    def import_csv(self, csv_file, chunk_size=100000, pragmas=None, use_parser_thread=True, key=None,
+                   on_conflict='update'):
+        """
+        Imports the records of a CSV file into the 'data' table.
+
+        :param csv_file: Path to the CSV file.
+        :param chunk_size: Number of records inserted per transaction.
+        :param pragmas: PRAGMA settings for the duration of the load, see DatabaseManager.bulk_insert.
+        :param use_parser_thread: Parse the file on a separate thread while SQLite inserts the previous records.
+        :param key: Uniqueness key (e.g. 'email') the records are de-duplicated on, see DatabaseManager.bulk_upsert.
+                    None inserts every record.
+        :param on_conflict: With a key, 'update' or 'ignore' the records whose key is already in the table.
+        :return: Number of records imported, or with a key the numbers of records inserted, updated and skipped.
+                 None if the file can't be read or a record can't be inserted.
+        """
+        records = self.file_manager.iter_csv(csv_file, raise_errors=True)
+        return self._import(records, chunk_size, pragmas, use_parser_thread, key, on_conflict)
+
+    def import_json(self, json_file, chunk_size=100000, pragmas=None, use_parser_thread=True, key=None,
+                    on_conflict='update'):
+        """
+        Imports the records of a JSON array or of an NDJSON file into the 'data' table.
+
+        :param json_file: Path to the JSON or NDJSON file.
+        :param chunk_size: Number of records inserted per transaction.
+        :param pragmas: PRAGMA settings for the duration of the load, see DatabaseManager.bulk_insert.
+        :param use_parser_thread: Parse the file on a separate thread while SQLite inserts the previous records.
+        :param key: Uniqueness key (e.g. 'email') the records are de-duplicated on, see DatabaseManager.bulk_upsert.
+                    None inserts every record.
+        :param on_conflict: With a key, 'update' or 'ignore' the records whose key is already in the table.
+        :return: Number of records imported, or with a key the numbers of records inserted, updated and skipped.
+                 None if the file can't be read or a record can't be inserted.
+        """
+        records = self.file_manager.iter_json(json_file, raise_errors=True)
+        return self._import(records, chunk_size, pragmas, use_parser_thread, key, on_conflict)
+
+    def _import(self, records, chunk_size, pragmas, use_parser_thread, key, on_conflict):
+        """
+        Maps the records onto the 'data' columns and inserts or upserts them in bulk.
+        The chunks inserted before a read error stay in the table, as with any failed bulk load.
+        """
+        rows = self._to_rows(records)
+        if use_parser_thread:
+            rows = self._iter_on_thread(rows)
+        try:
+            if key is not None:
+                return self.db_manager.bulk_upsert(rows, key, on_conflict, chunk_size, pragmas)
+            return self.db_manager.bulk_insert(rows, chunk_size, pragmas)
+        except KeyError as e:
+            self.logger.error(f"Failed to import records, missing field: {e}")
+        except Exception as e:
+            # A read error of the input file (missing, unreadable or corrupt), already logged by the FileManager
+            self.logger.error(f"Failed to import records: {e}")
+
+    def _to_rows(self, records):
+        """
+        Converts the records read from a file to (name, email, zip_code, title) tuples.
+        """
+        fields = self.fields
+        for record in records:
+            yield tuple(record[field] for field in fields)
+
+    def _iter_on_thread(self, rows, batch_size=10000, queue_size=8):
+        """
+        Consumes an iterator on a parser thread and yields its items on the calling thread.
+        The items are passed over a bounded queue in batches, which bounds the memory used.
+        """
+        batches = queue.Queue(maxsize=queue_size)
+        errors = []
+        stopped = threading.Event()
+
+        def parse():
+            try:
+                while not stopped.is_set():
+                    batch = list(itertools.islice(rows, batch_size))
+                    if not batch:
+                        break
+                    batches.put(batch)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                batches.put(None)
+
+        parser_thread = threading.Thread(target=parse, name="import-parser", daemon=True)
+        parser_thread.start()
+        try:
+            while True:
+                batch = batches.get()
+                if batch is None:
+                    break
+                yield from batch
+        finally:
+            # Unblock the parser if the consumer stopped early
+            stopped.set()
+            while parser_thread.is_alive():
+                try:
+                    batches.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            parser_thread.join()
+        if errors:
+            raise errors[0]
@@ -1,19 +1,370 @@
+import copy
 import csv
+import io
+import itertools
 import json
 import sqlite3
 from sqlite3 import Error
 import logging
+import os
+import queue
+import shutil
+import sys
+import threading
+import time
+from utils import columnarFormat
+from utils import compressionCodecs
+from utils import metrics
+from utils import resultCache
 
-class DatabaseManager:
+# SQL expression extracting the company from an email, same as email.split('@')[-1].split('.')[0]
+# for emails holding a single '@'
+EMAIL_DOMAIN_EXPRESSION = "substr(email, instr(email, '@') + 1)"
+COMPANY_EXPRESSION = f"substr({EMAIL_DOMAIN_EXPRESSION}, 1, instr({EMAIL_DOMAIN_EXPRESSION} || '.', '.') - 1)"
+
+# Columns that can be filtered, projected and ordered on by DatabaseManager.query,
+# 'company' being computed from the email
+QUERY_COLUMNS = {
+    'id': 'id',
+    'name': 'name',
+    'email': 'email',
+    'zip_code': 'zip_code',
+    'title': 'title',
+    'company': COMPANY_EXPRESSION,
+}
+
+# Columns of the 'data' table given by the inserted records, in insertion order
+DATA_COLUMNS = ('name', 'email', 'zip_code', 'title')
+
+# Modes of DatabaseManager.bulk_upsert for the records whose key is already in the table
+UPSERT_MODES = ('update', 'ignore')
+
+# Secondary indexes managed by DatabaseManager.create_indexes, the company index is an expression index
+DATA_INDEXES = {
+    'idx_data_email': 'email',
+    'idx_data_zip_code': 'zip_code',
+    'idx_data_title': 'title',
+    'idx_data_company': COMPANY_EXPRESSION,
+}
+
+# PRAGMA settings for the duration of a bulk load: WAL journal, no fsync on commit,
+# a 200 MiB page cache and temporary tables kept in memory
+BULK_LOAD_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'OFF',
+    'cache_size': -200000,
+    'temp_store': 'MEMORY',
+}
+
+
+class ExportSink:
+    """
+    Base class of the export sinks. DatabaseManager.export scans the 'data' table once
+    and hands every batch of rows to each of its sinks.
+    """
+    # Whether the format can be appended to an existing file, see append
+    appendable = True
+
+    def __init__(self, output_file, buffer_size=1024 * 1024, append=False, compression=None, compress_on_thread=False):
+        """
+        :param output_file: The path of the file to write to
+        :param buffer_size: Size in bytes of the file write buffer
+        :param append: Append the rows to the file if it exists instead of overwriting it
+        :param compression: Codec compressing the file as it is written: 'gzip', 'zstd' or 'lz4'
+                            (see utils/compressionCodecs.py), None to write it uncompressed
+        :param compress_on_thread: Compress on a separate thread while the next rows are encoded
+        """
+        if append and not self.appendable:
+            raise ValueError(f"{type(self).__name__} can't append to an existing file")
+        if compression is not None:
+            compressionCodecs.check_codec(compression)
+        self.output_file = output_file
+        self.buffer_size = buffer_size
+        self.append = append
+        self.compression = compression
+        self.compress_on_thread = compress_on_thread
+        self.file = None
+
+    def open(self, headers):
+        """
+        Open the output file and write what comes before the rows.
+        :param headers: Column names of the exported rows
+        :return: None
+        """
+        self.headers = headers
+        self.new_file = not (self.append and os.path.exists(self.output_file) and os.path.getsize(self.output_file) > 0)
+        if self.compression:
+            self.file = io.TextIOWrapper(self._open_binary_output(self.append), newline='')
+        else:
+            self.file = open(self.output_file, 'a' if self.append else 'w', newline='', buffering=self.buffer_size)
+
+    def _open_binary_output(self, append=False):
+        """
+        Open the output file as a binary stream, compressed if the sink has a codec.
+        """
+        if self.compression:
+            return compressionCodecs.open_output(self.output_file, self.compression, append, self.buffer_size,
+                                                 use_thread=self.compress_on_thread)
+        return open(self.output_file, 'ab' if append else 'wb')
+
+    def write(self, rows):
+        """
+        Write a batch of rows.
+        :param rows: List of row tuples
+        :return: None
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """
+        Write what comes after the rows and close the output file.
+        :return: None
+        """
+        if self.file:
+            self.file.close()
+            self.file = None
+
+    def merge(self, shard_files):
+        """
+        Concatenate, in order, the files written by copies of this sink on consecutive id ranges
+        (see DatabaseManager.export_parallel) into the output file.
+        :param shard_files: Paths of the shard files, in id order
+        :return: None
+        """
+        with self._open_binary_output() as output:
+            for shard_file in shard_files:
+                with compressionCodecs.open_binary_input(shard_file) as shard:
+                    shutil.copyfileobj(shard, output, self.buffer_size)
+
+
+class CsvSink(ExportSink):
+    """
+    Writes the exported rows to a CSV file, headers first.
+    """
+    def open(self, headers):
+        super().open(headers)
+        self.writer = csv.writer(self.file)
+        if self.new_file:  # New file, or appending to an empty one
+            self.writer.writerow(headers)  # Write headers
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def merge(self, shard_files):
+        # Keep the headers of the first shard only
+        with self._open_binary_output() as output:
+            for index, shard_file in enumerate(shard_files):
+                with compressionCodecs.open_binary_input(shard_file) as shard:
+                    headers = shard.readline()
+                    if index == 0:
+                        output.write(headers)
+                    shutil.copyfileobj(shard, output, self.buffer_size)
+
+
+class JsonSink(ExportSink):
+    """
+    Writes the exported rows to a JSON file, either as a JSON array or as NDJSON (one object per line).
+    """
+    def __init__(self, output_file, json_format='array', indent=4, buffer_size=1024 * 1024, append=False,
+                 compression=None, compress_on_thread=False):
+        """
+        :param output_file: The path of the JSON file to write to
+        :param json_format: 'array' to write a JSON array, 'ndjson' to write one JSON object per line
+        :param indent: Indentation of the JSON array, None for a compact array (ignored for 'ndjson')
+        :param buffer_size: Size in bytes of the file write buffer
+        :param append: Append the rows to the file if it exists, only for 'ndjson'
+        :param compression: Codec compressing the file as it is written, None to write it uncompressed
+        :param compress_on_thread: Compress on a separate thread while the next rows are encoded
+        """
+        if json_format not in ('array', 'ndjson'):
+            raise ValueError(f"Unknown JSON format: {json_format}")
+        self.appendable = json_format == 'ndjson'
+        super().__init__(output_file, buffer_size, append, compression, compress_on_thread)
+        self.json_format = json_format
+        self.indent = None if json_format == 'ndjson' else indent
+
+        if self.indent is None:
+            self.encoder = json.JSONEncoder(separators=(',', ':'))
+        else:
+            self.encoder = json.JSONEncoder(indent=self.indent)
+        if json_format == 'ndjson':
+            self.opening, self.separator, self.closing = '', '\n', '\n'
+        elif self.indent is None:
+            self.opening, self.separator, self.closing = '[', ',', ']'
+        else:
+            # Same layout as json.dump(data_list, file, indent=indent)
+            padding = ' ' * self.indent
+            self.opening, self.separator, self.closing = '[\n' + padding, ',\n' + padding, '\n]'
+
+    def open(self, headers):
+        super().open(headers)
+        self.row_count = 0
+
+    def write(self, rows):
+        encoded = [self.encoder.encode(dict(zip(self.headers, row))) for row in rows]
+        if self.indent is not None:
+            padding = ' ' * self.indent
+            encoded = [text.replace('\n', '\n' + padding) for text in encoded]
+        self.file.write((self.separator if self.row_count else self.opening) + self.separator.join(encoded))
+        self.row_count += len(rows)
+
+    def close(self):
+        if self.file:
+            if self.row_count:
+                self.file.write(self.closing)
+            elif self.json_format == 'array':
+                self.file.write('[]')
+        super().close()
+
+    def merge(self, shard_files):
+        if self.json_format == 'ndjson':
+            super().merge(shard_files)
+            return
+
+        # Copy the items of each array, between its opening and its closing, joined by the separator.
+        # The end of the items is only known at the end of the shard, so the closing is held back
+        opening, separator, closing = (part.encode() for part in (self.opening, self.separator, self.closing))
+        with self._open_binary_output() as output:
+            items_written = False
+            for shard_file in shard_files:
+                with compressionCodecs.open_binary_input(shard_file) as shard:
+                    shard.read(len(opening))
+                    pending = b''
+                    shard_items_written = False
+                    while True:
+                        chunk = shard.read(self.buffer_size)
+                        if not chunk:
+                            break
+                        pending += chunk
+                        if len(pending) > len(closing):
+                            if not shard_items_written:
+                                output.write(separator if items_written else opening)
+                                shard_items_written = items_written = True
+                            output.write(pending[:-len(closing)])
+                            pending = pending[-len(closing):]
+            output.write(closing if items_written else b'[]')
+
+
+class ColumnarSink(ExportSink):
+    """
+    Writes the exported rows to a columnar binary file (see utils/columnarFormat.py), with the title
+    and the email domains dictionary-encoded. Read it back with FileManager.read_columnar.
+    """
+    appendable = False
+
+    def __init__(self, output_file, encodings=None, buffer_size=1024 * 1024):
+        """
+        :param output_file: The path of the columnar file to write to
+        :param encodings: Dictionary mapping column names to encodings, columnarFormat.DATA_COLUMN_ENCODINGS by default
+        :param buffer_size: Size in bytes of the file copy buffer
+        """
+        super().__init__(output_file, buffer_size)
+        self.encodings = encodings
+        self.writer = None
+
+    def open(self, headers):
+        self.headers = headers
+        self.writer = columnarFormat.ColumnarWriter(self.output_file, headers, self.encodings, self.buffer_size)
+
+    def write(self, rows):
+        self.writer.write(rows)
+
+    def close(self):
+        if self.writer:
+            self.writer.close()
+            self.writer = None
+
+    def merge(self, shard_files, batch_size=10000):
+        # The dictionaries differ from one shard to the other, so the rows are encoded again
+        writer = None
+        for shard_file in shard_files:
+            with columnarFormat.ColumnarFile(shard_file) as shard:
+                if writer is None:
+                    writer = columnarFormat.ColumnarWriter(self.output_file, shard.column_names, self.encodings,
+                                                           self.buffer_size)
+                rows = shard.iter_rows()
+                while True:
+                    batch = list(itertools.islice(rows, batch_size))
+                    if not batch:
+                        break
+                    writer.write(batch)
+        if writer is not None:
+            writer.close()
+
+
+class ConnectionPool:
+    """
+    Hands out one read connection per thread. Used by DatabaseManager in pool mode,
+    where the writes go through the single writer connection of the manager.
+    """
     def __init__(self, db_file):
+        """
+        :param db_file: database file
+        """
+        self.db_file = db_file
+        self.local = threading.local()
+        self.connections = []
+        self.lock = threading.Lock()
+
+    def get_connection(self):
+        """
+        Get the read connection of the calling thread, opening it on first use.
+        :return: Connection object
+        """
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            # Closed from the thread calling close_all, hence check_same_thread=False
+            conn = sqlite3.connect(self.db_file, check_same_thread=False)
+            metrics.instrument_connection(conn)
+            self.local.conn = conn
+            with self.lock:
+                self.connections.append(conn)
+        return conn
+
+    def close_all(self):
+        """
+        Close the read connections of every thread.
+        :return: None
+        """
+        with self.lock:
+            for conn in self.connections:
+                conn.close()
+            self.connections = []
+        self.local = threading.local()
+
+
+class DatabaseManager:
+    def __init__(self, db_file, use_pool=False, read_only=False, in_memory=False, result_cache_size=None):
         """
         Initialize the DatabaseManager with the database file.
         :param db_file: database file
+        :param use_pool: Share the manager across threads: every thread reads through its own connection,
+                         the writes are serialized through a single writer connection and the database is
+                         switched to WAL so the readers never block the writer. Not for ':memory:' databases.
+        :param read_only: Open the database file in read-only mode. With in_memory, the in-memory database
+                          can be changed but is never written back.
+        :param in_memory: Load db_file (if it exists) into an in-memory database with the SQLite backup API
+                          and run every operation against it, without disk I/O. save() writes it back to
+                          db_file, and so does close_connection. Not with use_pool.
+        :param result_cache_size: Keep up to this many results (CSV and JSON exports, report aggregates) in a
+                                  result cache, reused as long as the table is unchanged. None disables it.
         """
+        if in_memory and use_pool:
+            raise ValueError("An in-memory database can't be shared through the connection pool")
         self.db_file = db_file
+        self.use_pool = use_pool
+        self.read_only = read_only
+        self.in_memory = in_memory
+        self.saved_version = None
+        self.result_cache = resultCache.ResultCache(result_cache_size) if result_cache_size else None
+        self.fingerprint = None
         logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
         self.logger = logging.getLogger(__name__)
+        self.write_lock = threading.RLock()
+        self.pool = None
         self.conn = self.create_connection()
+        if self.use_pool and self.conn:
+            self.pool = ConnectionPool(self.db_file)
 
     def create_connection(self):
         """
@@ -21,20 +372,160 @@ class DatabaseManager:
         :return: Connection object or None
         """
         try:
-            conn = sqlite3.connect(self.db_file)
+            if self.use_pool:
+                # The writer connection is shared by the threads, the write lock serializes its use
+                conn = sqlite3.connect(self.db_file, check_same_thread=False)
+                conn.execute("PRAGMA journal_mode = WAL").fetchall()
+            elif self.in_memory:
+                conn = sqlite3.connect(':memory:')
+                if os.path.exists(self.db_file):
+                    file_conn = sqlite3.connect(self._get_read_only_uri(), uri=True)
+                    try:
+                        file_conn.backup(conn)
+                    finally:
+                        file_conn.close()
+                self.saved_version = self._get_version(conn)
+            elif self.read_only:
+                conn = sqlite3.connect(self._get_read_only_uri(), uri=True)
+            else:
+                conn = sqlite3.connect(self.db_file)
+            metrics.instrument_connection(conn)
             self.logger.info(f"Connected to the database: {self.db_file}")
             return conn
         except Error as e:
             self.logger.error(f"Error creating connection to database: {e}")
             return None
 
+    def _get_read_only_uri(self):
+        """
+        :return: URI opening db_file in read-only mode
+        """
+        import pathlib  # Imported here, only the read-only connections need it
+        return f"{pathlib.Path(os.path.abspath(self.db_file)).as_uri()}?mode=ro"
+
+    @staticmethod
+    def _get_version(conn):
+        """
+        :return: What changes with every write on the connection: its number of changed rows and the schema version
+        """
+        return conn.total_changes, conn.execute("PRAGMA schema_version").fetchone()[0]
+
+    def get_fingerprint(self):
+        """
+        Get the fingerprint of the current state of the database: PRAGMA data_version, which changes with the
+        commits of the other connections, the rows changed and the schema version of this connection, and the
+        max id and the row count of the 'data' table. The last two are only queried again when one of the
+        others changed, so fingerprinting an unchanged database takes constant time.
+        :return: Tuple identifying the state of the database
+        """
+        with self.write_lock:
+            version = (self.conn.execute("PRAGMA data_version").fetchone()[0],) + self._get_version(self.conn)
+        fingerprint = self.fingerprint
+        if fingerprint is None or fingerprint[:3] != version:
+            cursor = self.get_read_connection().cursor()
+            max_id, row_count = cursor.execute("SELECT COALESCE(MAX(id), 0), COUNT(*) FROM data").fetchone()
+            fingerprint = self.fingerprint = version + (max_id, row_count)
+        return fingerprint
+
+    def get_cached_result(self, key, compute):
+        """
+        Get a result computed from the database, from the result cache if the database is unchanged since it
+        was computed. Without a result cache, the result is always computed.
+        :param key: Hashable key of the result
+        :param compute: Function computing the result, a None result (an error) is not cached
+        :return: The result
+        """
+        if self.result_cache is None:
+            return compute()
+        try:
+            fingerprint = self.get_fingerprint()
+        except Error as e:
+            self.logger.error(f"Error fingerprinting the database: {e}")
+            return compute()
+        value = self.result_cache.get(key, fingerprint)
+        if value is not resultCache.MISSING:
+            metrics.increment('result_cache_requests_total', result='hit')
+            return value
+        metrics.increment('result_cache_requests_total', result='miss')
+        value = compute()
+        if value is not None:
+            self.result_cache.put(key, fingerprint, value)
+        return value
+
+    def _export_cached(self, key, sink, batch_size):
+        """
+        Export the 'data' table to a single sink. With a result cache, the file written by the same export
+        (same key) is reused if the database and the file are unchanged since: returned as is when it is the
+        sink output, copied otherwise.
+        :return: Number of rows exported
+        """
+        if self.result_cache is None:
+            return self.export([sink], batch_size)
+        fingerprint = self.get_fingerprint()
+        entry = self.result_cache.get(key, fingerprint)
+        if entry is not resultCache.MISSING:
+            row_count, signature = entry
+            if signature is not None and resultCache.get_file_signature(signature[0]) == signature:
+                try:
+                    if signature[0] != os.path.abspath(sink.output_file):
+                        shutil.copyfile(signature[0], sink.output_file)
+                    metrics.increment('result_cache_requests_total', result='hit')
+                    self.logger.info(f"Data exported to {sink.output_file} from the result cache.")
+                    return row_count
+                except OSError as e:
+                    # E.g. the cached file was deleted since, export the table again
+                    self.logger.error(f"Error copying the cached export {signature[0]}: {e}")
+                    self.result_cache.discard(key)
+        metrics.increment('result_cache_requests_total', result='miss')
+        row_count = self.export([sink], batch_size)
+        self.result_cache.put(key, fingerprint, (row_count, resultCache.get_file_signature(sink.output_file)))
+        return row_count
+
+    @metrics.timed('database_operation_seconds')
+    def save(self, pages=-1):
+        """
+        Write the in-memory database back to db_file with the SQLite backup API. The copy runs in a single
+        write transaction of db_file, so other connections and a crash see either the previous or the new
+        content, never a mix of both. Nothing is written if the database is unchanged since the last save.
+        :param pages: Number of pages copied per backup step, -1 to copy all of them in a single step
+        :return: True if the database file is up to date, None on error
+        """
+        if not self.in_memory or self.read_only:
+            self.logger.error("Only a writable in-memory database can be saved")
+            return None
+        try:
+            with self.write_lock:
+                version = self._get_version(self.conn)
+                if version == self.saved_version and os.path.exists(self.db_file):
+                    return True
+                start_time = time.perf_counter()
+                self.conn.commit()
+                file_conn = sqlite3.connect(self.db_file)
+                try:
+                    self.conn.backup(file_conn, pages=pages, sleep=0)
+                finally:
+                    file_conn.close()
+                self.saved_version = version
+            self.logger.info(f"Database saved to {self.db_file} in {time.perf_counter() - start_time:.3f}s.")
+            return True
+        except Error as e:
+            self.logger.error(f"Error saving the database to {self.db_file}: {e}")
+
+    def get_read_connection(self):
+        """
+        Get the connection to read with: the connection of the calling thread in pool mode, otherwise conn.
+        :return: Connection object
+        """
+        if self.pool:
+            return self.pool.get_connection()
+        return self.conn
+
     def create_table(self):
         """
         Create the 'data' table in the database.
         :return: None
         """
         try:
-            cursor = self.conn.cursor()
             query = '''
             CREATE TABLE IF NOT EXISTS data (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -44,11 +535,45 @@ class DatabaseManager:
                 title TEXT NOT NULL
             )
             '''
-            cursor.execute(query)
+            with self.write_lock:
+                self.conn.cursor().execute(query)
             self.logger.info("Table 'data' created successfully or already exists.")
         except Error as e:
             self.logger.error(f"Error creating new table in database: {e}")
 
+    def create_indexes(self):
+        """
+        Create the secondary indexes of the 'data' table (email, zip_code, title and company).
+        For bulk loads, create them after the load: maintaining them slows the inserts down.
+        :return: None
+        """
+        try:
+            with self.write_lock:
+                cursor = self.conn.cursor()
+                for index_name, expression in DATA_INDEXES.items():
+                    cursor.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON data ({expression})")
+                cursor.execute("ANALYZE data")
+                self.conn.commit()
+            self.logger.info("Indexes on table 'data' created successfully or already exist.")
+        except Error as e:
+            self.logger.error(f"Error creating indexes in database: {e}")
+
+    def drop_indexes(self):
+        """
+        Drop the secondary indexes of the 'data' table.
+        :return: None
+        """
+        try:
+            with self.write_lock:
+                cursor = self.conn.cursor()
+                for index_name in DATA_INDEXES:
+                    cursor.execute(f"DROP INDEX IF EXISTS {index_name}")
+                self.conn.commit()
+            self.logger.info("Indexes on table 'data' dropped successfully.")
+        except Error as e:
+            self.logger.error(f"Error dropping indexes in database: {e}")
+
+    @metrics.timed('database_operation_seconds')
     def insert_data(self, data):
         """
         Insert records into the 'data' table.
@@ -56,67 +581,774 @@ class DatabaseManager:
         :return: None
         """
         try:
-            cursor = self.conn.cursor()
-            cursor.executemany('''
-            INSERT INTO data (name, email, zip_code, title)
-            VALUES (?, ?, ?, ?)
-            ''', data)
-            self.conn.commit()
+            with self.write_lock:
+                cursor = self.conn.cursor()
+                cursor.executemany('''
+                INSERT INTO data (name, email, zip_code, title)
+                VALUES (?, ?, ?, ?)
+                ''', data)
+                self.conn.commit()
+            metrics.increment('rows_inserted_total', len(data))
             self.logger.info(f"{len(data)} records inserted successfully.")
         except Error as e:
             self.logger.error(f"Error inserting new table in database: {e}")
 
-    def export_to_csv(self, output_file):
+    @metrics.timed('database_operation_seconds')
+    def bulk_insert(self, records, chunk_size=100000, pragmas=None):
+        """
+        Insert records into the 'data' table from any iterable, committing every chunk_size records.
+        Only one chunk is held in memory at a time, so generators of any size can be loaded.
+        If an error occurs, the chunks committed before it stay in the table.
+        :param records: Iterable of (name, email, zip_code, title) tuples
+        :param chunk_size: Number of records inserted per transaction
+        :param pragmas: Dictionary of PRAGMA settings applied for the duration of the load and then
+                        restored, e.g. BULK_LOAD_PRAGMAS. None keeps the current settings.
+        :return: Number of records inserted
+        """
+        with self.write_lock:
+            return self._bulk_insert(records, chunk_size, pragmas)
+
+    def _bulk_insert(self, records, chunk_size, pragmas):
+        """
+        Body of bulk_insert, called with the write lock held.
+        """
+        start_time = time.perf_counter()
+        row_count = 0
+        previous_pragmas = {}
+        try:
+            for name, value in (pragmas or {}).items():
+                previous_pragmas[name] = self._set_pragma(name, value)
+
+            cursor = self.conn.cursor()
+            records = iter(records)
+            while True:
+                chunk = list(itertools.islice(records, chunk_size))
+                if not chunk:
+                    break
+                cursor.executemany('''
+                INSERT INTO data (name, email, zip_code, title)
+                VALUES (?, ?, ?, ?)
+                ''', chunk)
+                self.conn.commit()
+                row_count += len(chunk)
+                metrics.increment('rows_inserted_total', len(chunk))
+
+            self._log_throughput(f"{row_count} records inserted successfully.", row_count, start_time)
+            return row_count
+        except (Error, ValueError) as e:
+            self.conn.rollback()
+            self.logger.error(f"Error inserting records in bulk after {row_count} records: {e}")
+        finally:
+            for name, value in previous_pragmas.items():
+                try:
+                    self._set_pragma(name, value)
+                except Error as e:
+                    self.logger.error(f"Error restoring PRAGMA {name}: {e}")
+
+    @metrics.timed('database_operation_seconds')
+    def bulk_upsert(self, records, key='email', on_conflict='update', chunk_size=100000, pragmas=None):
+        """
+        Insert records into the 'data' table, de-duplicated on a uniqueness key. A record whose key is
+        already in the table updates that row (on_conflict='update') or is skipped (on_conflict='ignore');
+        a record identical to that row is skipped without a write. The records are inserted in chunks
+        with INSERT ... ON CONFLICT, against a UNIQUE index on the key built for the duration of the load and
+        dropped after it, so insert_data and bulk_insert keep accepting repeated keys. Building the index fails
+        if the table holds duplicates: remove them with deduplicate first. Since the index is built on every
+        call, load the records with a single call rather than one call per chunk.
+        Updated rows keep their id, so export_incremental doesn't export them again; the cached report
+        statistics are dropped.
+        :param records: Iterable of (name, email, zip_code, title) tuples
+        :param key: Column, or tuple of columns, identifying a record
+        :param on_conflict: 'update' or 'ignore'
+        :param chunk_size: Number of records upserted per transaction
+        :param pragmas: Dictionary of PRAGMA settings applied for the duration of the load, see bulk_insert
+        :return: Dictionary of the numbers of records 'inserted', 'updated' and 'skipped'
+        """
+        with self.write_lock:
+            return self._bulk_upsert(records, key, on_conflict, chunk_size, pragmas)
+
+    def _bulk_upsert(self, records, key, on_conflict, chunk_size, pragmas):
+        """
+        Body of bulk_upsert, called with the write lock held.
+        """
+        start_time = time.perf_counter()
+        counts = {'inserted': 0, 'updated': 0, 'skipped': 0}
+        previous_pragmas = {}
+        index_name = None
+        try:
+            key_columns = self._get_key_columns(key)
+            if on_conflict not in UPSERT_MODES:
+                raise ValueError(f"Unknown on_conflict mode: {on_conflict}")
+            for name, value in (pragmas or {}).items():
+                previous_pragmas[name] = self._set_pragma(name, value)
+
+            cursor = self.conn.cursor()
+            index_name = f"idx_data_unique_{'_'.join(key_columns)}"
+            try:
+                cursor.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {index_name} ON data ({', '.join(key_columns)})")
+            except sqlite3.IntegrityError as e:
+                index_name = None
+                raise ValueError(f"the table holds duplicate keys, remove them with deduplicate first ({e})")
+
+            query = (f"INSERT INTO data ({', '.join(DATA_COLUMNS)}) VALUES ({', '.join('?' * len(DATA_COLUMNS))}) "
+                     f"ON CONFLICT ({', '.join(key_columns)}) ")
+            value_columns = [column for column in DATA_COLUMNS if column not in key_columns]
+            if on_conflict == 'ignore' or not value_columns:
+                query += "DO NOTHING"
+            else:
+                # Rows equal to the record are left alone
+                query += (f"DO UPDATE SET {', '.join(f'{column} = excluded.{column}' for column in value_columns)} "
+                          f"WHERE ({', '.join(f'data.{column}' for column in value_columns)}) "
+                          f"IS NOT ({', '.join(f'excluded.{column}' for column in value_columns)})")
+
+            max_id = cursor.execute("SELECT COALESCE(MAX(id), 0) FROM data").fetchone()[0]
+            records = iter(records)
+            while True:
+                chunk = list(itertools.islice(records, chunk_size))
+                if not chunk:
+                    break
+                total_changes = self.conn.total_changes
+                cursor.executemany(query, chunk)
+                changes = self.conn.total_changes - total_changes
+                # The inserted rows get ids above the previous maximum, the other changed rows were updated
+                inserted, max_id = cursor.execute("SELECT COUNT(*), COALESCE(MAX(id), ?) FROM data WHERE id > ?",
+                                                  (max_id, max_id)).fetchone()
+                updated = changes - inserted
+                if updated:
+                    self._clear_cache_entries(cursor)
+                self.conn.commit()
+                counts['inserted'] += inserted
+                counts['updated'] += updated
+                counts['skipped'] += len(chunk) - changes
+                metrics.increment('rows_inserted_total', inserted)
+                metrics.increment('rows_updated_total', updated)
+                metrics.increment('rows_skipped_total', len(chunk) - changes)
+
+            self._log_throughput(f"{counts['inserted']} records inserted, {counts['updated']} updated and "
+                                 f"{counts['skipped']} skipped successfully.", sum(counts.values()), start_time)
+            return counts
+        except (Error, ValueError) as e:
+            self.conn.rollback()
+            self.logger.error(f"Error upserting records in bulk after {sum(counts.values())} records: {e}")
+        finally:
+            # The unique index only lives for the load, the other writes may repeat keys
+            if index_name is not None:
+                try:
+                    self.conn.execute(f"DROP INDEX IF EXISTS {index_name}")
+                    self.conn.commit()
+                except Error as e:
+                    self.logger.error(f"Error dropping the index {index_name}: {e}")
+            for name, value in previous_pragmas.items():
+                try:
+                    self._set_pragma(name, value)
+                except Error as e:
+                    self.logger.error(f"Error restoring PRAGMA {name}: {e}")
+
+    def deduplicate(self, key='email', keep='last'):
+        """
+        Delete the records whose key appears more than once in the 'data' table, keeping one per key.
+        The cached report statistics are dropped if records are deleted.
+        :param key: Column, or tuple of columns, identifying a record
+        :param keep: Keep the 'last' (highest id) or the 'first' record of each key
+        :return: Number of records deleted
+        """
+        try:
+            key_columns = self._get_key_columns(key)
+            if keep not in ('first', 'last'):
+                raise ValueError(f"Unknown keep mode: {keep}")
+            aggregate = 'MAX' if keep == 'last' else 'MIN'
+            with self.write_lock:
+                cursor = self.conn.cursor()
+                cursor.execute(f"DELETE FROM data WHERE id NOT IN "
+                               f"(SELECT {aggregate}(id) FROM data GROUP BY {', '.join(key_columns)})")
+                deleted = cursor.rowcount
+                if deleted:
+                    self._clear_cache_entries(cursor)
+                self.conn.commit()
+            self.logger.info(f"{deleted} duplicate records deleted successfully.")
+            return deleted
+        except (Error, ValueError) as e:
+            self.logger.error(f"Error deleting duplicate records: {e}")
+
+    @staticmethod
+    def _get_key_columns(key):
+        """
+        Validate a uniqueness key.
+        :param key: Column, or tuple of columns
+        :return: List of the key columns
+        """
+        key_columns = [key] if isinstance(key, str) else list(key)
+        if not key_columns or any(column not in DATA_COLUMNS for column in key_columns):
+            raise ValueError(f"Invalid uniqueness key: {key}")
+        return key_columns
+
+    def _clear_cache_entries(self, cursor):
+        """
+        Delete the entries of the 'cache' side table, in the current transaction.
+        The cached report statistics only follow the new ids, they are stale once records change.
+        """
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'cache'")
+        if cursor.fetchone() is not None:
+            cursor.execute("DELETE FROM cache")
+
+    def _set_pragma(self, name, value):
+        """
+        Set a PRAGMA on the connection.
+        :param name: Name of the PRAGMA, one of the keys of BULK_LOAD_PRAGMAS
+        :param value: New value of the PRAGMA
+        :return: The previous value of the PRAGMA
+        """
+        if name not in BULK_LOAD_PRAGMAS:
+            raise ValueError(f"Unsupported PRAGMA: {name}")
+        if not str(value).lstrip('-').isalnum():
+            raise ValueError(f"Invalid value for PRAGMA {name}: {value}")
+        cursor = self.conn.cursor()
+        previous_value = cursor.execute(f"PRAGMA {name}").fetchone()[0]
+        cursor.execute(f"PRAGMA {name} = {value}").fetchall()
+        return previous_value
+
+    @metrics.timed('database_operation_seconds')
+    def export(self, sinks, batch_size=1000, use_writer_thread=False, queue_size=4, after_id=None, up_to_id=None):
+        """
+        Export the data from the 'data' table to several sinks with a single table scan.
+        Each batch of rows fetched from the cursor is handed to every sink in turn.
+        :param sinks: List of ExportSink objects (CsvSink, JsonSink, ...)
+        :param batch_size: Number of rows fetched from the cursor at a time
+        :param use_writer_thread: Encode and write the batches on a separate thread, overlapping SQLite reads
+        :param queue_size: Maximum number of batches waiting for the writer thread
+        :param after_id: Only export the rows whose id is greater than after_id
+        :param up_to_id: Only export the rows whose id is lower than or equal to up_to_id
+        :return: Number of rows exported
+        """
+        start_time = time.perf_counter()
+        cursor = self.get_read_connection().cursor()
+        if after_id is None and up_to_id is None:
+            cursor.execute("SELECT * FROM data")
+        else:
+            # Range scan on the primary key
+            query = "SELECT * FROM data WHERE id > ? AND id <= ? ORDER BY id"
+            cursor.execute(query, (after_id or 0, up_to_id if up_to_id is not None else sys.maxsize))
+        headers = [description[0] for description in cursor.description]
+        row_count = 0
+
+        opened_sinks = []
+        try:
+            for sink in sinks:
+                sink.open(headers)
+                opened_sinks.append(sink)
+
+            if use_writer_thread:
+                row_count = self._export_on_writer_thread(cursor, sinks, batch_size, queue_size)
+            else:
+                for rows in self._fetch_batches(cursor, batch_size):
+                    for sink in sinks:
+                        sink.write(rows)
+                    row_count += len(rows)
+        finally:
+            for sink in opened_sinks:
+                sink.close()
+
+        if metrics.REGISTRY.enabled:
+            for sink in sinks:
+                metrics.increment('rows_exported_total', row_count, sink=type(sink).__name__)
+                metrics.increment('bytes_written_total', os.path.getsize(sink.output_file), sink=type(sink).__name__)
+        outputs = ', '.join(sink.output_file for sink in sinks)
+        self._log_throughput(f"Data exported to {outputs} successfully.", row_count, start_time)
+        return row_count
+
+    @metrics.timed('database_operation_seconds')
+    def export_parallel(self, sinks, workers=None, partitions=None, merge=True, batch_size=1000):
+        """
+        Export the data from the 'data' table with several processes. The table is split into id ranges,
+        each range is exported by a worker process with its own read-only connection to shard files
+        named after the sink outputs (data.part0001.csv, ...), which are then concatenated in id order.
+        Uncommitted changes are not exported, and the database can't be ':memory:'. With in_memory, the
+        database is saved first so that the worker processes read its current content from db_file.
+        :param sinks: List of ExportSink objects (CsvSink, JsonSink, ...)
+        :param workers: Number of worker processes, None for the number of CPUs
+        :param partitions: Number of id ranges, None for one per worker
+        :param merge: Concatenate the shard files into the sink outputs and delete them. With False the
+                      shard files are left as a partitioned output set
+        :param batch_size: Number of rows fetched from the cursor at a time
+        :return: Tuple of (number of rows exported, list of the shard files of each sink, empty when merged)
+        """
+        try:
+            start_time = time.perf_counter()
+            if self.in_memory and not self.read_only and not self.save():
+                return None
+            workers = workers or os.cpu_count() or 1
+            partitions = partitions or workers
+            cursor = self.get_read_connection().cursor()
+            min_id, max_id = cursor.execute("SELECT MIN(id), MAX(id) FROM data").fetchone()
+            min_id, max_id = (min_id or 1), (max_id or 0)
+
+            # Split [min_id, max_id] into ranges (after_id, up_to_id] of about the same width
+            width = max(1, -(-(max_id - min_id + 1) // partitions))
+            bounds = list(range(min_id - 1, max_id, width)) + [max_id]
+            ranges = list(zip(bounds[:-1], bounds[1:])) or [(0, 0)]
+
+            shard_files = [[] for _ in sinks]
+            tasks = []
+            for index, (after_id, up_to_id) in enumerate(ranges, start=1):
+                shard_sinks = []
+                for sink, files in zip(sinks, shard_files):
+                    shard_sink = copy.copy(sink)
+                    base, extension = os.path.splitext(sink.output_file)
+                    shard_sink.output_file = f"{base}.part{index:04d}{extension}"
+                    shard_sink.append = False
+                    shard_sinks.append(shard_sink)
+                    files.append(shard_sink.output_file)
+                tasks.append((self.db_file, shard_sinks, after_id, up_to_id, batch_size))
+
+            from concurrent.futures import ProcessPoolExecutor  # Imported here, it is slow to import
+            with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+                row_count = sum(executor.map(export_partition, *zip(*tasks)))
+
+            if merge:
+                for sink, files in zip(sinks, shard_files):
+                    sink.merge(files)
+                    for shard_file in files:
+                        os.remove(shard_file)
+                shard_files = [[] for _ in sinks]
+
+            outputs = ', '.join(sink.output_file for sink in sinks)
+            self._log_throughput(f"Data exported to {outputs} in {len(ranges)} partitions successfully.",
+                                 row_count, start_time)
+            return row_count, shard_files
+        except (Error, OSError) as e:
+            self.logger.error(f"Error exporting in parallel: {e}")
+
+    @metrics.timed('database_operation_seconds')
+    def export_incremental(self, sinks, checkpoint_file, delta_dir=None, batch_size=1000):
+        """
+        Export only the rows added since the previous incremental export, appending them to the sinks.
+        The id of the last exported row and the size of each output are stored in checkpoint_file after
+        every run; an output that grew past its recorded size (an interrupted run) is truncated back first.
+        :param sinks: List of ExportSink objects created with append=True (CsvSink, NDJSON JsonSink)
+        :param checkpoint_file: Path of the JSON checkpoint file, created on the first run
+        :param delta_dir: If given, the new rows are also written to one delta file per sink in this
+                          directory (created if needed), named after the sink output and the exported id range
+        :param batch_size: Number of rows fetched from the cursor at a time
+        :return: Number of rows exported
+        """
+        try:
+            for sink in sinks:
+                if not sink.append:
+                    raise ValueError(f"Sink for {sink.output_file} must be created with append=True")
+
+            checkpoint = {'last_id': 0, 'output_sizes': {}}
+            if os.path.exists(checkpoint_file):
+                with open(checkpoint_file, 'r') as file:
+                    checkpoint = json.load(file)
+            last_id = checkpoint['last_id']
+
+            # Rows inserted while exporting are left for the next run
+            max_id = self.get_read_connection().execute("SELECT MAX(id) FROM data").fetchone()[0] or 0
+            if max_id <= last_id:
+                self.logger.info(f"No new rows to export since id {last_id}.")
+                return 0
+
+            for sink in sinks:
+                recorded_size = checkpoint['output_sizes'].get(sink.output_file)
+                if recorded_size is not None and os.path.exists(sink.output_file) \
+                        and os.path.getsize(sink.output_file) > recorded_size:
+                    os.truncate(sink.output_file, recorded_size)
+
+            delta_sinks = []
+            if delta_dir:
+                os.makedirs(delta_dir, exist_ok=True)
+                for sink in sinks:
+                    delta_sink = copy.copy(sink)
+                    name, extension = os.path.splitext(os.path.basename(sink.output_file))
+                    delta_sink.output_file = os.path.join(delta_dir, f"{name}_{last_id + 1}_{max_id}{extension}")
+                    delta_sink.append = False
+                    delta_sinks.append(delta_sink)
+
+            row_count = self.export(sinks + delta_sinks, batch_size, after_id=last_id, up_to_id=max_id)
+
+            # Replace the checkpoint atomically, so a crash leaves the previous one in place
+            checkpoint = {
+                'last_id': max_id,
+                'output_sizes': {sink.output_file: os.path.getsize(sink.output_file) for sink in sinks},
+            }
+            temporary_file = checkpoint_file + '.tmp'
+            with open(temporary_file, 'w') as file:
+                json.dump(checkpoint, file)
+            os.replace(temporary_file, checkpoint_file)
+            return row_count
+        except (Error, OSError, ValueError) as e:
+            self.logger.error(f"Error exporting incrementally: {e}")
+
+    def _export_on_writer_thread(self, cursor, sinks, batch_size, queue_size):
+        """
+        Fetch the batches on the calling thread and write them to the sinks on a writer thread.
+        :return: Number of rows exported
+        """
+        batches = queue.Queue(maxsize=queue_size)
+        errors = []
+
+        def write_batches():
+            while True:
+                rows = batches.get()
+                if rows is None:
+                    break
+                if errors:
+                    continue  # Keep draining so the reader never blocks on a full queue
+                try:
+                    for sink in sinks:
+                        sink.write(rows)
+                except Exception as e:
+                    errors.append(e)
+
+        writer_thread = threading.Thread(target=write_batches, name="export-writer")
+        writer_thread.start()
+        row_count = 0
+        try:
+            for rows in self._fetch_batches(cursor, batch_size):
+                if errors:
+                    break
+                batches.put(rows)
+                row_count += len(rows)
+        finally:
+            batches.put(None)
+            writer_thread.join()
+        if errors:
+            raise errors[0]
+        return row_count
+
+    @metrics.timed('database_operation_seconds')
+    def export_to_csv(self, output_file, batch_size=1000, buffer_size=1024 * 1024, compression=None,
+                      compress_on_thread=False):
         """
         Export the data from the 'data' table to a CSV file.
+        Rows are streamed from the cursor in batches, so memory stays flat whatever the table size.
+        With a result cache, the file of the previous export is reused while the table is unchanged.
         :param output_file: The path of the CSV file to write to
-        :return: None
+        :param batch_size: Number of rows fetched from the cursor at a time
+        :param buffer_size: Size in bytes of the file write buffer
+        :param compression: 'gzip', 'zstd' or 'lz4' to compress the file as it is written, None to write it uncompressed
+        :param compress_on_thread: Compress on a separate thread while the next rows are encoded
+        :return: Number of rows exported
         """
         try:
-            cursor = self.conn.cursor()
-            query = "SELECT * FROM data"
-            cursor.execute(query)
-            rows = cursor.fetchall()
-            headers = [description[0] for description in cursor.description]
-            
-            with open(output_file, 'w', newline='') as file:
-                writer = csv.writer(file)
-                writer.writerow(headers)  # Write headers
-                writer.writerows(rows)
-            
-            self.logger.info(f"Data exported to {output_file} successfully.")
-        except Error as e:
+            sink = CsvSink(output_file, buffer_size, compression=compression, compress_on_thread=compress_on_thread)
+            return self._export_cached(('export_to_csv', compression), sink, batch_size)
+        except (Error, ValueError) as e:
             self.logger.error(f"Error exporting to CSV file: {e}")
 
-    def export_to_json(self, output_file):
+    @metrics.timed('database_operation_seconds')
+    def export_to_json(self, output_file, json_format='array', indent=4, batch_size=1000, buffer_size=1024 * 1024,
+                       compression=None, compress_on_thread=False):
         """
         Export the data from the 'data' table to a JSON file.
+        Rows are encoded as the cursor produces them, the table is never held in memory.
+        With a result cache, the file of the previous export is reused while the table is unchanged.
         :param output_file: The path of the JSON file to write to
+        :param json_format: 'array' to write a JSON array, 'ndjson' to write one JSON object per line
+        :param indent: Indentation of the JSON array, None for a compact array (ignored for 'ndjson')
+        :param batch_size: Number of rows fetched from the cursor at a time
+        :param buffer_size: Size in bytes of the file write buffer
+        :param compression: 'gzip', 'zstd' or 'lz4' to compress the file as it is written, None to write it uncompressed
+        :param compress_on_thread: Compress on a separate thread while the next rows are encoded
+        :return: Number of rows exported
+        """
+        try:
+            sink = JsonSink(output_file, json_format, indent, buffer_size, compression=compression,
+                            compress_on_thread=compress_on_thread)
+            return self._export_cached(('export_to_json', json_format, indent, compression), sink, batch_size)
+        except (Error, ValueError) as e:
+            self.logger.error(f"Error exporting to JSON file: {e}")
+
+    @metrics.timed('database_operation_seconds')
+    def export_to_columnar(self, output_file, batch_size=1000, buffer_size=1024 * 1024):
+        """
+        Export the data from the 'data' table to a columnar binary file.
+        Every batch of rows is encoded column by column, the table is never held in memory.
+        :param output_file: The path of the columnar file to write to
+        :param batch_size: Number of rows fetched from the cursor at a time
+        :param buffer_size: Size in bytes of the file copy buffer
+        :return: Number of rows exported
+        """
+        try:
+            return self.export([ColumnarSink(output_file, buffer_size=buffer_size)], batch_size)
+        except (Error, OSError, ValueError) as e:
+            self.logger.error(f"Error exporting to columnar file: {e}")
+
+    def query(self, filters=None, columns=None, order_by='id', descending=False, after=None, limit=None):
+        """
+        Query the 'data' table. Filters on email, zip_code, title and company use the secondary indexes.
+        The rows are ordered by order_by then id, which makes the order unique for keyset pagination:
+        pass the key of the last row of a page as after to get the next page.
+        :param filters: Dictionary mapping a column of QUERY_COLUMNS to a value, or to a list of accepted values
+        :param columns: List of the columns to return, None for all the columns of the table
+        :param order_by: Column of QUERY_COLUMNS to order by
+        :param descending: Order from the largest to the smallest value
+        :param after: Key of the last row already read: its id when ordering by id,
+                      otherwise the tuple (order_by value, id)
+        :param limit: Maximum number of rows to return, None for no limit
+        :return: List of dictionaries, one per row
+        """
+        try:
+            columns = columns or ['id', 'name', 'email', 'zip_code', 'title']
+            for column in list(columns) + list(filters or {}) + [order_by]:
+                if column not in QUERY_COLUMNS:
+                    raise ValueError(f"Unknown column: {column}")
+
+            conditions = []
+            parameters = []
+            for column, value in (filters or {}).items():
+                if isinstance(value, (list, tuple, set)):
+                    value = list(value)
+                    conditions.append(f"{QUERY_COLUMNS[column]} IN ({', '.join('?' * len(value))})")
+                    parameters.extend(value)
+                else:
+                    conditions.append(f"{QUERY_COLUMNS[column]} = ?")
+                    parameters.append(value)
+
+            direction = 'DESC' if descending else 'ASC'
+            comparison = '<' if descending else '>'
+            if order_by == 'id':
+                order_keys = ['id']
+                after = None if after is None else (after,)
+            else:
+                order_keys = [QUERY_COLUMNS[order_by], 'id']
+            if after is not None:
+                # Row value comparison, e.g. (title, id) > (?, ?)
+                conditions.append(f"({', '.join(order_keys)}) {comparison} ({', '.join('?' * len(order_keys))})")
+                parameters.extend(after)
+
+            query = f"SELECT {', '.join(f'{QUERY_COLUMNS[column]} AS {column}' for column in columns)} FROM data"
+            if conditions:
+                query += " WHERE " + " AND ".join(conditions)
+            query += " ORDER BY " + ", ".join(f"{key} {direction}" for key in order_keys)
+            if limit is not None:
+                query += " LIMIT ?"
+                parameters.append(limit)
+
+            cursor = self.get_read_connection().cursor()
+            cursor.execute(query, parameters)
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        except (Error, ValueError) as e:
+            self.logger.error(f"Error querying the database: {e}")
+
+    def get_rows_after(self, last_id, limit):
+        """
+        Get the next rows of the 'data' table in id order (keyset pagination on the primary key).
+        :param last_id: Id of the last row already read, 0 to start from the beginning
+        :param limit: Maximum number of rows to return
+        :return: List of row tuples
+        """
+        try:
+            cursor = self.get_read_connection().cursor()
+            cursor.execute("SELECT * FROM data WHERE id > ? ORDER BY id LIMIT ?", (last_id, limit))
+            return cursor.fetchall()
+        except Error as e:
+            self.logger.error(f"Error getting rows: {e}")
+
+    def count_records(self, after_id=None, up_to_id=None):
+        """
+        Count the records of the 'data' table.
+        :param after_id: Only count the records whose id is greater than after_id
+        :param up_to_id: Only count the records whose id is lower than or equal to up_to_id
+        :return: Number of records
+        """
+        def compute():
+            try:
+                where, parameters = self._id_range_condition(after_id, up_to_id)
+                cursor = self.get_read_connection().cursor()
+                cursor.execute(f"SELECT COUNT(*) FROM data{where}", parameters)
+                return cursor.fetchone()[0]
+            except Error as e:
+                self.logger.error(f"Error counting records: {e}")
+
+        return self.get_cached_result(('count_records', after_id, up_to_id), compute)
+
+    def get_sample_records(self, limit, after_id=None, up_to_id=None):
+        """
+        Get the first records of the 'data' table.
+        :param limit: Maximum number of records to return
+        :param after_id: Only return records whose id is greater than after_id
+        :param up_to_id: Only return records whose id is lower than or equal to up_to_id
+        :return: List of dictionaries, one per record
+        """
+        def compute():
+            try:
+                where, parameters = self._id_range_condition(after_id, up_to_id)
+                cursor = self.get_read_connection().cursor()
+                cursor.execute(f"SELECT * FROM data{where} ORDER BY id LIMIT ?", parameters + [limit])
+                headers = [description[0] for description in cursor.description]
+                return [dict(zip(headers, row)) for row in cursor.fetchall()]
+            except Error as e:
+                self.logger.error(f"Error getting sample records: {e}")
+
+        return self.get_cached_result(('get_sample_records', limit, after_id, up_to_id), compute)
+
+    def get_companies(self, after_id=None, up_to_id=None):
+        """
+        Get the unique companies found in the emails, in order of first appearance.
+        :param after_id: Only look at the records whose id is greater than after_id
+        :param up_to_id: Only look at the records whose id is lower than or equal to up_to_id
+        :return: List of company names
+        """
+        def compute():
+            try:
+                where, parameters = self._id_range_condition(after_id, up_to_id)
+                cursor = self.get_read_connection().cursor()
+                cursor.execute(f"SELECT {COMPANY_EXPRESSION} AS company FROM data{where} "
+                               f"GROUP BY company ORDER BY MIN(id)", parameters)
+                return [row[0] for row in cursor.fetchall()]
+            except Error as e:
+                self.logger.error(f"Error getting companies: {e}")
+
+        return self.get_cached_result(('get_companies', after_id, up_to_id), compute)
+
+    def get_title_counts(self, after_id=None, up_to_id=None):
+        """
+        Count the records of each title, in order of first appearance.
+        :param after_id: Only count the records whose id is greater than after_id
+        :param up_to_id: Only count the records whose id is lower than or equal to up_to_id
+        :return: Dictionary mapping each title to its number of records
+        """
+        def compute():
+            try:
+                where, parameters = self._id_range_condition(after_id, up_to_id)
+                cursor = self.get_read_connection().cursor()
+                cursor.execute(f"SELECT title, COUNT(*) FROM data{where} GROUP BY title ORDER BY MIN(id)", parameters)
+                return dict(cursor.fetchall())
+            except Error as e:
+                self.logger.error(f"Error getting title counts: {e}")
+
+        return self.get_cached_result(('get_title_counts', after_id, up_to_id), compute)
+
+    def get_max_id(self):
+        """
+        Get the id of the last record of the 'data' table.
+        :return: The largest id, 0 if the table is empty
+        """
+        try:
+            cursor = self.get_read_connection().cursor()
+            cursor.execute("SELECT MAX(id) FROM data")
+            return cursor.fetchone()[0] or 0
+        except Error as e:
+            self.logger.error(f"Error getting the last id: {e}")
+
+    def get_schema(self):
+        """
+        Get the definition of the 'data' table, to detect schema changes.
+        :return: The CREATE TABLE statement of the table, None if it does not exist
+        """
+        try:
+            cursor = self.get_read_connection().cursor()
+            cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'data'")
+            row = cursor.fetchone()
+            return row[0] if row else None
+        except Error as e:
+            self.logger.error(f"Error getting the table schema: {e}")
+
+    def load_cache_entry(self, key):
+        """
+        Load a value stored in the 'cache' side table.
+        :param key: Key of the entry
+        :return: The value decoded from JSON, None if there is no entry
+        """
+        try:
+            cursor = self.get_read_connection().cursor()
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'cache'")
+            if cursor.fetchone() is None:
+                return None
+            cursor.execute("SELECT value FROM cache WHERE key = ?", (key,))
+            row = cursor.fetchone()
+            return json.loads(row[0]) if row else None
+        except Error as e:
+            self.logger.error(f"Error loading cache entry {key}: {e}")
+
+    def save_cache_entry(self, key, value):
+        """
+        Store a value in the 'cache' side table, created on first use.
+        :param key: Key of the entry
+        :param value: JSON serializable value
         :return: None
         """
         try:
-            cursor = self.conn.cursor()
-            query = "SELECT * FROM data"
-            cursor.execute(query)
-            rows = cursor.fetchall()
-            headers = [description[0] for description in cursor.description]
-            data_list = [dict(zip(headers, row)) for row in rows]
-            
-            with open(output_file, 'w') as file:
-                json.dump(data_list, file, indent=4)
-            
-            self.logger.info(f"Data exported to {output_file} successfully.")
+            with self.write_lock:
+                cursor = self.conn.cursor()
+                cursor.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+                cursor.execute("INSERT OR REPLACE INTO cache (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+                self.conn.commit()
         except Error as e:
-            self.logger.error(f"Error exporting to JSON file: {e}")
+            self.logger.error(f"Error saving cache entry {key}: {e}")
+
+    def _id_range_condition(self, after_id, up_to_id):
+        """
+        Build the WHERE clause restricting a query to an id range.
+        :return: Tuple of (WHERE clause or empty string, list of parameters)
+        """
+        conditions = []
+        parameters = []
+        if after_id is not None:
+            conditions.append("id > ?")
+            parameters.append(after_id)
+        if up_to_id is not None:
+            conditions.append("id <= ?")
+            parameters.append(up_to_id)
+        if not conditions:
+            return '', parameters
+        return " WHERE " + " AND ".join(conditions), parameters
+
+    def _fetch_batches(self, cursor, batch_size):
+        """
+        Walk an executed cursor in fetchmany batches.
+        :param cursor: Cursor on which a SELECT query has been executed
+        :param batch_size: Number of rows fetched at a time
+        :return: Generator of lists of rows
+        """
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+
+    def _log_throughput(self, message, row_count, start_time):
+        """
+        Log a message followed by the number of rows handled and the rows per second.
+        :param message: The message to log
+        :param row_count: Number of rows handled
+        :param start_time: time.perf_counter() value taken when the operation started
+        :return: None
+        """
+        elapsed = time.perf_counter() - start_time
+        rows_per_second = row_count / elapsed if elapsed > 0 else 0
+        self.logger.info(f"{message} ({row_count} rows in {elapsed:.3f}s, {rows_per_second:.0f} rows/s)")
 
     def close_connection(self):
         """
-        Close the database connection.
+        Close the database connection, saving an in-memory database to db_file first.
         :return: None
         """
         try:  
+            if self.pool:
+                self.pool.close_all()
+            if self.conn and self.in_memory and not self.read_only:
+                self.save()
             if self.conn:
                 self.conn.close()
                 self.logger.info(f"Database connection is closed successfully.")
         except Error as e:
-            self.logger.error(f"Error closing the database connection: {e}")
\ No newline at end of file
+            self.logger.error(f"Error closing the database connection: {e}")
+
+
+def export_partition(db_file, sinks, after_id, up_to_id, batch_size):
+    """
+    Export one id range of the 'data' table, in a worker process of DatabaseManager.export_parallel.
+    :param db_file: database file, opened read-only
+    :param sinks: List of ExportSink objects writing the shard files
+    :param after_id: Only export the rows whose id is greater than after_id
+    :param up_to_id: Only export the rows whose id is lower than or equal to up_to_id
+    :param batch_size: Number of rows fetched from the cursor at a time
+    :return: Number of rows exported
+    """
+    db_manager = DatabaseManager(db_file, read_only=True)
+    try:
+        return db_manager.export(sinks, batch_size, after_id=after_id, up_to_id=up_to_id)
+    finally:
+        db_manager.close_connection()
@@ -1,37 +1,160 @@
+from utils import columnarFormat
+from utils import compactRecords
+from utils import compressionCodecs
+from utils import metrics
 import csv
 import json
 import logging
+import re
+
+# Whitespace and array punctuation between the records of a JSON array or an NDJSON file
+JSON_RECORD_SEPARATORS = re.compile(r'[\s\[\],]*')
 
 class FileManager:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
         logging.basicConfig(level=logging.INFO)
 
+    @metrics.timed('file_read_seconds')
     def read_csv(self, csv_file):
         """
-        Read data from the CSV file.
+        Read data from the CSV file, decompressing it if it was exported with a compression codec.
         :param csv_file: Path to the CSV file
         :return: Data as a list of dictionaries
         """
         try:
-            with open(csv_file, mode='r') as file:
+            with compressionCodecs.open_input(csv_file) as file:
                 reader = csv.DictReader(file)
                 data = list(reader)
+            metrics.increment('file_rows_read_total', len(data), format='csv')
             return data
         except Exception as e:
             self.logger.error(f"Error reading CSV file: {e}")
             return []
 
+    @metrics.timed('file_read_seconds')
     def read_json(self, json_file):
         """
-        Read data from the JSON file.
+        Read data from the JSON file, decompressing it if it was exported with a compression codec.
         :param json_file: Path to the JSON file
         :return: Data as a list of dictionaries
         """
         try:
-            with open(json_file, mode='r') as file:
+            with compressionCodecs.open_input(json_file) as file:
                 data = json.load(file)
+            if isinstance(data, list):
+                metrics.increment('file_rows_read_total', len(data), format='json')
             return data
         except Exception as e:
             self.logger.error(f"Error reading JSON file: {e}")
             return []
+
+    def iter_csv(self, csv_file, raise_errors=False):
+        """
+        Lazily read the records of the CSV file, one at a time. Compressed files are decompressed as they are read.
+        The file_read_seconds timer of the lazy reads includes the time the caller spends on the records.
+        :param csv_file: Path to the CSV file
+        :param raise_errors: Raise a read error after logging it, instead of ending the records there
+        :return: Generator of dictionaries
+        """
+        try:
+            with metrics.timer('file_read_seconds', operation='iter_csv'), \
+                    compressionCodecs.open_input(csv_file, newline='') as file:
+                yield from metrics.count_rows(csv.DictReader(file), 'file_rows_read_total', format='csv')
+        except Exception as e:
+            self.logger.error(f"Error reading CSV file: {e}")
+            if raise_errors:
+                raise
+
+    def iter_json(self, json_file, chunk_size=64 * 1024, raise_errors=False):
+        """
+        Lazily read the records of a JSON array or of an NDJSON file (one object per line).
+        The file is decoded (and decompressed) chunk by chunk, so only the current chunk is held in memory.
+        :param json_file: Path to the JSON file
+        :param chunk_size: Number of characters read at a time
+        :param raise_errors: Raise a read error after logging it, instead of ending the records there
+        :return: Generator of dictionaries
+        """
+        try:
+            with metrics.timer('file_read_seconds', operation='iter_json'), compressionCodecs.open_input(json_file) as file:
+                yield from metrics.count_rows(self._decode_json_records(file, chunk_size), 'file_rows_read_total',
+                                              format='json')
+        except Exception as e:
+            self.logger.error(f"Error reading JSON file: {e}")
+            if raise_errors:
+                raise
+
+    def _decode_json_records(self, file, chunk_size):
+        """
+        Decode the records of an open JSON array or NDJSON file, chunk by chunk.
+        """
+        decoder = json.JSONDecoder()
+        buffer = ''
+        position = 0
+        end_of_file = False
+        while True:
+            position = JSON_RECORD_SEPARATORS.match(buffer, position).end()
+            if position < len(buffer):
+                try:
+                    record, position = decoder.raw_decode(buffer, position)
+                    yield record
+                    continue
+                except json.JSONDecodeError:
+                    if end_of_file:
+                        raise  # The record is invalid, not just cut by the chunk boundary
+            elif end_of_file:
+                break
+
+            # Drop the decoded part of the buffer and read the next chunk
+            chunk = file.read(chunk_size)
+            end_of_file = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+
+    def read_csv_compact(self, csv_file, intern_fields=compactRecords.DEFAULT_INTERN_FIELDS):
+        """
+        Read the CSV file into a compact column-oriented table instead of a list of dictionaries.
+        The file is streamed, and the repeated values of intern_fields are stored once.
+        :param csv_file: Path to the CSV file
+        :param intern_fields: Names of the fields with few distinct values, e.g. the title
+        :return: compactRecords.RecordTable, iterated as records used like dictionaries
+        """
+        return compactRecords.RecordTable.from_records(self.iter_csv(csv_file), intern_fields)
+
+    def read_json_compact(self, json_file, intern_fields=compactRecords.DEFAULT_INTERN_FIELDS):
+        """
+        Read the JSON or NDJSON file into a compact column-oriented table instead of a list of dictionaries.
+        The file is streamed, and the repeated values of intern_fields are stored once.
+        :param json_file: Path to the JSON file
+        :param intern_fields: Names of the fields with few distinct values, e.g. the title
+        :return: compactRecords.RecordTable, iterated as records used like dictionaries
+        """
+        return compactRecords.RecordTable.from_records(self.iter_json(json_file), intern_fields)
+
+    def read_columnar(self, columnar_file):
+        """
+        Open a columnar file (see DatabaseManager.export_to_columnar) through a memory mapping.
+        The columns are read on access: column('title').codes or column('id').values are memoryviews
+        over the file, without copying.
+        :param columnar_file: Path to the columnar file
+        :return: columnarFormat.ColumnarFile to close after use, None if it can't be read
+        """
+        try:
+            return columnarFormat.ColumnarFile(columnar_file)
+        except Exception as e:
+            self.logger.error(f"Error reading columnar file: {e}")
+            return None
+
+    def iter_columnar(self, columnar_file, columns=None):
+        """
+        Lazily read the records of a columnar file, one at a time.
+        :param columnar_file: Path to the columnar file
+        :param columns: Names of the columns to read, all of them by default
+        :return: Generator of dictionaries
+        """
+        try:
+            with metrics.timer('file_read_seconds', operation='iter_columnar'), \
+                    columnarFormat.ColumnarFile(columnar_file) as columnar:
+                yield from metrics.count_rows(columnar.iter_records(columns), 'file_rows_read_total', format='columnar')
+        except Exception as e:
+            self.logger.error(f"Error reading columnar file: {e}")
@@ -0,0 +1,269 @@
+"""
+Lightweight instrumentation: counters and timers with labels, exported as a JSON snapshot or in the
+Prometheus text format. The metrics are disabled by default, in which case every instrumentation
+point costs a single attribute check.
+
+    from utils import metrics
+    metrics.enable()
+    ...run the pipeline...
+    print(metrics.to_prometheus())
+"""
+import functools
+import json
+import threading
+import time
+
+# Number of SQLite virtual machine instructions between two calls of the progress handler
+PROGRESS_STEPS = 1000
+
+
+class MetricsRegistry:
+    """
+    Holds the counters (monotonic totals: rows, bytes, statements) and the timers (count, sum and
+    maximum of the durations) recorded by the instrumented code, keyed by name and labels.
+    """
+    def __init__(self):
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.timers = {}
+
+    def increment(self, name, value=1, **labels):
+        """
+        Add a value to a counter.
+        :param name: Name of the counter
+        :param value: Value to add
+        :param labels: Labels of the counter, e.g. format='csv'
+        :return: None
+        """
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        """
+        Record a duration in a timer.
+        :param name: Name of the timer
+        :param seconds: Duration in seconds
+        :param labels: Labels of the timer, e.g. operation='insert_data'
+        :return: None
+        """
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            count, total, maximum = self.timers.get(key, (0, 0.0, 0.0))
+            self.timers[key] = (count + 1, total + seconds, max(maximum, seconds))
+
+    def timer(self, name, **labels):
+        """
+        Context manager recording the duration of its block in a timer.
+        :return: Context manager
+        """
+        return _Timer(self, name, labels)
+
+    def timed(self, name, label='operation'):
+        """
+        Decorator recording the duration of every call of a function in a timer,
+        labelled with the function name.
+        :param name: Name of the timer
+        :param label: Name of the label holding the function name
+        :return: Decorator
+        """
+        def decorator(func):
+            labels = {label: func.__name__}
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start_time = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.observe(name, time.perf_counter() - start_time, **labels)
+            return wrapper
+        return decorator
+
+    def count_rows(self, rows, name, **labels):
+        """
+        Count the items of an iterator in a counter as they are consumed.
+        :param rows: Iterable of rows or records
+        :param name: Name of the counter
+        :param labels: Labels of the counter
+        :return: The iterable itself when the metrics are disabled, otherwise a counting generator
+        """
+        if not self.enabled:
+            return rows
+        return self._count_rows(rows, name, labels)
+
+    def _count_rows(self, rows, name, labels, flush_every=10000):
+        count = 0
+        try:
+            for row in rows:
+                count += 1
+                if count == flush_every:
+                    self.increment(name, count, **labels)
+                    count = 0
+                yield row
+        finally:
+            self.increment(name, count, **labels)
+
+    def instrument_connection(self, conn, progress_steps=PROGRESS_STEPS):
+        """
+        Count the statements run on a SQLite connection by kind (SELECT, INSERT, ...) through its trace
+        callback, and the work of the SQLite virtual machine through its progress handler.
+        Does nothing when the metrics are disabled.
+        :param conn: sqlite3 Connection
+        :param progress_steps: Number of virtual machine instructions between two progress calls
+        :return: None
+        """
+        if not self.enabled:
+            return
+
+        def trace(statement):
+            words = statement.split(None, 1)
+            self.increment('sqlite_statements_total', statement=words[0].upper() if words else '')
+
+        def progress():
+            self.increment('sqlite_vm_instructions_total', progress_steps)
+            return 0  # Go on with the statement
+
+        conn.set_trace_callback(trace)
+        conn.set_progress_handler(progress, progress_steps)
+
+    def reset(self):
+        """
+        Drop every recorded value.
+        :return: None
+        """
+        with self.lock:
+            self.counters = {}
+            self.timers = {}
+
+    def snapshot(self):
+        """
+        :return: Dictionary of every counter and timer, with their labels and values
+        """
+        with self.lock:
+            counters = dict(self.counters)
+            timers = dict(self.timers)
+        result = {'counters': {}, 'timers': {}}
+        for (name, labels), value in sorted(counters.items()):
+            result['counters'].setdefault(name, []).append({'labels': dict(labels), 'value': value})
+        for (name, labels), (count, total, maximum) in sorted(timers.items()):
+            result['timers'].setdefault(name, []).append(
+                {'labels': dict(labels), 'count': count, 'sum': total, 'max': maximum})
+        return result
+
+    def to_json(self, indent=4):
+        """
+        :return: The snapshot as a JSON document
+        """
+        return json.dumps(self.snapshot(), indent=indent)
+
+    def to_prometheus(self):
+        """
+        :return: The metrics in the Prometheus text exposition format, the timers as summaries
+        """
+        snapshot = self.snapshot()
+        lines = []
+        for name, values in snapshot['counters'].items():
+            lines.append(f"# TYPE {name} counter")
+            lines += [f"{name}{_format_labels(value['labels'])} {value['value']}" for value in values]
+        for name, values in snapshot['timers'].items():
+            lines.append(f"# TYPE {name} summary")
+            for value in values:
+                labels = _format_labels(value['labels'])
+                lines.append(f"{name}_count{labels} {value['count']}")
+                lines.append(f"{name}_sum{labels} {value['sum']!r}")
+        return '\n'.join(lines) + '\n' if lines else ''
+
+
+class _Timer:
+    """
+    Context manager of MetricsRegistry.timer.
+    """
+    __slots__ = ('registry', 'name', 'labels', 'start_time')
+
+    def __init__(self, registry, name, labels):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start_time = time.perf_counter() if self.registry.enabled else None
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.start_time is not None:
+            self.registry.observe(self.name, time.perf_counter() - self.start_time, **self.labels)
+
+
+def _format_labels(labels):
+    """
+    Format labels as {name="value",...} for the Prometheus text format.
+    """
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in labels.values())
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + '}'
+
+
+# Registry used by the instrumented modules
+REGISTRY = MetricsRegistry()
+
+# Instrumentation points of the instrumented modules, recording into REGISTRY
+increment = REGISTRY.increment
+observe = REGISTRY.observe
+timer = REGISTRY.timer
+timed = REGISTRY.timed
+count_rows = REGISTRY.count_rows
+instrument_connection = REGISTRY.instrument_connection
+
+
+def enable():
+    """
+    Start recording the metrics. Connections opened before are not instrumented.
+    :return: None
+    """
+    REGISTRY.enabled = True
+
+
+def disable():
+    """
+    Stop recording the metrics, the values recorded so far are kept.
+    :return: None
+    """
+    REGISTRY.enabled = False
+
+
+def snapshot():
+    """
+    :return: Dictionary of the recorded metrics, see MetricsRegistry.snapshot
+    """
+    return REGISTRY.snapshot()
+
+
+def to_json(indent=4):
+    """
+    :return: The recorded metrics as a JSON document
+    """
+    return REGISTRY.to_json(indent)
+
+
+def to_prometheus():
+    """
+    :return: The recorded metrics in the Prometheus text format
+    """
+    return REGISTRY.to_prometheus()
+
+
+def reset():
+    """
+    Drop the recorded metrics.
+    :return: None
+    """
+    REGISTRY.reset()
@@ -1,30 +1,78 @@
 from utils import fileManager
+from utils import databaseManager
+from utils import reportStatistics
+from utils import reportCache
+from utils import metrics
+from utils import shardedDatabaseManager
 from reportlab.lib.pagesizes import letter
+from reportlab.lib.utils import simpleSplit
 from reportlab.pdfgen import canvas
+import asyncio
 import logging
+import os
+
+# Columns of the records table and their share of the page width
+RECORDS_TABLE_COLUMNS = [('id', 0.1), ('name', 0.22), ('email', 0.33), ('zip_code', 0.12), ('title', 0.23)]
 
 class ReportGenerator:
     """
-    A class to generate a PDF report from CSV and JSON files.
+    A class to generate a PDF report from CSV and JSON files, or straight from the database.
     """
-    def __init__(self, csv_file_path, json_file_path, pdf_path):
+    def __init__(self, csv_file_path, json_file_path, pdf_path, db_file=None, input_format='csv', use_cache=False,
+                 include_records=False, records_chunk_size=1000, pages_per_file=None, records=None, db_manager=None):
         """
         Initializes the ReportGenerator with file paths and sets up the PDF canvas.
         
         :param csv_file_path: Path to the CSV file.
         :param json_file_path: Path to the JSON file.
         :param pdf_path: Path where the generated PDF will be saved.
+        :param db_file: Path to the SQLite database. When given, the statistics are computed
+                        with SQL aggregates and the CSV and JSON files are not read.
+        :param input_format: Without db_file, 'csv' or 'json' to compute the statistics from the CSV
+                             or the JSON (or NDJSON) file, streamed once.
+        :param use_cache: Keep the statistics between runs. With db_file they are stored in a side table
+                          of the database and only the records added since the previous report are
+                          processed; otherwise they are stored next to the PDF and reused while the
+                          input file is unchanged.
+        :param include_records: Add a table of all the records after the statistics, flowed across pages.
+        :param records_chunk_size: Number of records read at a time for the records table.
+        :param pages_per_file: Maximum number of pages per PDF file. Once reached, the current file is saved
+                               and the report continues in pdf_path with a _2, _3, ... suffix, which keeps
+                               the memory used bounded for very large reports. None for a single file.
+        :param records: Records already loaded in memory, e.g. the compactRecords.RecordTable returned by
+                        FileManager.read_csv_compact. When given, they are used instead of the input files,
+                        and the statistics are not cached.
+        :param db_manager: DatabaseManager to compute the statistics with instead of opening db_file, e.g. one
+                           running in memory or with a result cache reusing the statistics of an unchanged
+                           database across reports, or a ShardedDatabaseManager, which doesn't support
+                           use_cache and include_records (ValueError). It is left open when the report is done.
         """
         self.logger = logging.getLogger(__name__)
         logging.basicConfig(level=logging.INFO)
         self.csv_file_path = csv_file_path
         self.json_file_path = json_file_path
         self.pdf_path = pdf_path
+        self.db_file = db_file
+        self.db_manager = db_manager
+        self.owns_db_manager = db_manager is None
+        self.input_format = input_format
+        self.statistics = None
+        self.use_cache = use_cache
+        self.include_records = include_records
+        self.records_chunk_size = records_chunk_size
+        self.pages_per_file = pages_per_file
+        self.records = records
         self.file_manager = fileManager.FileManager()
 
+        if self.input_format not in ('csv', 'json'):
+            raise ValueError(f"Unknown input format: {self.input_format}")
+        # Both follow the ids of a single database, which are only unique within a shard
+        if isinstance(db_manager, shardedDatabaseManager.ShardedDatabaseManager) and (use_cache or include_records):
+            raise ValueError("use_cache and include_records can't be used with a ShardedDatabaseManager")
+
         try:
-            self.csv_data = self.file_manager.read_csv(self.csv_file_path)
-            self.json_data = self.file_manager.read_json(self.json_file_path)
+            if self.db_file and self.db_manager is None:
+                self.db_manager = databaseManager.DatabaseManager(self.db_file)
         except FileNotFoundError as e:
             self.logger.error(f"FileNotFoundError: can't find file to read from it: {e}")
             raise
@@ -34,6 +82,10 @@ class ReportGenerator:
 
         self.pdf_canvas = canvas.Canvas(self.pdf_path, pagesize=letter)
         self.width, self.height = letter
+        self.output_files = [self.pdf_path]
+        self.page_count = 1  # Pages started, across every file
+        self.file_page_count = 1  # Pages started in the current file
+        self.current_font = None
 
         # Define layout parameters
         self.title_font_size = 16
@@ -44,13 +96,165 @@ class ReportGenerator:
         self.section_title_font_size = 12
         self.section_title_y_offset = 20
         self.sample_records_limit = 5
+        self.table_font_size = 8
+        self.table_line_height = 11
+
+        # Statistics computed in a single pass over the input file
+        self.statistics_pipeline = reportStatistics.StatisticsPipeline()
+        self.statistics_pipeline.register('total_records', reportStatistics.CountAccumulator())
+        self.statistics_pipeline.register('sample_records', reportStatistics.SampleAccumulator(self.sample_records_limit))
+        self.statistics_pipeline.register('companies', reportStatistics.CompanyAccumulator())
+        self.statistics_pipeline.register('title_counts', reportStatistics.ValueCountAccumulator('title'))
+
+    def register_accumulator(self, name, accumulator):
+        """
+        Registers a custom statistic, updated in the same pass over the input file as the built-in ones.
+        Must be called before the report is generated; the result is then available in get_statistics()[name].
+
+        :param name: Name of the statistic.
+        :param accumulator: reportStatistics.Accumulator object.
+        """
+        self.statistics_pipeline.register(name, accumulator)
+
+    def get_statistics(self):
+        """
+        Computes the statistics the first time it is called, and returns every statistic by name.
+        """
+        if self.statistics is None:
+            if self.db_manager:
+                self.statistics = self.compute_database_statistics()
+            else:
+                self.statistics = self.compute_file_statistics()
+        return self.statistics
+
+    def compute_database_statistics(self):
+        """
+        Computes the statistics with SQL aggregates, only over the new records when the cache is used.
+        They are reused from the result cache of the DatabaseManager, if it has one, while the database is unchanged.
+        """
+        def compute():
+            if self.use_cache:
+                return reportCache.DatabaseReportCache(self.db_manager, self.sample_records_limit).get_statistics()
+            return {
+                'total_records': self.db_manager.count_records(),
+                'sample_records': self.db_manager.get_sample_records(self.sample_records_limit),
+                'companies': self.db_manager.get_companies(),
+                'title_counts': self.db_manager.get_title_counts(),
+            }
+
+        return self.db_manager.get_cached_result(('report_statistics', self.use_cache, self.sample_records_limit),
+                                                 compute)
+
+    def compute_file_statistics(self):
+        """
+        Streams the input file once through the statistics pipeline, unless the cache is up to date.
+        """
+        if self.records is not None:
+            return self.statistics_pipeline.run(self.records)
+
+        source_file = self.json_file_path if self.input_format == 'json' else self.csv_file_path
+        cache = None
+        if self.use_cache:
+            cache = reportCache.FileReportCache(self.pdf_path + '.cache.json', source_file,
+                                                list(self.statistics_pipeline.accumulators))
+            statistics = cache.load()
+            if statistics is not None:
+                self.logger.info(f"Report statistics loaded from {cache.cache_file}")
+                return statistics
+
+        if self.input_format == 'json':
+            records = self.file_manager.iter_json(source_file)
+        else:
+            records = self.file_manager.iter_csv(source_file)
+        statistics = self.statistics_pipeline.run(records)
+        if cache:
+            cache.save(statistics)
+        return statistics
+
+    def get_total_records(self):
+        """
+        Returns the total number of records.
+        """
+        return self.get_statistics()['total_records']
+
+    def get_sample_records(self):
+        """
+        Returns the first records, as dictionaries, up to the sample records limit.
+        """
+        return self.get_statistics()['sample_records']
+
+    def get_companies(self):
+        """
+        Returns the unique companies extracted from the emails.
+        """
+        return self.get_statistics()['companies']
+
+    def get_title_counts(self):
+        """
+        Returns a dictionary mapping each title to its number of records.
+        """
+        return self.get_statistics()['title_counts']
+
+    def set_font(self, font, font_size):
+        """
+        Sets the font of the canvas, unless it is already the current one.
+        """
+        if self.current_font != (font, font_size):
+            self.pdf_canvas.setFont(font, font_size)
+            self.current_font = (font, font_size)
 
+    def new_page(self):
+        """
+        Ends the current page with its page number and starts a new one, in a new file when the
+        current file reached pages_per_file.
+        """
+        self.set_font("Helvetica", self.table_font_size)
+        self.pdf_canvas.drawRightString(self.width - self.margin, self.margin / 2, f"Page {self.page_count}")
+        if self.pages_per_file and self.file_page_count >= self.pages_per_file:
+            self.pdf_canvas.save()
+            self.logger.info(f"Report part saved as {self.output_files[-1]}")
+            base, extension = os.path.splitext(self.pdf_path)
+            self.output_files.append(f"{base}_{len(self.output_files) + 1}{extension}")
+            self.pdf_canvas = canvas.Canvas(self.output_files[-1], pagesize=letter)
+            self.file_page_count = 0
+        else:
+            self.pdf_canvas.showPage()
+        self.page_count += 1
+        self.file_page_count += 1
+        self.current_font = None  # The font is reset on a new page
+        self.y_position = self.height - self.margin
+
+    def ensure_space(self, lines, line_height=None):
+        """
+        Starts a new page if the given number of lines does not fit above the bottom margin.
+        """
+        line_height = line_height or self.line_height
+        if self.y_position - line_height * (lines - 1) < self.margin:
+            self.new_page()
+
+    def draw_line(self, text, font="Helvetica", keep_with_next=0):
+        """
+        Draws a line of text at y_position, on a new page if the page is full, and moves y_position
+        down by one line. Text wider than the page is wrapped over several lines.
+
+        :param text: Text to draw.
+        :param font: Font name, in the section title font size.
+        :param keep_with_next: Number of following lines to keep on the same page, e.g. after a heading.
+        """
+        lines = simpleSplit(text, font, self.section_title_font_size, self.width - 2 * self.margin) or ['']
+        for index, line in enumerate(lines):
+            self.ensure_space(1 + (keep_with_next if index == len(lines) - 1 else 0))
+            self.set_font(font, self.section_title_font_size)
+            self.pdf_canvas.drawString(self.margin, self.y_position, line)
+            self.y_position -= self.line_height
+
+    @metrics.timed('report_section_seconds', label='section')
     def prepare_pdf(self):
         """
         Prepares the PDF by setting the title.
         """
         try:
-            self.pdf_canvas.setFont("Helvetica-Bold", self.title_font_size)
+            self.set_font("Helvetica-Bold", self.title_font_size)
             self.pdf_canvas.drawString(self.title_x, self.title_y, "Data Report")
             # Initialize y_position for the rest of the content
             self.y_position = self.title_y - self.line_height * 2
@@ -58,112 +262,161 @@ class ReportGenerator:
             self.logger.error(f"Failed to prepare PDF: {e}")
             raise
 
+    @metrics.timed('report_section_seconds', label='section')
     def add_total_records(self):
         """
         Adds the total number of records to the PDF.
         """
         try:
-            # Add the heading in bold
-            self.pdf_canvas.setFont("Helvetica-Bold", self.section_title_font_size)
-            self.pdf_canvas.drawString(self.margin, self.y_position, "Total number of records:")
-            
-            # Add the number (not bold)
-            total_records = len(self.csv_data)
-            self.y_position -= self.line_height  # Move y_position down for the number
-            self.pdf_canvas.setFont("Helvetica", self.section_title_font_size)
-            self.pdf_canvas.drawString(self.margin, self.y_position, str(total_records))
-            
-            self.y_position -= self.line_height * 2  # Move y_position down for the next section
+            # Add the heading in bold and the number (not bold)
+            total_records = self.get_total_records()
+            self.draw_line("Total number of records:", "Helvetica-Bold", keep_with_next=1)
+            self.draw_line(str(total_records))
+            self.y_position -= self.line_height  # Move y_position down for the next section
         except Exception as e:
             self.logger.error(f"Failed to add total records: {e}")
             raise
 
+    @metrics.timed('report_section_seconds', label='section')
     def add_sample_records(self):
         """
         Adds sample records to the PDF.
         """
         try:
-            self.pdf_canvas.setFont("Helvetica-Bold", self.section_title_font_size)
-            self.pdf_canvas.drawString(self.margin, self.y_position, "Sample Records:")
-            self.y_position -= self.line_height  # Move y_position down before adding sample records
-            self.pdf_canvas.setFont("Helvetica", self.section_title_font_size)  # Reset font for sample records
-            
-            for row in self.csv_data[:self.sample_records_limit]:  # Limit to 5 records
+            self.draw_line("Sample Records:", "Helvetica-Bold", keep_with_next=1)
+            for row in self.get_sample_records():  # Limit to 5 records
                 row_text = ', '.join(f"{k}: {v}" for k, v in row.items())
-                self.pdf_canvas.drawString(self.margin, self.y_position, row_text)
-                self.y_position -= self.line_height
+                self.draw_line(row_text)
             self.y_position -= self.line_height  # Additional space after sample records
         except Exception as e:
             self.logger.error(f"Failed to add sample records: {e}")
             raise
 
+    @metrics.timed('report_section_seconds', label='section')
     def add_unique_companies(self):
         """
         Adds the number of unique companies to the PDF.
         """
         try:
-            companies = set()
-            for record in self.csv_data:
-                email = record.get('email', '')
-                company = email.split('@')[-1].split('.')[0]  # Extract company from email
-                companies.add(company)
-            
+            companies = self.get_companies()
             num_companies = len(companies)
             companies_list = ', '.join(companies)  # Create a comma-separated list of companies
 
-            # Add the heading in bold
-            self.pdf_canvas.setFont("Helvetica-Bold", self.section_title_font_size)
-            self.pdf_canvas.drawString(self.margin, self.y_position, "Unique companies exist in emails inserted:")
-            
-            # Add the number and list of companies (not bold)
-            self.y_position -= self.line_height  # Move y_position down for the number
-            self.pdf_canvas.setFont("Helvetica", self.section_title_font_size)
-            self.pdf_canvas.drawString(self.margin, self.y_position, f"The total number of Unique companies =  {num_companies}")
-            self.y_position -= self.line_height  # Move y_position down for the list of companies
-            self.pdf_canvas.drawString(self.margin, self.y_position, f"Companies: {companies_list}")
-
-
+            # Add the heading in bold, then the number and list of companies (not bold)
+            self.draw_line("Unique companies exist in emails inserted:", "Helvetica-Bold", keep_with_next=1)
+            self.draw_line(f"The total number of Unique companies =  {num_companies}")
+            self.draw_line(f"Companies: {companies_list}")
+            self.y_position -= self.line_height  # Additional space after the companies
         except Exception as e:
             self.logger.error(f"Failed to add unique companies: {e}")
             raise
 
+    @metrics.timed('report_section_seconds', label='section')
     def add_title_counts(self):
         """
         Adds the counts of each title to the PDF.
         """
         try:
-            title_counts = {}
-            for record in self.csv_data:
-                title = record.get('title', '')
-                title_counts[title] = title_counts.get(title, 0) + 1
-            
-            self.y_position -= self.section_title_y_offset*2  # Move y_position down before adding "Number of each title:"
-            self.pdf_canvas.setFont("Helvetica-Bold", self.section_title_font_size)
-            self.pdf_canvas.drawString(self.margin, self.y_position, "Number of each title:")
-            self.y_position -= self.section_title_y_offset  # Move y_position down before adding title counts
-            self.pdf_canvas.setFont("Helvetica", self.section_title_font_size)  # Reset font for title counts
-            
+            title_counts = self.get_title_counts()
+
+            self.draw_line("Number of each title:", "Helvetica-Bold", keep_with_next=1)
             for title, count in title_counts.items():
-                self.pdf_canvas.drawString(self.margin, self.y_position, f"{title}: {count}")
-                self.y_position -= self.line_height
+                self.draw_line(f"{title}: {count}")
+            self.y_position -= self.line_height  # Additional space after the title counts
         except Exception as e:
             self.logger.error(f"Failed to add title counts: {e}")
             raise
 
+    def iter_records(self):
+        """
+        Yields every record as a tuple of the RECORDS_TABLE_COLUMNS values, reading records_chunk_size
+        records at a time from the database, or streaming the input file (or the records given).
+        """
+        if self.db_manager:
+            # Keyset pagination on the id, SELECT * returns the table columns in RECORDS_TABLE_COLUMNS order
+            last_id = 0
+            while True:
+                rows = self.db_manager.get_rows_after(last_id, self.records_chunk_size)
+                if not rows:
+                    break
+                yield from rows
+                last_id = rows[-1][0]
+        else:
+            if self.records is not None:
+                records = self.records
+            elif self.input_format == 'json':
+                records = self.file_manager.iter_json(self.json_file_path)
+            else:
+                records = self.file_manager.iter_csv(self.csv_file_path)
+            columns = [column for column, _ in RECORDS_TABLE_COLUMNS]
+            for record in records:
+                yield tuple(record.get(column, '') for column in columns)
+
+    def draw_table_header(self, column_positions):
+        """
+        Draws the header row of the records table.
+        """
+        self.set_font("Helvetica-Bold", self.table_font_size)
+        for (column, _), x in zip(RECORDS_TABLE_COLUMNS, column_positions):
+            self.pdf_canvas.drawString(x, self.y_position, column)
+        self.y_position -= self.table_line_height
+
+    @metrics.timed('report_section_seconds', label='section')
+    def add_records_table(self):
+        """
+        Adds a table of all the records, flowed across as many pages as needed with the header row
+        repeated on each page. The records are read in chunks, so only one chunk is in memory.
+        """
+        try:
+            table_width = self.width - 2 * self.margin
+            column_positions = []
+            max_characters = []
+            x = self.margin
+            for _, share in RECORDS_TABLE_COLUMNS:
+                column_positions.append(x)
+                # Approximate Helvetica character width, cheaper than measuring millions of strings
+                max_characters.append(int(table_width * share / (self.table_font_size * 0.55)))
+                x += table_width * share
+            columns = list(zip(column_positions, max_characters))
+
+            self.draw_line("All records:", "Helvetica-Bold", keep_with_next=2)
+            self.draw_table_header(column_positions)
+            for record in self.iter_records():
+                if self.y_position < self.margin:
+                    self.new_page()
+                    self.draw_table_header(column_positions)
+                self.set_font("Helvetica", self.table_font_size)
+                for value, (x, max_length) in zip(record, columns):
+                    text = str(value)
+                    if len(text) > max_length:
+                        text = text[:max_length - 3] + '...'
+                    self.pdf_canvas.drawString(x, self.y_position, text)
+                self.y_position -= self.table_line_height
+        except Exception as e:
+            self.logger.error(f"Failed to add records table: {e}")
+            raise
+
+    @metrics.timed('report_section_seconds', label='section')
     def save_report(self):
         """
         Saves the generated PDF report and prints a confirmation message.
         """
         try:
+            self.set_font("Helvetica", self.table_font_size)
+            self.pdf_canvas.drawRightString(self.width - self.margin, self.margin / 2, f"Page {self.page_count}")
             self.pdf_canvas.save()
-            self.logger.info(f"Report saved as {self.pdf_path}")
+            metrics.increment('report_pages_total', self.page_count)
+            self.logger.info(f"Report saved as {self.output_files[-1]} ({self.page_count} pages in total)")
         except Exception as e:
             self.logger.error(f"Failed to save report: {e}")
             raise
 
+    @metrics.timed('report_section_seconds', label='section')
     def generate_report(self):
         """
         Generates the complete report by calling all necessary methods.
+
+        :return: True if the report was saved, False if it failed.
         """
         try:
             self.prepare_pdf()
@@ -171,7 +424,32 @@ class ReportGenerator:
             self.add_sample_records()
             self.add_unique_companies()
             self.add_title_counts()
+            if self.include_records:
+                self.add_records_table()
             self.save_report()
+            return True
         except Exception as e:
             self.logger.error(f"Failed to generate report: {e}")
- 
\ No newline at end of file
+            return False
+        finally:
+            if self.db_manager and self.owns_db_manager:
+                self.db_manager.close_connection()
+
+
+async def generate_report_async(csv_file_path, json_file_path, pdf_path, executor=None, **options):
+    """
+    Generates a report without blocking the event loop. The ReportGenerator is created and run
+    on the executor, since its database connection can only be used by the thread that opened it.
+
+    :param csv_file_path: Path to the CSV file.
+    :param json_file_path: Path to the JSON file.
+    :param pdf_path: Path where the generated PDF will be saved.
+    :param executor: concurrent.futures executor to run on, None for the default executor of the loop.
+    :param options: Other ReportGenerator arguments (db_file, input_format).
+    :return: True if the report was saved, False if it failed.
+    """
+    def generate():
+        return ReportGenerator(csv_file_path, json_file_path, pdf_path, **options).generate_report()
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, generate)
@@ -0,0 +1,136 @@
+import json
+import logging
+import os
+
+# Bumped when the layout of the cached statistics changes, which invalidates every cache
+CACHE_VERSION = 1
+
+
+class DatabaseReportCache:
+    """
+    Running report statistics stored in the 'cache' side table of the database, with the id of the
+    last record they include. Each call folds in only the records added since, with SQL aggregates
+    restricted to the new id range. The 'data' table is expected to be append-only: call
+    invalidate() after updating or deleting records.
+    """
+    def __init__(self, db_manager, sample_records_limit, key='report_statistics'):
+        """
+        :param db_manager: DatabaseManager connected to the database.
+        :param sample_records_limit: Number of sample records kept.
+        :param key: Key of the cache entry in the 'cache' table.
+        """
+        self.logger = logging.getLogger(__name__)
+        self.db_manager = db_manager
+        self.sample_records_limit = sample_records_limit
+        self.key = key
+
+    def get_statistics(self):
+        """
+        Returns the statistics of the whole table, updated with the records added since the last call.
+        """
+        schema = self.db_manager.get_schema()
+        max_id = self.db_manager.get_max_id()
+        entry = self.db_manager.load_cache_entry(self.key)
+
+        if (entry is None or entry['version'] != CACHE_VERSION or entry['schema'] != schema
+                or entry['sample_records_limit'] != self.sample_records_limit or entry['last_id'] > max_id):
+            if entry is not None:
+                self.logger.info("Report cache invalidated, recomputing the statistics.")
+            entry = {
+                'version': CACHE_VERSION,
+                'schema': schema,
+                'sample_records_limit': self.sample_records_limit,
+                'last_id': 0,
+                'statistics': {'total_records': 0, 'sample_records': [], 'companies': [], 'title_counts': {}},
+            }
+
+        last_id = entry['last_id']
+        if max_id > last_id:
+            self.fold_in(entry['statistics'], last_id, max_id)
+            entry['last_id'] = max_id
+            self.db_manager.save_cache_entry(self.key, entry)
+            self.logger.info(f"Report cache updated with the records {last_id + 1} to {max_id}.")
+        return entry['statistics']
+
+    def fold_in(self, statistics, after_id, up_to_id):
+        """
+        Adds the records whose id is in (after_id, up_to_id] to the statistics.
+        """
+        db_manager = self.db_manager
+        statistics['total_records'] += db_manager.count_records(after_id, up_to_id)
+
+        missing_samples = self.sample_records_limit - len(statistics['sample_records'])
+        if missing_samples > 0:
+            statistics['sample_records'] += db_manager.get_sample_records(missing_samples, after_id, up_to_id)
+
+        # The new records come after the cached ones, so appending keeps the order of first appearance
+        known_companies = set(statistics['companies'])
+        statistics['companies'] += [company for company in db_manager.get_companies(after_id, up_to_id)
+                                    if company not in known_companies]
+
+        title_counts = statistics['title_counts']
+        for title, count in db_manager.get_title_counts(after_id, up_to_id).items():
+            title_counts[title] = title_counts.get(title, 0) + count
+
+    def invalidate(self):
+        """
+        Drops the cached statistics, the next call recomputes them from the whole table.
+        """
+        self.db_manager.save_cache_entry(self.key, None)
+
+
+class FileReportCache:
+    """
+    Report statistics computed from an input file, stored in a JSON file next to the report.
+    They are reused as long as the input file (path, size and modification time) and the list of
+    statistics are the same, and recomputed otherwise.
+    """
+    def __init__(self, cache_file, source_file, statistic_names):
+        """
+        :param cache_file: Path of the JSON cache file.
+        :param source_file: Path of the input file the statistics are computed from.
+        :param statistic_names: Names of the statistics, a different list invalidates the cache.
+        """
+        self.logger = logging.getLogger(__name__)
+        self.cache_file = cache_file
+        self.source_file = source_file
+        self.statistic_names = sorted(statistic_names)
+
+    def get_source_signature(self):
+        """
+        Returns what identifies the current content of the input file.
+        """
+        stat = os.stat(self.source_file)
+        return {
+            'version': CACHE_VERSION,
+            'path': os.path.abspath(self.source_file),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'statistics': self.statistic_names,
+        }
+
+    def load(self):
+        """
+        Returns the cached statistics, None if there are none or if they are out of date.
+        """
+        try:
+            with open(self.cache_file, 'r') as file:
+                entry = json.load(file)
+            if entry['signature'] == self.get_source_signature():
+                return entry['statistics']
+        except (OSError, ValueError, KeyError):
+            pass
+        return None
+
+    def save(self, statistics):
+        """
+        Stores the statistics computed from the current content of the input file.
+        """
+        try:
+            content = json.dumps({'signature': self.get_source_signature(), 'statistics': statistics})
+            temporary_file = self.cache_file + '.tmp'
+            with open(temporary_file, 'w') as file:
+                file.write(content)
+            os.replace(temporary_file, self.cache_file)
+        except (OSError, TypeError, ValueError) as e:
+            self.logger.error(f"Failed to save the report cache: {e}")
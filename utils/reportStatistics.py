@@ -0,0 +1,128 @@
+def extract_company(email):
+    """
+    Extract the company from an email address.
+    :param email: The email address
+    :return: The first label of the email domain (e.g. 'siemens' for 'name@siemens.com')
+    """
+    return email.split('@')[-1].split('.')[0]
+
+
+class Accumulator:
+    """
+    Base class of the report statistics. An accumulator is updated with every record
+    read during a single pass over the input, and only keeps what its result needs.
+    """
+    def add(self, record):
+        """
+        Update the statistic with one record.
+        :param record: The record as a dictionary
+        :return: None
+        """
+        raise NotImplementedError
+
+    def result(self):
+        """
+        :return: The value of the statistic
+        """
+        raise NotImplementedError
+
+
+class CountAccumulator(Accumulator):
+    """
+    Counts the records.
+    """
+    def __init__(self):
+        self.count = 0
+
+    def add(self, record):
+        self.count += 1
+
+    def result(self):
+        return self.count
+
+
+class SampleAccumulator(Accumulator):
+    """
+    Keeps the first records, up to a limit.
+    """
+    def __init__(self, limit):
+        """
+        :param limit: Maximum number of records to keep
+        """
+        self.limit = limit
+        self.records = []
+
+    def add(self, record):
+        if len(self.records) < self.limit:
+            self.records.append(record)
+
+    def result(self):
+        return self.records
+
+
+class CompanyAccumulator(Accumulator):
+    """
+    Collects the unique companies found in the emails, in order of first appearance.
+    """
+    def __init__(self, field='email'):
+        """
+        :param field: Name of the field holding the email
+        """
+        self.field = field
+        self.companies = {}
+
+    def add(self, record):
+        company = extract_company(record.get(self.field, ''))
+        if company not in self.companies:
+            self.companies[company] = None
+
+    def result(self):
+        return list(self.companies)
+
+
+class ValueCountAccumulator(Accumulator):
+    """
+    Counts the records of each value of a field, in order of first appearance.
+    """
+    def __init__(self, field):
+        """
+        :param field: Name of the field whose values are counted
+        """
+        self.field = field
+        self.counts = {}
+
+    def add(self, record):
+        value = record.get(self.field, '')
+        self.counts[value] = self.counts.get(value, 0) + 1
+
+    def result(self):
+        return self.counts
+
+
+class StatisticsPipeline:
+    """
+    Streams records once and updates every registered accumulator in the same pass.
+    """
+    def __init__(self):
+        self.accumulators = {}
+
+    def register(self, name, accumulator):
+        """
+        Register an accumulator under a name.
+        :param name: Name under which the result of the accumulator is returned by run()
+        :param accumulator: Accumulator object
+        :return: None
+        """
+        self.accumulators[name] = accumulator
+
+    def run(self, records):
+        """
+        Feed every record to every registered accumulator.
+        :param records: Iterable of records as dictionaries, e.g. FileManager.iter_csv()
+        :return: Dictionary mapping each accumulator name to its result
+        """
+        adders = [accumulator.add for accumulator in self.accumulators.values()]
+        for record in records:
+            for add in adders:
+                add(record)
+        return {name: accumulator.result() for name, accumulator in self.accumulators.items()}
@@ -0,0 +1,88 @@
+import collections
+import copy
+import os
+import threading
+
+# Returned by ResultCache.get when there is no valid entry, None being a valid cached value
+MISSING = object()
+
+
+class ResultCache:
+    """
+    Size-bounded LRU cache of results computed from the 'data' table, e.g. by DatabaseManager.
+    Every entry is stored with the fingerprint of the table it was computed from, and is only returned
+    for the same fingerprint: an entry of an older state of the table is dropped when it is looked up.
+    """
+    def __init__(self, max_entries=64):
+        """
+        :param max_entries: Maximum number of entries, the least recently used one is evicted beyond it
+        """
+        if max_entries < 1:
+            raise ValueError(f"Invalid cache size: {max_entries}")
+        self.max_entries = max_entries
+        self.entries = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, fingerprint):
+        """
+        Get the value of a key, if it was computed from the table with this fingerprint.
+        :param key: Hashable key of the result
+        :param fingerprint: Fingerprint of the current state of the table
+        :return: A copy of the cached value, MISSING if there is none
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] != fingerprint:
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return MISSING
+            self.entries.move_to_end(key)
+            self.hits += 1
+        # The callers may change the value they get, the cached one must stay as it was
+        return copy.deepcopy(entry[1])
+
+    def put(self, key, fingerprint, value):
+        """
+        Store the value of a key, computed from the table with this fingerprint.
+        :return: None
+        """
+        with self.lock:
+            self.entries[key] = (fingerprint, copy.deepcopy(value))
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def discard(self, key):
+        """
+        Drop the entry of a key, if there is one.
+        :return: None
+        """
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        """
+        Drop every entry.
+        :return: None
+        """
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+
+def get_file_signature(path):
+    """
+    Get what identifies the current content of a file written by an export.
+    :param path: Path of the file
+    :return: Tuple of (absolute path, size, modification time), None if the file doesn't exist
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return os.path.abspath(path), stat.st_size, stat.st_mtime_ns
@@ -0,0 +1,310 @@
+from utils import databaseManager
+from utils import metrics
+from utils import reportStatistics
+from concurrent.futures import ThreadPoolExecutor
+import copy
+import itertools
+import logging
+import os
+import queue
+import time
+import zlib
+
+# Functions extracting the shard key of a (name, email, zip_code, title) record
+SHARD_KEYS = {
+    'email': lambda record: record[1],
+    'company': lambda record: reportStatistics.extract_company(record[1]),
+    'zip_code': lambda record: record[2],
+}
+
+
+def get_shard_files(db_file, shard_count):
+    """
+    Get the paths of the shards of a database, named after it (sample.shard0001.db, ...).
+    :param db_file: Path of the unsharded database
+    :param shard_count: Number of shards
+    :return: List of the shard database files
+    """
+    base, extension = os.path.splitext(db_file)
+    return [f"{base}.shard{index:04d}{extension}" for index in range(1, shard_count + 1)]
+
+
+class ShardedDatabaseManager:
+    """
+    The 'data' table hash-partitioned across several SQLite files, one DatabaseManager per shard. Each record
+    goes to the shard given by the CRC32 of its shard key, so every shard has its own writer and the loads,
+    exports and report aggregates run on all the shards at the same time and are then merged.
+    The ids are assigned by each shard, they are only unique within a shard.
+    """
+    def __init__(self, db_files, shard_key='email', workers=None):
+        """
+        Initializes the ShardedDatabaseManager with the shard database files.
+
+        :param db_files: List of the shard database files, see get_shard_files. The same files must always be
+                         given in the same order, a record is found in its shard by its position.
+        :param shard_key: 'email', 'company' (the email domain) or 'zip_code'. Partitioning on 'email' or
+                          'company' keeps every email in a single shard, which bulk_upsert on the email needs.
+        :param workers: Maximum number of shards worked on at the same time, None for all of them.
+                        The loads always run every shard at the same time.
+        """
+        if not db_files:
+            raise ValueError("At least one shard database file is needed")
+        if shard_key not in SHARD_KEYS:
+            raise ValueError(f"Unknown shard key: {shard_key}")
+        self.logger = logging.getLogger(__name__)
+        logging.basicConfig(level=logging.INFO)
+        self.db_files = list(db_files)
+        self.shard_key = shard_key
+        self.get_key = SHARD_KEYS[shard_key]
+        # The pool mode lets the worker threads use the connections of every shard
+        self.shards = [databaseManager.DatabaseManager(db_file, use_pool=True) for db_file in self.db_files]
+        self.executor = ThreadPoolExecutor(max_workers=workers or len(self.shards), thread_name_prefix="shard")
+
+    def get_shard_index(self, record):
+        """
+        Returns the position of the shard holding a record.
+        """
+        return zlib.crc32(self.get_key(record).encode('utf-8')) % len(self.shards)
+
+    def split(self, records):
+        """
+        Splits records into one list per shard.
+        """
+        parts = [[] for _ in self.shards]
+        shard_count = len(self.shards)
+        get_key = self.get_key
+        for record in records:
+            parts[zlib.crc32(get_key(record).encode('utf-8')) % shard_count].append(record)
+        return parts
+
+    def map_shards(self, func, *iterables):
+        """
+        Calls func with every shard (and the matching items of iterables) on the worker threads.
+        Returns the results in shard order.
+        """
+        return list(self.executor.map(func, self.shards, *iterables))
+
+    def create_table(self):
+        """
+        Creates the 'data' table in every shard.
+        """
+        self.map_shards(lambda shard: shard.create_table())
+
+    def create_indexes(self):
+        """
+        Creates the secondary indexes of the 'data' table in every shard.
+        """
+        self.map_shards(lambda shard: shard.create_indexes())
+
+    @metrics.timed('database_operation_seconds')
+    def insert_data(self, data):
+        """
+        Inserts records into their shards.
+
+        :param data: List of (name, email, zip_code, title) tuples.
+        """
+        self.map_shards(lambda shard, rows: shard.insert_data(rows) if rows else None, self.split(data))
+
+    @metrics.timed('database_operation_seconds')
+    def bulk_insert(self, records, chunk_size=100000, pragmas=None):
+        """
+        Inserts records from any iterable into their shards, see DatabaseManager.bulk_insert.
+        Each shard inserts its records with a single bulk_insert call.
+
+        :return: Number of records inserted, None if a shard failed.
+        """
+        results = self._load(records, chunk_size, lambda shard, rows: shard.bulk_insert(rows, chunk_size, pragmas))
+        if results is None:
+            return None
+        return sum(results)
+
+    @metrics.timed('database_operation_seconds')
+    def bulk_upsert(self, records, key='email', on_conflict='update', chunk_size=100000, pragmas=None):
+        """
+        Upserts records into their shards, see DatabaseManager.bulk_upsert. The key must keep every record
+        in a single shard: it must hold the shard key, or the email when partitioning on the company.
+        Each shard upserts its records with a single bulk_upsert call, which builds its unique index once.
+
+        :return: Dictionary of the numbers of records inserted, updated and skipped, None if a shard failed.
+        """
+        key_columns = [key] if isinstance(key, str) else list(key)
+        if self.shard_key not in key_columns and not (self.shard_key == 'company' and 'email' in key_columns):
+            raise ValueError(f"The uniqueness key {key} doesn't determine the shard key {self.shard_key}")
+        results = self._load(records, chunk_size,
+                             lambda shard, rows: shard.bulk_upsert(rows, key, on_conflict, chunk_size, pragmas))
+        if results is None:
+            return None
+        return {name: sum(counts[name] for counts in results) for name in ('inserted', 'updated', 'skipped')}
+
+    def _load(self, records, chunk_size, load):
+        """
+        Splits records into their shards chunk by chunk and streams the parts of every shard into a single
+        load(shard, records) call, so a shard sets its PRAGMAs and builds its upsert index once per load.
+        Each shard is loaded by its own thread, whatever the number of workers, as it consumes its stream
+        until the end. Returns the result of every shard, None if one of them failed.
+        """
+        start_time = time.perf_counter()
+        streams = [queue.Queue(maxsize=2) for _ in self.shards]
+        with ThreadPoolExecutor(max_workers=len(self.shards), thread_name_prefix="shard-load") as executor:
+            futures = [executor.submit(self._consume, load, shard, stream)
+                       for shard, stream in zip(self.shards, streams)]
+            try:
+                records = iter(records)
+                while True:
+                    chunk = list(itertools.islice(records, chunk_size))
+                    if not chunk:
+                        break
+                    # The next chunk is split while the shards load the previous one
+                    for stream, rows in zip(streams, self.split(chunk)):
+                        if rows:
+                            stream.put(rows)
+            finally:
+                for stream in streams:
+                    stream.put(None)
+            results = [future.result() for future in futures]
+        if any(result is None for result in results):
+            self.logger.error("Failed to load the records into every shard")
+            return None
+        self.logger.info(f"Records loaded into {len(self.shards)} shards in {time.perf_counter() - start_time:.3f}s.")
+        return results
+
+    def _consume(self, load, shard, stream):
+        """
+        Calls load(shard, records) with the records of the chunks put on stream, up to None.
+        """
+        ended = []
+
+        def iter_records():
+            for rows in iter(stream.get, None):
+                yield from rows
+            ended.append(True)
+
+        try:
+            return load(shard, iter_records())
+        finally:
+            # Take the chunks left by a load that stopped early, so the split of the next ones isn't blocked
+            if not ended:
+                while stream.get() is not None:
+                    pass
+
+    @metrics.timed('database_operation_seconds')
+    def export_parallel(self, sinks, workers=None, merge=True, batch_size=1000):
+        """
+        Exports every shard with a worker process to shard files named after the sink outputs
+        (data.shard0001.csv, ...), which are then concatenated in shard order.
+
+        :param sinks: List of ExportSink objects (CsvSink, JsonSink, ...).
+        :param workers: Number of worker processes, None for one per shard.
+        :param merge: Concatenate the shard files into the sink outputs and delete them. With False the
+                      shard files are left as a partitioned output set.
+        :param batch_size: Number of rows fetched from the cursor at a time.
+        :return: Tuple of (number of rows exported, list of the shard files of each sink, empty when merged).
+        """
+        from concurrent.futures import ProcessPoolExecutor  # Imported here, it is slow to import
+
+        start_time = time.perf_counter()
+        shard_files = [[] for _ in sinks]
+        tasks = []
+        for index, db_file in enumerate(self.db_files, start=1):
+            shard_sinks = []
+            for sink, files in zip(sinks, shard_files):
+                shard_sink = copy.copy(sink)
+                base, extension = os.path.splitext(sink.output_file)
+                shard_sink.output_file = f"{base}.shard{index:04d}{extension}"
+                shard_sink.append = False
+                shard_sinks.append(shard_sink)
+                files.append(shard_sink.output_file)
+            tasks.append((db_file, shard_sinks, None, None, batch_size))
+
+        with ProcessPoolExecutor(max_workers=workers or len(tasks)) as executor:
+            row_count = sum(executor.map(databaseManager.export_partition, *zip(*tasks)))
+
+        if merge:
+            for sink, files in zip(sinks, shard_files):
+                sink.merge(files)
+                for shard_file in files:
+                    os.remove(shard_file)
+            shard_files = [[] for _ in sinks]
+
+        outputs = ', '.join(sink.output_file for sink in sinks)
+        self.logger.info(f"{row_count} records exported from {len(self.shards)} shards to {outputs} "
+                         f"in {time.perf_counter() - start_time:.3f}s.")
+        return row_count, shard_files
+
+    def export_to_csv(self, output_file, batch_size=1000, compression=None):
+        """
+        Exports every shard to a single CSV file, see export_parallel.
+
+        :return: Number of rows exported.
+        """
+        return self.export_parallel([databaseManager.CsvSink(output_file, compression=compression)],
+                                    batch_size=batch_size)[0]
+
+    def export_to_json(self, output_file, json_format='array', indent=4, batch_size=1000, compression=None):
+        """
+        Exports every shard to a single JSON (or NDJSON) file, see export_parallel.
+
+        :return: Number of rows exported.
+        """
+        sink = databaseManager.JsonSink(output_file, json_format, indent, compression=compression)
+        return self.export_parallel([sink], batch_size=batch_size)[0]
+
+    def get_cached_result(self, key, compute):
+        """
+        Computes a result, the results of several shards are not cached.
+        """
+        return compute()
+
+    def count_records(self):
+        """
+        Counts the records of every shard, None if a shard failed.
+        """
+        counts = self.map_shards(lambda shard: shard.count_records())
+        if None in counts:
+            return None
+        return sum(counts)
+
+    def get_sample_records(self, limit):
+        """
+        Returns the first records of the shards, taken in shard order. None if a shard failed.
+        """
+        results = self.map_shards(lambda shard: shard.get_sample_records(limit))
+        if None in results:
+            return None
+        sample_records = []
+        for records in results:
+            sample_records += records[:limit - len(sample_records)]
+        return sample_records
+
+    def get_companies(self):
+        """
+        Returns the unique companies of every shard, in shard order and then in order of first appearance.
+        None if a shard failed.
+        """
+        results = self.map_shards(lambda shard: shard.get_companies())
+        if None in results:
+            return None
+        companies = {}
+        for shard_companies in results:
+            companies.update(dict.fromkeys(shard_companies))
+        return list(companies)
+
+    def get_title_counts(self):
+        """
+        Counts the records of each title over every shard, None if a shard failed.
+        """
+        results = self.map_shards(lambda shard: shard.get_title_counts())
+        if None in results:
+            return None
+        title_counts = {}
+        for shard_title_counts in results:
+            for title, count in shard_title_counts.items():
+                title_counts[title] = title_counts.get(title, 0) + count
+        return title_counts
+
+    def close_connection(self):
+        """
+        Closes the connections of every shard.
+        """
+        self.map_shards(lambda shard: shard.close_connection())
+        self.executor.shutdown()
@@ -0,0 +1,56 @@
+import asyncio
+import os
+import unittest
+from utils.asyncDatabaseManager import AsyncDatabaseManager
+import logging
+class TestAsyncDatabaseManager(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+        self.logger = logging.getLogger(__name__)
+
+        # Initialize the AsyncDatabaseManager
+        self.db_manager_test = AsyncDatabaseManager('test_sample.db', max_workers=2)
+        await self.db_manager_test.create_table()
+
+        self.sample_data = [(f'Name {i}', f'user{i}@example.com', f'{i:05d}', 'Engineer') for i in range(25)]
+        await self.db_manager_test.insert_data(self.sample_data)
+
+    async def test_iter_rows(self):
+        # The async iterator streams every row in id order across several batches
+        rows = [row async for row in self.db_manager_test.iter_rows(batch_size=10)]
+        self.assertEqual([row[1:] for row in rows], self.sample_data)
+        self.assertEqual([row[0] for row in rows], list(range(1, 26)))
+        self.logger.info("test_iter_rows: async iteration test passed.")
+
+    async def test_concurrent_exports(self):
+        # Several exports and queries awaited together on the bounded thread pool
+        results = await asyncio.gather(
+            self.db_manager_test.export_to_csv('test_output.csv'),
+            self.db_manager_test.export_to_json('test_output.json'),
+            self.db_manager_test.export_to_json('test_output.ndjson', json_format='ndjson'),
+            self.db_manager_test.count_records(),
+            self.db_manager_test.get_title_counts(),
+        )
+        self.assertEqual(results, [25, 25, 25, 25, {'Engineer': 25}])
+        self.logger.info("test_concurrent_exports: concurrent export test passed.")
+
+    async def test_bulk_insert(self):
+        records = ((f'Name {i}', f'user{i}@example.com', f'{i:05d}', 'Manager') for i in range(25))
+        self.assertEqual(await self.db_manager_test.bulk_insert(records, chunk_size=10), 25)
+        self.assertEqual(await self.db_manager_test.count_records(), 50)
+        self.logger.info("test_bulk_insert: async bulk insertion test passed.")
+
+    async def asyncTearDown(self):
+        # Close the database connections after each test
+        await self.db_manager_test.close_connection()
+
+        # Delete the test database and output files after each test
+        for file_name in ('test_sample.db', 'test_sample.db-wal', 'test_sample.db-shm',
+                          'test_output.csv', 'test_output.json', 'test_output.ndjson'):
+            if os.path.exists(file_name):
+                os.remove(file_name)
+
+        # print dashes for pretty reading output log
+        print('-------------------------------------------')
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import unittest
+import cli
+import logging
+class TestCli(unittest.TestCase):
+    def setUp(self):
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+        self.logger = logging.getLogger(__name__)
+        self.assertEqual(cli.run(['ingest', '--db', 'test_cli.db']), 0)
+
+    def run_stats(self, db_file):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            self.assertEqual(cli.run(['stats', '--db', db_file, '--json']), 0)
+        return json.loads(output.getvalue())
+
+    def test_stats(self):
+        statistics = self.run_stats('test_cli.db')
+        self.assertEqual(statistics['total_records'], 10)
+        self.assertEqual(statistics['unique_companies'], ['siemens', 'valeo', 'we', 'vodafone', 'orange'])
+        self.assertEqual(statistics['title_counts']['Engineer'], 2)
+        self.assertEqual(cli.run(['stats', '--db', 'missing_test_cli.db']), 1)
+        self.logger.info("test_stats: passed")
+
+    def test_export_and_ingest(self):
+        self.assertEqual(cli.run(['export', '--db', 'test_cli.db', '--csv', 'test_cli.csv.gz', '--compression', 'gzip',
+                                  '--json', 'test_cli.json', '--json-format', 'ndjson']), 0)
+        # Both files are imported into a new database
+        self.assertEqual(cli.run(['ingest', '--db', 'test_cli_copy.db', 'test_cli.csv.gz', 'test_cli.json']), 0)
+        statistics = self.run_stats('test_cli_copy.db')
+        self.assertEqual(statistics['total_records'], 20)
+        self.assertEqual(statistics['title_counts']['Engineer'], 4)
+        # Ingesting the same records again with a uniqueness key adds no copies
+        self.assertEqual(cli.run(['ingest', '--db', 'test_cli.db']), 0)
+        self.assertEqual(cli.run(['ingest', '--db', 'test_cli.db', '--key', 'email', 'test_cli.json']), 0)
+        self.assertEqual(self.run_stats('test_cli.db')['total_records'], 10)
+        self.logger.info("test_export_and_ingest: passed")
+
+    def test_ingest_missing_file(self):
+        with self.assertLogs(level='ERROR'):
+            self.assertEqual(cli.run(['ingest', '--db', 'test_cli.db', 'missing_test_cli.csv']), 1)
+        self.assertEqual(self.run_stats('test_cli.db')['total_records'], 10)
+        self.logger.info("test_ingest_missing_file: passed")
+
+    def test_report(self):
+        # A missing database isn't created
+        self.assertEqual(cli.run(['report', '--db', 'missing_test_cli.db']), 1)
+        self.assertFalse(os.path.exists('missing_test_cli.db'))
+        # A report that can't be written fails, as it does without reportlab
+        self.assertEqual(cli.run(['report', '--db', 'test_cli.db',
+                                  '--output', os.path.join('missing_test_cli_dir', 'report.pdf')]), 1)
+        self.logger.info("test_report: passed")
+
+    def test_lazy_imports(self):
+        # A stats-only run doesn't import the report, the importer, the file readers or the optional codecs
+        root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        code = ("import sys, cli; cli.run(['stats', '--db', sys.argv[1]]); "
+                "print([m for m in ('reportlab', 'utils.report', 'utils.dataImporter', 'utils.fileManager', "
+                "'zstandard', 'lz4') if m in sys.modules])")
+        result = subprocess.run([sys.executable, '-c', code, os.path.abspath('test_cli.db')], cwd=root_dir,
+                                capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.splitlines()[-1], '[]')
+        self.logger.info("test_lazy_imports: passed")
+
+    def tearDown(self):
+        # Delete the files created by the tests
+        for path in ('test_cli.db', 'test_cli_copy.db', 'test_cli.csv.gz', 'test_cli.json'):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+if __name__ == "__main__":
+    unittest.main()
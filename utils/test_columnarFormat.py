@@ -0,0 +1,101 @@
+import os
+import unittest
+from utils.columnarFormat import (ColumnarFile, ColumnarWriter, DictionaryColumn, EmailColumn, Int64Column,
+                                  NullableColumn)
+import logging
+class TestColumnarFormat(unittest.TestCase):
+    def setUp(self):
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+        self.logger = logging.getLogger(__name__)
+
+        self.columns = ['id', 'name', 'email', 'zip_code', 'title']
+        self.rows = [
+            (1, 'John Doe', 'john@siemens.com', '12345', 'Manager'),
+            (2, 'Jöhn Dœ', 'no-domain', '23456', 'Developer'),
+            (3, 'Jane Smith', 'jane@valeo.de', '34567', 'Manager'),
+        ]
+
+    def test_write_read(self):
+        writer = ColumnarWriter('test_output.col', self.columns)
+        # Rows written in several batches make a single column
+        writer.write(self.rows[:2])
+        writer.write(self.rows[2:])
+        writer.close()
+
+        with ColumnarFile('test_output.col') as columnar:
+            self.assertEqual(columnar.row_count, 3)
+            self.assertEqual(columnar.column_names, self.columns)
+            self.assertEqual(list(columnar.iter_rows()), self.rows)
+            self.assertEqual(next(columnar.iter_records(['id', 'title'])), {'id': 1, 'title': 'Manager'})
+
+            # The ids and the dictionary codes are views over the file
+            ids = columnar.column('id')
+            self.assertIsInstance(ids, Int64Column)
+            self.assertIsInstance(ids.values, memoryview)
+            self.assertEqual(ids.values.tolist(), [1, 2, 3])
+
+            titles = columnar.column('title')
+            self.assertIsInstance(titles, DictionaryColumn)
+            self.assertEqual(titles.dictionary, ['Manager', 'Developer'])
+            self.assertEqual(titles.codes.tolist(), [0, 1, 0])
+            self.assertEqual(titles.value_counts(), {'Manager': 2, 'Developer': 1})
+
+            emails = columnar.column('email')
+            self.assertIsInstance(emails, EmailColumn)
+            self.assertEqual(emails.domains.dictionary, ['siemens.com', 'valeo.de'])
+            self.assertEqual(emails[1], 'no-domain')
+            self.assertEqual(columnar.column('name')[1], 'Jöhn Dœ')
+        self.logger.info("test_write_read: passed")
+
+    def test_null_values(self):
+        # 10 rows without NULLs then a batch crossing the byte boundaries of the validity bitmap
+        rows = [(index, f'Name {index}', f'user{index}@we.com', f'{index:05d}', 'Manager') for index in range(10)]
+        rows += [(10, None, None, None, None), (11, 'Ann Lee', 'no-domain', None, 'Analyst'),
+                 (12, None, 'ann@orange.com', '11111', None)] + rows[:6]
+        writer = ColumnarWriter('test_output.col', self.columns)
+        writer.write(rows[:10])
+        writer.write(rows[10:])
+        writer.close()
+
+        with ColumnarFile('test_output.col') as columnar:
+            self.assertEqual(list(columnar.iter_rows()), rows)
+            self.assertIsInstance(columnar.column('id'), Int64Column)
+            titles = columnar.column('title')
+            self.assertIsInstance(titles, NullableColumn)
+            self.assertEqual((titles[10], titles[11], titles[-1]), (None, 'Analyst', 'Manager'))
+            self.assertEqual(titles.value_counts(), {'Manager': 16, 'Analyst': 1})
+            self.assertEqual(columnar.column('email')[10], None)
+            self.assertEqual(columnar.column('email')[11], 'no-domain')
+
+        # A column of NULLs only
+        writer = ColumnarWriter('test_output.col', self.columns)
+        writer.write([(1, None, None, None, None)])
+        writer.close()
+        with ColumnarFile('test_output.col') as columnar:
+            self.assertEqual(list(columnar.iter_rows()), [(1, None, None, None, None)])
+            self.assertEqual(columnar.column('title').value_counts(), {})
+        self.logger.info("test_null_values: passed")
+
+    def test_empty_file(self):
+        ColumnarWriter('test_output.col', self.columns).close()
+        with ColumnarFile('test_output.col') as columnar:
+            self.assertEqual(columnar.row_count, 0)
+            self.assertEqual(list(columnar.iter_rows()), [])
+            self.assertEqual(columnar.column('title').value_counts(), {})
+        self.logger.info("test_empty_file: passed")
+
+    def test_invalid_file(self):
+        with open('test_output.col', 'wb') as file:
+            file.write(b'id,name\n1,John Doe\n')
+        with self.assertRaises(ValueError):
+            ColumnarFile('test_output.col')
+        self.logger.info("test_invalid_file: passed")
+
+    def tearDown(self):
+        # Delete the columnar file after each test
+        if os.path.exists('test_output.col'):
+            os.remove('test_output.col')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+from utils.compactRecords import Record, RecordTable
+from utils.reportStatistics import CompanyAccumulator, CountAccumulator, StatisticsPipeline, ValueCountAccumulator
+import logging
+class TestCompactRecords(unittest.TestCase):
+    def setUp(self):
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+        self.logger = logging.getLogger(__name__)
+
+        # Titles built at run time, so equal titles are distinct string objects
+        self.records = [
+            {'id': '1', 'name': 'John Doe', 'email': 'john@siemens.com', 'title': ''.join(['Mana', 'ger'])},
+            {'id': '2', 'name': 'Jane Smith', 'email': 'jane@valeo.de', 'title': 'Developer'},
+            {'id': '3', 'name': 'Ian Clarke', 'email': 'ian@siemens.com', 'title': ''.join(['Man', 'ager'])},
+        ]
+
+    def test_record_table(self):
+        table = RecordTable.from_records(iter(self.records))
+        self.assertEqual(len(table), 3)
+        self.assertEqual(table.fields, ('id', 'name', 'email', 'title'))
+        self.assertEqual([dict(record) for record in table], self.records)
+        self.assertEqual(table[2]['name'], 'Ian Clarke')
+
+        # The repeated titles point to the same string
+        titles = table.column('title')
+        self.assertIs(titles[0], titles[2])
+        self.logger.info("test_record_table: passed")
+
+    def test_record(self):
+        record = Record({'id': 0, 'title': 1}, ('1', 'Manager'))
+        self.assertEqual(record['title'], 'Manager')
+        self.assertEqual(record.get('email', ''), '')
+        self.assertEqual(list(record.items()), [('id', '1'), ('title', 'Manager')])
+        self.assertEqual(record, {'id': '1', 'title': 'Manager'})
+        with self.assertRaises(AttributeError):
+            record.extra = 'value'  # No per-record dictionary
+        self.logger.info("test_record: passed")
+
+    def test_statistics_pipeline(self):
+        pipeline = StatisticsPipeline()
+        pipeline.register('total_records', CountAccumulator())
+        pipeline.register('companies', CompanyAccumulator())
+        pipeline.register('title_counts', ValueCountAccumulator('title'))
+        statistics = pipeline.run(RecordTable.from_records(self.records))
+        self.assertEqual(statistics, {'total_records': 3, 'companies': ['siemens', 'valeo'],
+                                      'title_counts': {'Manager': 2, 'Developer': 1}})
+        self.logger.info("test_statistics_pipeline: passed")
+
+    def test_empty_table(self):
+        table = RecordTable.from_records([])
+        self.assertEqual(len(table), 0)
+        self.assertEqual(list(table), [])
+        self.logger.info("test_empty_table: passed")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import os
+import unittest
+from utils.compressionCodecs import available_codecs, check_codec, detect_compression, open_input, open_output
+import logging
+class TestCompressionCodecs(unittest.TestCase):
+    def setUp(self):
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+        self.logger = logging.getLogger(__name__)
+        self.lines = [f'{i},Name {i},user{i}@example.com\n' for i in range(1000)]
+
+    def test_round_trip(self):
+        for codec in available_codecs():
+            for use_thread in (False, True):
+                # A small buffer hands many chunks to the compression thread
+                with open_output('test_output.csv.z', codec, buffer_size=1024, use_thread=use_thread) as stream:
+                    for line in self.lines:
+                        stream.write(line.encode())
+                self.assertEqual(detect_compression('test_output.csv.z'), codec)
+                self.assertLess(os.path.getsize('test_output.csv.z'), len(''.join(self.lines)))
+                with open_input('test_output.csv.z') as file:
+                    self.assertEqual(file.readlines(), self.lines)
+        self.logger.info("test_round_trip: passed")
+
+    def test_append(self):
+        for codec in available_codecs():
+            for lines, append in ((self.lines[:10], False), (self.lines[10:], True)):
+                with open_output('test_output.csv.z', codec, append=append) as stream:
+                    stream.write(''.join(lines).encode())
+            # Each run adds a frame, read back as a single stream
+            with open_input('test_output.csv.z') as file:
+                self.assertEqual(file.readlines(), self.lines)
+        self.logger.info("test_append: passed")
+
+    def test_uncompressed_file(self):
+        with open('test_output.csv.z', 'w') as file:
+            file.writelines(self.lines)
+        self.assertIsNone(detect_compression('test_output.csv.z'))
+        with open_input('test_output.csv.z') as file:
+            self.assertEqual(file.readlines(), self.lines)
+        self.logger.info("test_uncompressed_file: passed")
+
+    def test_check_codec(self):
+        check_codec('gzip')
+        with self.assertRaises(ValueError):
+            check_codec('rar')
+        for codec in ('zstd', 'lz4'):
+            if codec not in available_codecs():
+                with self.assertRaises(ValueError):
+                    check_codec(codec)
+        self.logger.info("test_check_codec: passed")
+
+    def tearDown(self):
+        # Delete the compressed file after each test
+        if os.path.exists('test_output.csv.z'):
+            os.remove('test_output.csv.z')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+from utils.dataGenerator import DataGenerator
+import logging
+class TestDataGenerator(unittest.TestCase):
+    def setUp(self):
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+        self.logger = logging.getLogger(__name__)
+
+    def test_reproducible(self):
+        records = list(DataGenerator(seed=42).iter_records(1000))
+        self.assertEqual(records, list(DataGenerator(seed=42).iter_records(1000)))
+        self.assertNotEqual(records, list(DataGenerator(seed=43).iter_records(1000)))
+        # A longer run starts with the same records
+        self.assertEqual(records[:10], list(DataGenerator(seed=42).iter_records(10)))
+        self.logger.info("test_reproducible: passed")
+
+    def test_settings(self):
+        generator = DataGenerator(title_count=20, company_count=3, name_length=(2, 3), zip_code_count=10)
+        records = list(generator.iter_records(5000))
+        self.assertEqual(len({title for _, _, _, title in records}), 20)
+        self.assertEqual({email.split('@')[1] for _, email, _, _ in records}, {'siemens.com', 'valeo.com', 'we.com'})
+        self.assertEqual(len({zip_code for _, _, zip_code, _ in records}), 10)
+        self.assertTrue(all(2 <= len(part) <= 3 for name, _, _, _ in records for part in name.split(' ')))
+        # The emails are unique
+        self.assertEqual(len({email for _, email, _, _ in records}), 5000)
+        self.assertEqual(generator.get_settings()['title_count'], 20)
+        self.logger.info("test_settings: passed")
+
+    def test_iter_chunks(self):
+        generator = DataGenerator()
+        chunks = list(generator.iter_chunks(25, chunk_size=10))
+        self.assertEqual([len(chunk) for chunk in chunks], [10, 10, 5])
+        self.assertEqual([record for chunk in chunks for record in chunk], list(generator.iter_records(25)))
+        self.logger.info("test_iter_chunks: passed")
+
+    def test_invalid_settings(self):
+        with self.assertRaises(ValueError):
+            DataGenerator(title_count=0)
+        with self.assertRaises(ValueError):
+            DataGenerator(name_length=(5, 2))
+        self.logger.info("test_invalid_settings: passed")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import os
+import unittest
+from utils.databaseManager import DatabaseManager, CsvSink, JsonSink
+from utils.dataImporter import DataImporter
+import logging
+class TestDataImporter(unittest.TestCase):
+    def setUp(self):
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+        self.logger = logging.getLogger(__name__)
+
+        # Export a source database to CSV, JSON and NDJSON files
+        self.sample_data = [(f'Name {i}', f'user{i}@example.com', f'{i:05d}', 'Engineer') for i in range(25)]
+        source_db = DatabaseManager('test_source.db')
+        source_db.create_table()
+        source_db.insert_data(self.sample_data)
+        source_db.export([CsvSink('test_input.csv'), JsonSink('test_input.json'),
+                          JsonSink('test_input.ndjson', json_format='ndjson')])
+        source_db.close_connection()
+
+        # Initialize the DatabaseManager to import into
+        self.db_manager_test = DatabaseManager('test_sample.db')
+        self.db_manager_test.create_table()
+
+    def get_rows(self):
+        cursor = self.db_manager_test.conn.cursor()
+        cursor.execute("SELECT name, email, zip_code, title FROM data ORDER BY id")
+        return cursor.fetchall()
+
+    def test_import_files(self):
+        importer = DataImporter(self.db_manager_test)
+        for input_file, import_method in (('test_input.csv', importer.import_csv),
+                                          ('test_input.json', importer.import_json),
+                                          ('test_input.ndjson', importer.import_json)):
+            for use_parser_thread in (False, True):
+                self.db_manager_test.conn.execute("DELETE FROM data")
+                row_count = import_method(input_file, chunk_size=10, use_parser_thread=use_parser_thread)
+                self.assertEqual(row_count, len(self.sample_data))
+                self.assertEqual(self.get_rows(), self.sample_data)
+        self.logger.info("test_import_files: import test passed.")
+
+    def test_import_upsert(self):
+        importer = DataImporter(self.db_manager_test)
+        counts = importer.import_csv('test_input.csv', key='email')
+        self.assertEqual(counts, {'inserted': len(self.sample_data), 'updated': 0, 'skipped': 0})
+        # The same records imported again are all skipped
+        counts = importer.import_json('test_input.ndjson', key='email', on_conflict='ignore')
+        self.assertEqual(counts, {'inserted': 0, 'updated': 0, 'skipped': len(self.sample_data)})
+        self.assertEqual(self.get_rows(), self.sample_data)
+        self.logger.info("test_import_upsert: upsert import test passed.")
+
+    def test_import_column_mapping(self):
+        with open('test_input.csv', 'w', newline='') as file:
+            file.write('full_name,email,zip,title\nJohn Doe,john@example.com,12345,Manager\n')
+        importer = DataImporter(self.db_manager_test, column_mapping={'name': 'full_name', 'zip_code': 'zip'})
+        self.assertEqual(importer.import_csv('test_input.csv'), 1)
+        self.assertEqual(self.get_rows(), [('John Doe', 'john@example.com', '12345', 'Manager')])
+        self.logger.info("test_import_column_mapping: column mapping test passed.")
+
+    def test_import_missing_field(self):
+        with open('test_input.csv', 'w', newline='') as file:
+            file.write('name,email\nJohn Doe,john@example.com\n')
+        importer = DataImporter(self.db_manager_test)
+        with self.assertLogs(level='ERROR') as log:
+            self.assertIsNone(importer.import_csv('test_input.csv'))
+            self.assertIn("missing field", log.output[0])
+        self.assertEqual(self.get_rows(), [])
+        self.logger.info("test_import_missing_field: Exception handling test passed.")
+
+    def test_import_unreadable_file(self):
+        importer = DataImporter(self.db_manager_test)
+        # A missing file isn't an import of 0 records
+        for use_parser_thread in (False, True):
+            with self.assertLogs(level='ERROR'):
+                self.assertIsNone(importer.import_csv('missing_input.csv', use_parser_thread=use_parser_thread))
+        with self.assertLogs(level='ERROR'):
+            self.assertIsNone(importer.import_json('missing_input.json', key='email'))
+        # Nor is a corrupt one
+        with open('test_input.json', 'w') as file:
+            file.write('[{"name": "John Doe", ')
+        with self.assertLogs(level='ERROR'):
+            self.assertIsNone(importer.import_json('test_input.json'))
+        self.assertEqual(self.get_rows(), [])
+        self.logger.info("test_import_unreadable_file: Exception handling test passed.")
+
+    def tearDown(self):
+        # Close the database connection after each test
+        self.db_manager_test.close_connection()
+
+        # Delete the test databases and input files after each test
+        for file_name in ('test_sample.db', 'test_source.db', 'test_input.csv', 'test_input.json', 'test_input.ndjson'):
+            if os.path.exists(file_name):
+                os.remove(file_name)
+
+        # print dashes for pretty reading output log
+        print('-------------------------------------------')
+if __name__ == '__main__':
+    unittest.main()
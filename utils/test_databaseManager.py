@@ -1,8 +1,13 @@
+import gzip
 import os
+import shutil
+import json
+import threading
 import unittest
 from unittest.mock import patch
-from databaseManager import DatabaseManager
+from utils.databaseManager import DatabaseManager, CsvSink, JsonSink, ColumnarSink, BULK_LOAD_PRAGMAS, COMPANY_EXPRESSION
 from sqlite3 import Error
+from utils.columnarFormat import ColumnarFile
 import logging
 class TestDatabaseManager(unittest.TestCase):
     def setUp(self):
@@ -93,6 +98,24 @@ class TestDatabaseManager(unittest.TestCase):
             self.assertIn('Jane Smith', content)
         self.logger.info("test_export_to_csv: CSV export test passed.")
 
+    def test_export_to_csv_batches(self):
+        # Insert more rows than the batch size so several fetchmany batches are needed
+        sample_data = [(f'Name {i}', f'user{i}@example.com', f'{i:05d}', 'Engineer') for i in range(25)]
+        self.db_manager_test.insert_data(sample_data)
+
+        # Export to CSV with a small batch size
+        output_file = 'test_output.csv'
+        row_count = self.db_manager_test.export_to_csv(output_file, batch_size=10)
+
+        # Verify every row was written once, after the header
+        self.assertEqual(row_count, len(sample_data))
+        with open(output_file, 'r') as file:
+            lines = file.read().splitlines()
+        self.assertEqual(lines[0], 'id,name,email,zip_code,title')
+        self.assertEqual(len(lines), len(sample_data) + 1)
+        self.assertEqual(lines[-1], '25,Name 24,user24@example.com,00024,Engineer')
+        self.logger.info("test_export_to_csv_batches: CSV batched export test passed.")
+
     def test_export_to_json(self):
         # Sample data to insert
         sample_data = [
@@ -115,22 +138,575 @@ class TestDatabaseManager(unittest.TestCase):
             self.assertIn('Jane Smith', content)
         self.logger.info("test_export_to_json: JSON export test passed.")
 
+    def test_export_to_json_formats(self):
+        # Insert more rows than the batch size so several fetchmany batches are needed
+        sample_data = [(f'Name {i}', f'user{i}@example.com', f'{i:05d}', 'Engineer') for i in range(25)]
+        self.db_manager_test.insert_data(sample_data)
+        cursor = self.db_manager_test.conn.cursor()
+        cursor.execute("SELECT * FROM data")
+        headers = [description[0] for description in cursor.description]
+        expected = [dict(zip(headers, row)) for row in cursor.fetchall()]
+
+        output_file = 'test_output.json'
+
+        # The indented array keeps the exact layout of json.dump(..., indent=4)
+        self.assertEqual(self.db_manager_test.export_to_json(output_file, batch_size=10), len(sample_data))
+        with open(output_file, 'r') as file:
+            self.assertEqual(file.read(), json.dumps(expected, indent=4))
+
+        # Compact array
+        self.db_manager_test.export_to_json(output_file, indent=None, batch_size=10)
+        with open(output_file, 'r') as file:
+            self.assertEqual(file.read(), json.dumps(expected, separators=(',', ':')))
+
+        # One JSON object per line
+        self.db_manager_test.export_to_json(output_file, json_format='ndjson', batch_size=10)
+        with open(output_file, 'r') as file:
+            self.assertEqual([json.loads(line) for line in file], expected)
+        self.logger.info("test_export_to_json_formats: JSON export formats test passed.")
+
+    def test_export_compressed(self):
+        sample_data = [(f'Name {i}', f'user{i}@example.com', f'{i:05d}', 'Engineer') for i in range(25)]
+        self.db_manager_test.insert_data(sample_data)
+        self.db_manager_test.export_to_csv('test_output.csv')
+        self.db_manager_test.export_to_json('test_output.json')
+        expected = {}
+        for output_file in ('test_output.csv', 'test_output.json'):
+            with open(output_file, 'r', newline='') as file:
+                expected[output_file] = file.read()
+
+        for compress_on_thread in (False, True):
+            self.assertEqual(self.db_manager_test.export_to_csv('test_output.csv', batch_size=10, compression='gzip',
+                                                                compress_on_thread=compress_on_thread), 25)
+            self.assertEqual(self.db_manager_test.export_to_json('test_output.json', batch_size=10, compression='gzip',
+                                                                 compress_on_thread=compress_on_thread), 25)
+            for output_file in ('test_output.csv', 'test_output.json'):
+                with gzip.open(output_file, 'rt', newline='') as file:
+                    self.assertEqual(file.read(), expected[output_file])
+
+        # The shards of a parallel export are decompressed and compressed again into a single file
+        sinks = [CsvSink('test_output.csv', compression='gzip'), JsonSink('test_output.json', compression='gzip')]
+        self.db_manager_test.export_parallel(sinks, workers=2, partitions=3)
+        for output_file in ('test_output.csv', 'test_output.json'):
+            with gzip.open(output_file, 'rt', newline='') as file:
+                self.assertEqual(file.read(), expected[output_file])
+
+        # Appending adds a gzip member, without repeating the headers
+        self.db_manager_test.export([CsvSink('test_output.csv', compression='gzip', append=True)])
+        with gzip.open('test_output.csv', 'rt', newline='') as file:
+            lines = file.read().splitlines()
+        self.assertEqual(len(lines), 51)
+        self.assertEqual(lines.count('id,name,email,zip_code,title'), 1)
+
+        with self.assertLogs(level='ERROR') as log:
+            self.assertIsNone(self.db_manager_test.export_to_csv('test_output.csv', compression='rar'))
+            self.assertIn("Unknown compression codec: rar", log.output[0])
+        self.logger.info("test_export_compressed: compressed export test passed.")
+
+    def test_export_to_columnar(self):
+        sample_data = [(f'Name {i}', f'user{i}@company{i % 2}.com', f'{i:05d}', ['Engineer', 'Manager'][i % 2])
+                       for i in range(25)]
+        self.db_manager_test.insert_data(sample_data)
+        self.assertEqual(self.db_manager_test.export_to_columnar('test_output.col', batch_size=10), 25)
+        with ColumnarFile('test_output.col') as columnar:
+            self.assertEqual(columnar.column_names, ['id', 'name', 'email', 'zip_code', 'title'])
+            self.assertEqual(list(columnar.iter_rows()), [(i + 1,) + row for i, row in enumerate(sample_data)])
+            self.assertEqual(columnar.column('email').domains.dictionary, ['company0.com', 'company1.com'])
+
+        # The shards of a parallel export are encoded again into a single file
+        row_count, _ = self.db_manager_test.export_parallel([ColumnarSink('test_output.col')], workers=2, partitions=3)
+        self.assertEqual(row_count, 25)
+        with ColumnarFile('test_output.col') as columnar:
+            self.assertEqual(columnar.column('id').values.tolist(), list(range(1, 26)))
+            self.assertEqual(columnar.column('title').value_counts(), {'Engineer': 13, 'Manager': 12})
+        self.logger.info("test_export_to_columnar: columnar export test passed.")
+
+    def test_export_to_columnar_null_values(self):
+        # The schema of sample.db allows NULLs in every column but the id
+        self.db_manager_test.conn.execute("DROP TABLE data")
+        self.db_manager_test.conn.execute("CREATE TABLE data (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, "
+                                          "email TEXT, zip_code TEXT, title TEXT)")
+        sample_data = [('John Doe', 'john@siemens.com', '12345', 'Manager'), (None, None, None, None),
+                       ('Jane Smith', None, '67890', None)]
+        self.db_manager_test.insert_data(sample_data)
+        self.assertEqual(self.db_manager_test.export_to_columnar('test_output.col'), 3)
+        with ColumnarFile('test_output.col') as columnar:
+            self.assertEqual(list(columnar.iter_rows()), [(i + 1,) + row for i, row in enumerate(sample_data)])
+            self.assertEqual(columnar.column('title').value_counts(), {'Manager': 1})
+        self.logger.info("test_export_to_columnar_null_values: columnar export test passed.")
+
+    def test_export_to_json_empty_table(self):
+        # An empty table is exported as an empty JSON array
+        output_file = 'test_output.json'
+        self.assertEqual(self.db_manager_test.export_to_json(output_file), 0)
+        with open(output_file, 'r') as file:
+            self.assertEqual(json.load(file), [])
+        self.logger.info("test_export_to_json_empty_table: empty JSON export test passed.")
+
+    def test_export_multiple_sinks(self):
+        # Insert more rows than the batch size so several fetchmany batches are needed
+        sample_data = [(f'Name {i}', f'user{i}@example.com', f'{i:05d}', 'Engineer') for i in range(25)]
+        self.db_manager_test.insert_data(sample_data)
+
+        for use_writer_thread in (False, True):
+            # One table scan feeds the CSV, the JSON array and the NDJSON files
+            sinks = [
+                CsvSink('test_output.csv'),
+                JsonSink('test_output.json'),
+                JsonSink('test_output.ndjson', json_format='ndjson'),
+            ]
+            row_count = self.db_manager_test.export(sinks, batch_size=10, use_writer_thread=use_writer_thread)
+            self.assertEqual(row_count, len(sample_data))
+
+            with open('test_output.csv', 'r') as file:
+                self.assertEqual(len(file.read().splitlines()), len(sample_data) + 1)
+            with open('test_output.json', 'r') as file:
+                json_rows = json.load(file)
+            with open('test_output.ndjson', 'r') as file:
+                ndjson_rows = [json.loads(line) for line in file]
+            self.assertEqual(len(json_rows), len(sample_data))
+            self.assertEqual(json_rows, ndjson_rows)
+        self.logger.info("test_export_multiple_sinks: single scan export test passed.")
+
+    def test_export_writer_thread_exception(self):
+        # A sink failing on the writer thread is raised back to the caller
+        class FailingSink(CsvSink):
+            def write(self, rows):
+                raise IOError("Mocked write error")
+
+        self.db_manager_test.insert_data([('John Doe', 'john@example.com', '12345', 'Manager')])
+        with self.assertRaises(IOError):
+            self.db_manager_test.export([FailingSink('test_output.csv')], use_writer_thread=True)
+        self.logger.info("test_export_writer_thread_exception: Exception handling test passed.")
+
+    def test_report_aggregates(self):
+        sample_data = [
+            ('John Doe', 'john@siemens.com', '12345', 'Manager'),
+            ('Jane Smith', 'jane@valeo.de', '67890', 'Developer'),
+            ('Ian Clarke', 'ian@siemens.com', '11111', 'Manager'),
+            ('George', 'george@we.com.eg', '22222', 'Analyst')
+        ]
+        self.db_manager_test.insert_data(sample_data)
+
+        # The aggregates match what ReportGenerator computes from the exported CSV
+        self.assertEqual(self.db_manager_test.count_records(), 4)
+        self.assertEqual(self.db_manager_test.get_companies(), ['siemens', 'valeo', 'we'])
+        self.assertEqual(self.db_manager_test.get_title_counts(), {'Manager': 2, 'Developer': 1, 'Analyst': 1})
+        self.assertEqual(self.db_manager_test.get_sample_records(1),
+                         [{'id': 1, 'name': 'John Doe', 'email': 'john@siemens.com', 'zip_code': '12345', 'title': 'Manager'}])
+        self.logger.info("test_report_aggregates: SQL aggregates test passed.")
+
+    def test_bulk_insert(self):
+        # Records come from a generator, inserted in several chunks
+        records = ((f'Name {i}', f'user{i}@example.com', f'{i:05d}', 'Engineer') for i in range(25))
+        row_count = self.db_manager_test.bulk_insert(records, chunk_size=10, pragmas=BULK_LOAD_PRAGMAS)
+        self.assertEqual(row_count, 25)
+        self.assertEqual(self.db_manager_test.count_records(), 25)
+
+        # The PRAGMA settings are restored after the load
+        cursor = self.db_manager_test.conn.cursor()
+        self.assertEqual(cursor.execute("PRAGMA journal_mode").fetchone()[0], 'delete')
+        self.assertEqual(cursor.execute("PRAGMA synchronous").fetchone()[0], 2)
+        self.logger.info("test_bulk_insert: bulk insertion test passed.")
+
+    def test_bulk_insert_invalid_pragma(self):
+        # Unknown PRAGMA names are rejected before anything is inserted
+        with self.assertLogs(level='ERROR') as log:
+            row_count = self.db_manager_test.bulk_insert([('John Doe', 'john@example.com', '12345', 'Manager')],
+                                                         pragmas={'foreign_keys': 'ON'})
+            self.assertIn("Unsupported PRAGMA: foreign_keys", log.output[0])
+        self.assertIsNone(row_count)
+        self.assertEqual(self.db_manager_test.count_records(), 0)
+        self.logger.info("test_bulk_insert_invalid_pragma: Exception handling test passed.")
+
+    def test_bulk_upsert(self):
+        records = [('John Doe', 'john@example.com', '12345', 'Manager'),
+                   ('Jane Smith', 'jane@example.com', '67890', 'Developer'),
+                   ('John Doe', 'john@example.com', '12345', 'Director')]
+        counts = self.db_manager_test.bulk_upsert(records, chunk_size=2)
+        self.assertEqual(counts, {'inserted': 2, 'updated': 1, 'skipped': 0})
+
+        # Unchanged records are skipped, changed ones update their row, new ones are inserted
+        records = [('Jane Smith', 'jane@example.com', '67890', 'Developer'),
+                   ('John Doe', 'john@example.com', '54321', 'Director'),
+                   ('Ann Lee', 'ann@example.com', '11111', 'Analyst')]
+        counts = self.db_manager_test.bulk_upsert(records, chunk_size=2)
+        self.assertEqual(counts, {'inserted': 1, 'updated': 1, 'skipped': 1})
+
+        # The ignore mode leaves the existing rows alone
+        counts = self.db_manager_test.bulk_upsert([('Ann', 'ann@example.com', '0', 'Manager')], on_conflict='ignore')
+        self.assertEqual(counts, {'inserted': 0, 'updated': 0, 'skipped': 1})
+
+        cursor = self.db_manager_test.conn.cursor()
+        cursor.execute("SELECT name, email, zip_code, title FROM data ORDER BY id")
+        self.assertEqual(cursor.fetchall(), [('John Doe', 'john@example.com', '54321', 'Director'),
+                                             ('Jane Smith', 'jane@example.com', '67890', 'Developer'),
+                                             ('Ann Lee', 'ann@example.com', '11111', 'Analyst')])
+        self.logger.info("test_bulk_upsert: upsert test passed.")
+
+    def test_insert_data_after_bulk_upsert(self):
+        self.db_manager_test.bulk_upsert([('Ann Lee', 'ann@example.com', '11111', 'Analyst')])
+        # The unique index is dropped after the load, plain inserts may repeat the key
+        cursor = self.db_manager_test.conn.cursor()
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'idx_data_unique_%'")
+        self.assertIsNone(cursor.fetchone())
+        self.db_manager_test.insert_data([('Copy', 'ann@example.com', '0', 'Manager')])
+        self.assertEqual(self.db_manager_test.bulk_insert([('Copy', 'ann@example.com', '0', 'Manager')]), 1)
+        self.assertEqual(self.db_manager_test.count_records(), 3)
+        self.logger.info("test_insert_data_after_bulk_upsert: passed")
+
+    def test_bulk_upsert_drops_report_cache(self):
+        self.db_manager_test.bulk_upsert([('John Doe', 'john@example.com', '12345', 'Manager')])
+        self.db_manager_test.save_cache_entry('report_statistics', {'last_id': 1})
+        # Inserting new records keeps the cache, updating records drops it
+        self.db_manager_test.bulk_upsert([('Jane Smith', 'jane@example.com', '67890', 'Developer')])
+        self.assertEqual(self.db_manager_test.load_cache_entry('report_statistics'), {'last_id': 1})
+        self.db_manager_test.bulk_upsert([('John Doe', 'john@example.com', '12345', 'Director')])
+        self.assertIsNone(self.db_manager_test.load_cache_entry('report_statistics'))
+        self.logger.info("test_bulk_upsert_drops_report_cache: passed")
+
+    def test_deduplicate(self):
+        self.db_manager_test.insert_data([('John Doe', 'john@example.com', '12345', 'Manager'),
+                                          ('Jane Smith', 'jane@example.com', '67890', 'Developer'),
+                                          ('John Doe', 'john@example.com', '12345', 'Director')])
+        # The unique index can't be created while the table holds duplicates
+        with self.assertLogs(level='ERROR') as log:
+            self.assertIsNone(self.db_manager_test.bulk_upsert([('Ann Lee', 'ann@example.com', '1', 'Analyst')]))
+            self.assertIn("deduplicate", log.output[0])
+
+        self.assertEqual(self.db_manager_test.deduplicate(), 1)
+        cursor = self.db_manager_test.conn.cursor()
+        cursor.execute("SELECT email, title FROM data ORDER BY id")
+        self.assertEqual(cursor.fetchall(), [('jane@example.com', 'Developer'), ('john@example.com', 'Director')])
+        counts = self.db_manager_test.bulk_upsert([('Ann Lee', 'ann@example.com', '1', 'Analyst')])
+        self.assertEqual(counts, {'inserted': 1, 'updated': 0, 'skipped': 0})
+
+        with self.assertLogs(level='ERROR'):
+            self.assertIsNone(self.db_manager_test.deduplicate(key='id'))
+        self.logger.info("test_deduplicate: de-duplication test passed.")
+
+    def test_in_memory(self):
+        self.db_manager_test.insert_data([('John Doe', 'john@example.com', '12345', 'Manager')])
+        db_manager = DatabaseManager('test_sample.db', in_memory=True)
+        self.assertEqual(db_manager.count_records(), 1)
+        db_manager.insert_data([('Jane Smith', 'jane@example.com', '67890', 'Developer')])
+        # The file is only written by save
+        self.assertEqual(self.db_manager_test.count_records(), 1)
+        self.assertTrue(db_manager.save(pages=1))
+        self.assertEqual(self.db_manager_test.count_records(), 2)
+        # Closing saves the changes made since
+        db_manager.create_indexes()
+        db_manager.close_connection()
+        cursor = self.db_manager_test.conn.cursor()
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND name = 'idx_data_email'")
+        self.assertIsNotNone(cursor.fetchone())
+
+        # A read-only in-memory database is never written back
+        db_manager = DatabaseManager('test_sample.db', read_only=True, in_memory=True)
+        db_manager.insert_data([('Ann Lee', 'ann@example.com', '11111', 'Analyst')])
+        with self.assertLogs(level='ERROR'):
+            self.assertIsNone(db_manager.save())
+        db_manager.close_connection()
+        self.assertEqual(self.db_manager_test.count_records(), 2)
+
+        with self.assertRaises(ValueError):
+            DatabaseManager('test_sample.db', use_pool=True, in_memory=True)
+        self.logger.info("test_in_memory: in-memory database test passed.")
+
+    def test_in_memory_new_file(self):
+        # The file is created when the in-memory database is first saved
+        db_manager = DatabaseManager('test_memory.db', in_memory=True)
+        db_manager.create_table()
+        self.assertFalse(os.path.exists('test_memory.db'))
+        db_manager.close_connection()
+        db_manager = DatabaseManager('test_memory.db', read_only=True)
+        self.assertEqual(db_manager.count_records(), 0)
+        db_manager.close_connection()
+        self.logger.info("test_in_memory_new_file: passed")
+
+    def test_result_cache_aggregates(self):
+        self.db_manager_test.insert_data([('John Doe', 'john@siemens.com', '12345', 'Manager')])
+        db_manager = DatabaseManager('test_sample.db', result_cache_size=8)
+        self.assertEqual(db_manager.get_title_counts(), {'Manager': 1})
+        with patch.object(db_manager, 'get_read_connection') as mock_connection:
+            # Served from the cache, the table isn't queried
+            self.assertEqual(db_manager.get_title_counts(), {'Manager': 1})
+            mock_connection.assert_not_called()
+        # Changes of this connection and of another one are both seen
+        db_manager.insert_data([('Jane Smith', 'jane@valeo.com', '67890', 'Manager')])
+        self.assertEqual(db_manager.get_title_counts(), {'Manager': 2})
+        self.db_manager_test.insert_data([('Ann Lee', 'ann@valeo.com', '11111', 'Analyst')])
+        self.assertEqual(db_manager.get_title_counts(), {'Manager': 2, 'Analyst': 1})
+        self.assertEqual(db_manager.get_companies(), ['siemens', 'valeo'])
+        self.db_manager_test.conn.execute("UPDATE data SET email = 'ann@orange.com' WHERE name = 'Ann Lee'")
+        self.db_manager_test.conn.commit()
+        self.assertEqual(db_manager.get_companies(), ['siemens', 'valeo', 'orange'])
+        db_manager.close_connection()
+        self.logger.info("test_result_cache_aggregates: passed")
+
+    def test_result_cache_exports(self):
+        self.db_manager_test.insert_data([('John Doe', 'john@example.com', '12345', 'Manager')])
+        db_manager = DatabaseManager('test_sample.db', result_cache_size=8)
+        self.assertEqual(db_manager.export_to_csv('test_output.csv'), 1)
+        with patch.object(db_manager, 'export') as mock_export:
+            # The file written before is reused, and copied to another path
+            self.assertEqual(db_manager.export_to_csv('test_output.csv'), 1)
+            self.assertEqual(db_manager.export_to_csv('test_copy.csv'), 1)
+            mock_export.assert_not_called()
+        with open('test_output.csv') as file, open('test_copy.csv') as copy_file:
+            self.assertEqual(file.read(), copy_file.read())
+
+        # A changed file or a changed table is exported again
+        with open('test_output.csv', 'a') as file:
+            file.write('extra\n')
+        self.assertEqual(db_manager.export_to_csv('test_output.csv'), 1)
+        with open('test_output.csv') as file:
+            self.assertNotIn('extra', file.read())
+        db_manager.insert_data([('Jane Smith', 'jane@example.com', '67890', 'Developer')])
+        self.assertEqual(db_manager.export_to_csv('test_output.csv'), 2)
+        # The JSON export is cached apart from the CSV one
+        self.assertEqual(db_manager.export_to_json('test_output.json'), 2)
+        with open('test_output.json') as file:
+            self.assertEqual(len(json.load(file)), 2)
+        db_manager.close_connection()
+        self.logger.info("test_result_cache_exports: passed")
+
+    def test_result_cache_copy_error(self):
+        self.db_manager_test.insert_data([('John Doe', 'john@example.com', '12345', 'Manager')])
+        db_manager = DatabaseManager('test_sample.db', result_cache_size=8)
+        self.assertEqual(db_manager.export_to_csv('test_output.csv'), 1)
+        # A failed copy of the cached file falls back to a new export
+        with patch('shutil.copyfile', side_effect=OSError("Mocked copy error")), self.assertLogs(level='ERROR'):
+            self.assertEqual(db_manager.export_to_csv('test_copy.csv'), 1)
+        with open('test_output.csv') as file, open('test_copy.csv') as copy_file:
+            self.assertEqual(file.read(), copy_file.read())
+        db_manager.close_connection()
+        self.logger.info("test_result_cache_copy_error: passed")
+
+    def test_pool_concurrent_readers_and_writer(self):
+        # Close the default manager and reopen the database in pool mode
+        self.db_manager_test.close_connection()
+        self.db_manager_test = DatabaseManager('test_sample.db', use_pool=True)
+        self.db_manager_test.create_table()
+        journal_mode = self.db_manager_test.conn.execute("PRAGMA journal_mode").fetchone()[0]
+        self.assertEqual(journal_mode, 'wal')
+
+        errors = []
+        counts = []
+        read_connections = set()
+
+        def ingest():
+            records = ((f'Name {i}', f'user{i}@example.com', f'{i:05d}', 'Engineer') for i in range(2000))
+            if self.db_manager_test.bulk_insert(records, chunk_size=100) != 2000:
+                errors.append("bulk_insert failed")
+
+        def read():
+            for _ in range(20):
+                count = self.db_manager_test.count_records()
+                if count is None:
+                    errors.append("count_records failed")
+                counts.append(count)
+            read_connections.add(id(self.db_manager_test.get_read_connection()))
+
+        threads = [threading.Thread(target=ingest)] + [threading.Thread(target=read) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # The readers ran alongside the writer, each one on its own connection
+        self.assertEqual(errors, [])
+        self.assertEqual(len(read_connections), 3)
+        self.assertTrue(all(0 <= count <= 2000 for count in counts))
+        self.assertEqual(self.db_manager_test.count_records(), 2000)
+        self.assertEqual(self.db_manager_test.export_to_csv('test_output.csv'), 2000)
+        self.logger.info("test_pool_concurrent_readers_and_writer: connection pool test passed.")
+
+    def test_create_indexes(self):
+        self.db_manager_test.create_indexes()
+        cursor = self.db_manager_test.conn.cursor()
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='index' AND tbl_name='data' AND name LIKE 'idx_data_%'")
+        self.assertEqual(sorted(row[0] for row in cursor.fetchall()),
+                         ['idx_data_company', 'idx_data_email', 'idx_data_title', 'idx_data_zip_code'])
+
+        # Lookups by email and by company search the indexes instead of scanning the table
+        cursor.execute("EXPLAIN QUERY PLAN SELECT * FROM data WHERE email = ?", ('john@example.com',))
+        self.assertIn('USING INDEX idx_data_email', cursor.fetchall()[0][3])
+        cursor.execute(f"EXPLAIN QUERY PLAN SELECT * FROM data WHERE {COMPANY_EXPRESSION} = ?", ('example',))
+        self.assertIn('USING INDEX idx_data_company', cursor.fetchall()[0][3])
+
+        self.db_manager_test.drop_indexes()
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='index' AND name LIKE 'idx_data_%'")
+        self.assertEqual(cursor.fetchall(), [])
+        self.logger.info("test_create_indexes: index creation test passed.")
+
+    def test_query(self):
+        sample_data = [
+            ('John Doe', 'john@siemens.com', '12345', 'Manager'),
+            ('Jane Smith', 'jane@valeo.com', '67890', 'Developer'),
+            ('Ian Clarke', 'ian@siemens.com', '11111', 'Manager'),
+            ('George', 'george@we.com', '22222', 'Analyst'),
+            ('Hannah Lee', 'hannah@siemens.com', '33333', 'Developer')
+        ]
+        self.db_manager_test.insert_data(sample_data)
+        self.db_manager_test.create_indexes()
+
+        # Filtering and projection, including the computed company
+        rows = self.db_manager_test.query({'company': 'siemens', 'title': ['Manager', 'Analyst']}, columns=['id', 'company'])
+        self.assertEqual(rows, [{'id': 1, 'company': 'siemens'}, {'id': 3, 'company': 'siemens'}])
+
+        # Keyset pagination over a non unique column
+        first_page = self.db_manager_test.query(columns=['id', 'title'], order_by='title', limit=2)
+        self.assertEqual(first_page, [{'id': 4, 'title': 'Analyst'}, {'id': 2, 'title': 'Developer'}])
+        last_row = first_page[-1]
+        next_page = self.db_manager_test.query(columns=['id', 'title'], order_by='title',
+                                               after=(last_row['title'], last_row['id']), limit=2)
+        self.assertEqual(next_page, [{'id': 5, 'title': 'Developer'}, {'id': 1, 'title': 'Manager'}])
+
+        # Descending order on the id
+        rows = self.db_manager_test.query(columns=['id'], descending=True, after=4, limit=2)
+        self.assertEqual(rows, [{'id': 3}, {'id': 2}])
+
+        # Unknown columns are rejected
+        with self.assertLogs(level='ERROR') as log:
+            self.assertIsNone(self.db_manager_test.query({'phone': '123'}))
+            self.assertIn("Unknown column: phone", log.output[0])
+        self.logger.info("test_query: query test passed.")
+
+    def test_export_incremental(self):
+        def make_sinks():
+            return [CsvSink('test_output.csv', append=True),
+                    JsonSink('test_output.ndjson', json_format='ndjson', append=True)]
+
+        def read_outputs():
+            with open('test_output.csv', 'r') as file:
+                csv_lines = file.read().splitlines()
+            with open('test_output.ndjson', 'r') as file:
+                ndjson_rows = [json.loads(line) for line in file]
+            return csv_lines, ndjson_rows
+
+        self.db_manager_test.insert_data([(f'Name {i}', f'user{i}@example.com', f'{i:05d}', 'Engineer') for i in range(3)])
+        self.assertEqual(self.db_manager_test.export_incremental(make_sinks(), 'test_checkpoint.json'), 3)
+
+        # Nothing new: nothing is appended
+        self.assertEqual(self.db_manager_test.export_incremental(make_sinks(), 'test_checkpoint.json'), 0)
+
+        # Only the new rows are appended, and written to delta files in a directory created for them
+        self.db_manager_test.insert_data([(f'Name {i}', f'user{i}@example.com', f'{i:05d}', 'Engineer') for i in range(3, 5)])
+        self.assertEqual(self.db_manager_test.export_incremental(make_sinks(), 'test_checkpoint.json',
+                                                                 delta_dir='test_delta'), 2)
+        csv_lines, ndjson_rows = read_outputs()
+        self.assertEqual(csv_lines[0], 'id,name,email,zip_code,title')
+        self.assertEqual([line.split(',')[0] for line in csv_lines[1:]], ['1', '2', '3', '4', '5'])
+        self.assertEqual([row['id'] for row in ndjson_rows], [1, 2, 3, 4, 5])
+        self.assertEqual(sorted(os.listdir('test_delta')), ['test_output_4_5.csv', 'test_output_4_5.ndjson'])
+
+        # Rows left by an interrupted run are truncated before appending
+        with open('test_output.ndjson', 'a') as file:
+            file.write('{"id": 6, "name": "Partial"')
+        self.db_manager_test.insert_data([('Name 5', 'user5@example.com', '00005', 'Engineer')])
+        self.assertEqual(self.db_manager_test.export_incremental(make_sinks(), 'test_checkpoint.json'), 1)
+        csv_lines, ndjson_rows = read_outputs()
+        self.assertEqual([row['id'] for row in ndjson_rows], [1, 2, 3, 4, 5, 6])
+        self.assertEqual(len(csv_lines), 7)
+
+        # Sinks that would overwrite their output are rejected
+        with self.assertLogs(level='ERROR') as log:
+            self.assertIsNone(self.db_manager_test.export_incremental([CsvSink('test_output.csv')], 'test_checkpoint.json'))
+            self.assertIn("append=True", log.output[0])
+
+        # A delta directory that can't be created fails the export before anything is appended
+        self.db_manager_test.insert_data([('Name 6', 'user6@example.com', '00006', 'Engineer')])
+        csv_size = os.path.getsize('test_output.csv')
+        with self.assertLogs(level='ERROR') as log:
+            self.assertIsNone(self.db_manager_test.export_incremental(make_sinks(), 'test_checkpoint.json',
+                                                                      delta_dir='test_output.csv'))
+            self.assertIn("Error exporting incrementally", log.output[0])
+        self.assertEqual(os.path.getsize('test_output.csv'), csv_size)
+        self.assertEqual(self.db_manager_test.export_incremental(make_sinks(), 'test_checkpoint.json'), 1)
+        self.logger.info("test_export_incremental: incremental export test passed.")
+
+    def test_export_parallel(self):
+        sample_data = [(f'Name {i}', f'user{i}@example.com', f'{i:05d}', 'Engineer') for i in range(25)]
+        self.db_manager_test.insert_data(sample_data)
+        self.db_manager_test.export([CsvSink('test_output.csv'), JsonSink('test_output.json')])
+        expected = {}
+        for output_file in ('test_output.csv', 'test_output.json'):
+            with open(output_file, 'r') as file:
+                expected[output_file] = file.read()
+
+        # The merged shards are the same files as a single process export
+        for json_format in ('array', 'ndjson'):
+            sinks = [CsvSink('test_output.csv'), JsonSink('test_output.json', json_format=json_format)]
+            row_count, shard_files = self.db_manager_test.export_parallel(sinks, workers=2, partitions=4, batch_size=3)
+            self.assertEqual(row_count, len(sample_data))
+            self.assertEqual(shard_files, [[], []])
+            with open('test_output.csv', 'r') as file:
+                self.assertEqual(file.read(), expected['test_output.csv'])
+            with open('test_output.json', 'r') as file:
+                if json_format == 'array':
+                    self.assertEqual(file.read(), expected['test_output.json'])
+                else:
+                    self.assertEqual([json.loads(line) for line in file], json.loads(expected['test_output.json']))
+        self.assertFalse([name for name in os.listdir('.') if '.part' in name])
+
+        # Without merging, the shards are left as a partitioned set
+        row_count, shard_files = self.db_manager_test.export_parallel([CsvSink('test_output.csv')], workers=2,
+                                                                      partitions=3, merge=False)
+        self.assertEqual(shard_files, [['test_output.part0001.csv', 'test_output.part0002.csv',
+                                        'test_output.part0003.csv']])
+        ids = []
+        for shard_file in shard_files[0]:
+            with open(shard_file, 'r') as file:
+                ids += [int(line.split(',')[0]) for line in file.read().splitlines()[1:]]
+            os.remove(shard_file)
+        self.assertEqual(ids, list(range(1, 26)))
+        self.logger.info("test_export_parallel: parallel export test passed.")
+
+    def test_export_parallel_empty_table(self):
+        row_count, _ = self.db_manager_test.export_parallel([JsonSink('test_output.json')], workers=2)
+        self.assertEqual(row_count, 0)
+        with open('test_output.json', 'r') as file:
+            self.assertEqual(json.load(file), [])
+        self.logger.info("test_export_parallel_empty_table: empty parallel export test passed.")
+
     def tearDown(self):
         # Close the database connection after each test
         self.db_manager_test.close_connection()
 
-        # Delete the test database file after each test
-        if os.path.exists('test_sample.db'):
-            os.remove('test_sample.db')
+        # Delete the test database files after each test
+        for path in ('test_sample.db', 'test_memory.db'):
+            if os.path.exists(path):
+                os.remove(path)
+
+        # Delete the incremental export checkpoint and delta files after each test
+        if os.path.exists('test_checkpoint.json'):
+            os.remove('test_checkpoint.json')
+        if os.path.exists('test_delta'):
+            shutil.rmtree('test_delta')
+
+        # Delete the WAL files left by the pool mode
+        for suffix in ('-wal', '-shm'):
+            if os.path.exists('test_sample.db' + suffix):
+                os.remove('test_sample.db' + suffix)
 
         # Delete the output CSV file after each test
-        if os.path.exists('test_output.csv'):
-            os.remove('test_output.csv')
+        for path in ('test_output.csv', 'test_copy.csv'):
+            if os.path.exists(path):
+                os.remove(path)
 
         # Delete the output json file after each test
         if os.path.exists('test_output.json'):
             os.remove('test_output.json')
 
+        # Delete the output columnar file after each test
+        if os.path.exists('test_output.col'):
+            os.remove('test_output.col')
+
+        # Delete the output ndjson file after each test
+        if os.path.exists('test_output.ndjson'):
+            os.remove('test_output.ndjson')
+
         # print dashes for pretty reading output log
         print('-------------------------------------------')
 if __name__ == '__main__':
@@ -1,6 +1,9 @@
+import gzip
+import os
 import unittest
 from unittest.mock import patch, mock_open
-from fileManager import FileManager
+from utils.fileManager import FileManager
+from utils.columnarFormat import ColumnarWriter
 import logging
 class TestFileManager(unittest.TestCase):
     def setUp(self):
@@ -49,5 +52,106 @@ class TestFileManager(unittest.TestCase):
         self.logger.info("test_read_json_exception: passed")
     
 
+    @patch("builtins.open", new_callable=mock_open, read_data="col1,col2\nval1,val2\nval3,val4")
+    def test_iter_csv_success(self, mock_file):
+        fm = FileManager()
+        expected_data = [{'col1': 'val1', 'col2': 'val2'}, {'col1': 'val3', 'col2': 'val4'}]
+        result = fm.iter_csv("dummy.csv")
+        self.assertNotIsInstance(result, list)
+        self.assertEqual(list(result), expected_data)
+        self.logger.info("test_iter_csv_success: passed")
+
+
+    @patch("builtins.open", new_callable=mock_open, read_data='[\n    {"key": "value1"},\n    {"key": "value2"}\n]')
+    def test_iter_json_array(self, mock_file):
+        fm = FileManager()
+        expected_data = [{"key": "value1"}, {"key": "value2"}]
+        # A small chunk size cuts the records across several reads
+        result = list(fm.iter_json("dummy.json", chunk_size=4))
+        self.assertEqual(result, expected_data)
+        self.logger.info("test_iter_json_array: passed")
+
+
+    @patch("builtins.open", new_callable=mock_open, read_data='{"key": "value1"}\n{"key": "value2"}\n')
+    def test_iter_json_ndjson(self, mock_file):
+        fm = FileManager()
+        expected_data = [{"key": "value1"}, {"key": "value2"}]
+        result = list(fm.iter_json("dummy.ndjson", chunk_size=4))
+        self.assertEqual(result, expected_data)
+        self.logger.info("test_iter_json_ndjson: passed")
+
+
+    @patch("builtins.open", new_callable=mock_open, read_data='[{"key": "value1"}, {"key": ')
+    def test_iter_json_exception(self, mock_file):
+        fm = FileManager()
+        with self.assertLogs(level='ERROR') as log:
+            result = list(fm.iter_json("dummy.json"))
+            self.assertIn("Error reading JSON file", log.output[0])
+        self.assertEqual(result, [{"key": "value1"}])
+        self.logger.info("test_iter_json_exception: passed")
+
+
+    @patch("builtins.open", new_callable=mock_open, read_data="id,title\n1,Manager\n2,Developer\n3,Manager\n")
+    def test_read_csv_compact(self, mock_file):
+        fm = FileManager()
+        result = fm.read_csv_compact("dummy.csv")
+        self.assertEqual(len(result), 3)
+        self.assertEqual(result[1], {'id': '2', 'title': 'Developer'})
+        self.assertEqual(result.column('title'), ['Manager', 'Developer', 'Manager'])
+        self.logger.info("test_read_csv_compact: passed")
+
+
+    @patch("builtins.open", new_callable=mock_open, read_data='{"id": 1, "title": "Manager"}\n{"id": 2, "title": "Manager"}\n')
+    def test_read_json_compact(self, mock_file):
+        fm = FileManager()
+        result = fm.read_json_compact("dummy.ndjson")
+        self.assertEqual([dict(record) for record in result], [{'id': 1, 'title': 'Manager'}, {'id': 2, 'title': 'Manager'}])
+        self.logger.info("test_read_json_compact: passed")
+
+
+    def test_read_compressed(self):
+        fm = FileManager()
+        expected_data = [{'col1': 'val1', 'col2': 'val2'}, {'col1': 'val3', 'col2': 'val4'}]
+        try:
+            with gzip.open('test_output.csv.gz', 'wt') as file:
+                file.write("col1,col2\nval1,val2\nval3,val4\n")
+            self.assertEqual(fm.read_csv('test_output.csv.gz'), expected_data)
+            self.assertEqual(list(fm.iter_csv('test_output.csv.gz')), expected_data)
+
+            with gzip.open('test_output.json.gz', 'wt') as file:
+                file.write('{"col1": "val1", "col2": "val2"}\n{"col1": "val3", "col2": "val4"}\n')
+            self.assertEqual(list(fm.iter_json('test_output.json.gz', chunk_size=4)), expected_data)
+        finally:
+            for path in ('test_output.csv.gz', 'test_output.json.gz'):
+                if os.path.exists(path):
+                    os.remove(path)
+        self.logger.info("test_read_compressed: passed")
+
+
+    def test_read_columnar(self):
+        writer = ColumnarWriter('test_output.col', ['id', 'email', 'title'])
+        writer.write([(1, 'john@siemens.com', 'Manager'), (2, 'jane@valeo.de', 'Developer')])
+        writer.close()
+        fm = FileManager()
+        try:
+            columnar = fm.read_columnar('test_output.col')
+            self.assertEqual(columnar.column('title').value_counts(), {'Manager': 1, 'Developer': 1})
+            columnar.close()
+            result = fm.iter_columnar('test_output.col', ['id', 'email'])
+            self.assertNotIsInstance(result, list)
+            self.assertEqual(list(result), [{'id': 1, 'email': 'john@siemens.com'}, {'id': 2, 'email': 'jane@valeo.de'}])
+        finally:
+            os.remove('test_output.col')
+        self.logger.info("test_read_columnar: passed")
+
+
+    def test_read_columnar_exception(self):
+        fm = FileManager()
+        with self.assertLogs(level='ERROR') as log:
+            self.assertIsNone(fm.read_columnar('missing.col'))
+            self.assertIn("Error reading columnar file", log.output[0])
+        self.logger.info("test_read_columnar_exception: passed")
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,106 @@
+import json
+import os
+import sqlite3
+import unittest
+from utils.databaseManager import DatabaseManager, CsvSink
+from utils.fileManager import FileManager
+from utils import metrics
+import logging
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+        self.logger = logging.getLogger(__name__)
+        self.registry = metrics.MetricsRegistry()
+
+    def test_disabled(self):
+        # Nothing is recorded, and the rows are not wrapped
+        rows = [1, 2, 3]
+        self.registry.increment('rows_total', 3)
+        with self.registry.timer('step_seconds'):
+            pass
+        self.assertIs(self.registry.count_rows(rows, 'rows_total'), rows)
+        self.assertEqual(self.registry.snapshot(), {'counters': {}, 'timers': {}})
+        self.assertEqual(self.registry.to_prometheus(), '')
+        self.logger.info("test_disabled: passed")
+
+    def test_counters_and_timers(self):
+        self.registry.enabled = True
+        self.registry.increment('rows_total', 2, format='csv')
+        self.registry.increment('rows_total', 3, format='csv')
+        self.registry.increment('rows_total', format='json')
+        self.assertEqual(sum(1 for _ in self.registry.count_rows(range(4), 'rows_total', format='json')), 4)
+        with self.registry.timer('step_seconds', step='load'):
+            pass
+
+        @self.registry.timed('operation_seconds')
+        def insert():
+            return 'done'
+        self.assertEqual(insert(), 'done')
+        self.assertEqual(insert(), 'done')
+
+        snapshot = json.loads(self.registry.to_json())
+        self.assertEqual(snapshot['counters']['rows_total'], [{'labels': {'format': 'csv'}, 'value': 5},
+                                                              {'labels': {'format': 'json'}, 'value': 5}])
+        self.assertEqual(snapshot['timers']['step_seconds'][0]['count'], 1)
+        self.assertEqual(snapshot['timers']['operation_seconds'][0]['labels'], {'operation': 'insert'})
+        self.assertEqual(snapshot['timers']['operation_seconds'][0]['count'], 2)
+
+        lines = self.registry.to_prometheus().splitlines()
+        self.assertIn('# TYPE rows_total counter', lines)
+        self.assertIn('rows_total{format="csv"} 5', lines)
+        self.assertIn('# TYPE operation_seconds summary', lines)
+        self.assertIn('operation_seconds_count{operation="insert"} 2', lines)
+
+        self.registry.reset()
+        self.assertEqual(self.registry.snapshot(), {'counters': {}, 'timers': {}})
+        self.logger.info("test_counters_and_timers: passed")
+
+    def test_instrument_connection(self):
+        self.registry.enabled = True
+        conn = sqlite3.connect(':memory:')
+        self.registry.instrument_connection(conn, progress_steps=10)
+        conn.execute("CREATE TABLE numbers (value INTEGER)")
+        conn.executemany("INSERT INTO numbers VALUES (?)", [(i,) for i in range(100)])
+        conn.execute("SELECT SUM(value) FROM numbers").fetchone()
+        conn.close()
+        counters = {(value['labels'].get('statement'), name): value['value']
+                    for name, values in self.registry.snapshot()['counters'].items() for value in values}
+        self.assertEqual(counters[('SELECT', 'sqlite_statements_total')], 1)
+        self.assertGreaterEqual(counters[('INSERT', 'sqlite_statements_total')], 1)
+        self.assertGreater(counters[(None, 'sqlite_vm_instructions_total')], 0)
+        self.logger.info("test_instrument_connection: passed")
+
+    def test_pipeline_metrics(self):
+        metrics.reset()
+        metrics.enable()
+        try:
+            db_manager = DatabaseManager('test_metrics.db')
+            db_manager.create_table()
+            db_manager.insert_data([(f'Name {i}', f'user{i}@example.com', f'{i:05d}', 'Engineer') for i in range(10)])
+            db_manager.export([CsvSink('test_metrics.csv')])
+            db_manager.close_connection()
+            self.assertEqual(sum(1 for _ in FileManager().iter_csv('test_metrics.csv')), 10)
+        finally:
+            metrics.disable()
+
+        snapshot = metrics.snapshot()
+        counters = {name: values[0]['value'] for name, values in snapshot['counters'].items()}
+        self.assertEqual(counters['rows_inserted_total'], 10)
+        self.assertEqual(counters['rows_exported_total'], 10)
+        self.assertEqual(counters['bytes_written_total'], os.path.getsize('test_metrics.csv'))
+        self.assertEqual(counters['file_rows_read_total'], 10)
+        operations = {value['labels']['operation'] for value in snapshot['timers']['database_operation_seconds']}
+        self.assertEqual(operations, {'insert_data', 'export'})
+        self.assertEqual(snapshot['timers']['file_read_seconds'][0]['labels'], {'operation': 'iter_csv'})
+        metrics.reset()
+        self.logger.info("test_pipeline_metrics: passed")
+
+    def tearDown(self):
+        # Delete the files of the pipeline test
+        for path in ('test_metrics.db', 'test_metrics.csv'):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+import os
+import re
+import unittest
+from unittest.mock import patch
+import pytest
+from utils.databaseManager import DatabaseManager, CsvSink, JsonSink
+from utils.fileManager import FileManager
+import logging
+
+pytest.importorskip('reportlab')
+from reportlab.pdfgen import canvas  # noqa: E402 (imported once reportlab is known to be installed)
+from utils.report import ReportGenerator  # noqa: E402
+
+# Page objects of a PDF file, /Type /Pages is the page tree
+PAGE_PATTERN = re.compile(rb'/Type\s*/Page\b')
+
+
+class TestReportGenerator(unittest.TestCase):
+    def setUp(self):
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+        self.logger = logging.getLogger(__name__)
+
+        # A database of 200 records, exported to CSV and NDJSON
+        self.db_manager_test = DatabaseManager('test_output_report.db')
+        self.db_manager_test.create_table()
+        self.db_manager_test.insert_data([(f'Name {i}', f'user{i}@{("siemens", "valeo", "we")[i % 3]}.com',
+                                           f'{i:05d}', ('Engineer', 'Engineer', 'Manager')[i % 3])
+                                          for i in range(200)])
+        self.db_manager_test.export([CsvSink('test_output_report.csv'),
+                                     JsonSink('test_output_report.ndjson', json_format='ndjson')])
+
+    def generate(self, **options):
+        generator = ReportGenerator('test_output_report.csv', 'test_output_report.ndjson', 'test_output_report.pdf',
+                                    **options)
+        self.assertTrue(generator.generate_report())
+        return generator
+
+    def count_pages(self, pdf_file):
+        with open(pdf_file, 'rb') as file:
+            return len(PAGE_PATTERN.findall(file.read()))
+
+    def test_statistics_input_modes(self):
+        # The SQL aggregates and the single pass over each input file give the same statistics
+        expected = self.generate(db_file='test_output_report.db').get_statistics()
+        self.assertEqual(expected['total_records'], 200)
+        self.assertEqual(expected['companies'], ['siemens', 'valeo', 'we'])
+        self.assertEqual(expected['title_counts'], {'Engineer': 134, 'Manager': 66})
+        for options in ({'input_format': 'csv'}, {'input_format': 'json'},
+                        {'records': FileManager().read_csv_compact('test_output_report.csv')},
+                        {'db_manager': self.db_manager_test}):
+            statistics = self.generate(**options).get_statistics()
+            for name in ('total_records', 'companies', 'title_counts'):
+                self.assertEqual(statistics[name], expected[name], (options, name))
+            self.assertEqual([record['email'] for record in statistics['sample_records']],
+                             [record['email'] for record in expected['sample_records']])
+        self.assertEqual(self.count_pages('test_output_report.pdf'), 1)
+        self.logger.info("test_statistics_input_modes: passed")
+
+    def test_records_table_pages(self):
+        y_positions = []
+        draw_string = canvas.Canvas.drawString
+
+        def record_position(pdf_canvas, x, y, text):
+            y_positions.append(y)
+            return draw_string(pdf_canvas, x, y, text)
+
+        with patch.object(canvas.Canvas, 'drawString', autospec=True, side_effect=record_position):
+            generator = self.generate(db_file='test_output_report.db', include_records=True, records_chunk_size=64)
+        # 200 table rows don't fit on the first two pages, and nothing is drawn in the bottom margin
+        self.assertGreaterEqual(generator.page_count, 3)
+        self.assertGreaterEqual(min(y_positions), generator.margin)
+        self.assertEqual(generator.output_files, ['test_output_report.pdf'])
+        self.assertEqual(self.count_pages('test_output_report.pdf'), generator.page_count)
+
+        # The table of the file records has the same number of pages
+        self.assertEqual(self.generate(include_records=True).page_count, generator.page_count)
+        self.logger.info("test_records_table_pages: passed")
+
+    def test_pages_per_file(self):
+        single_file = self.generate(db_file='test_output_report.db', include_records=True)
+        generator = self.generate(db_file='test_output_report.db', include_records=True, pages_per_file=2)
+        self.assertEqual(generator.page_count, single_file.page_count)
+        file_count = (generator.page_count + 1) // 2
+        self.assertEqual(generator.output_files, ['test_output_report.pdf'] +
+                         [f'test_output_report_{index}.pdf' for index in range(2, file_count + 1)])
+        page_counts = [self.count_pages(pdf_file) for pdf_file in generator.output_files]
+        self.assertTrue(all(1 <= page_count <= 2 for page_count in page_counts))
+        self.assertEqual(sum(page_counts), generator.page_count)
+        self.logger.info("test_pages_per_file: passed")
+
+    def test_database_cache(self):
+        self.assertEqual(self.generate(db_file='test_output_report.db', use_cache=True).get_total_records(), 200)
+        self.assertEqual(self.db_manager_test.load_cache_entry('report_statistics')['last_id'], 200)
+
+        # Only the new records are folded in, the statistics match a report without the cache
+        self.db_manager_test.insert_data([('Ann Lee', 'ann@orange.com', '11111', 'Analyst')])
+        with self.assertLogs(level='INFO') as log:
+            statistics = self.generate(db_file='test_output_report.db', use_cache=True).get_statistics()
+        self.assertTrue(any("Report cache updated with the records 201 to 201." in line for line in log.output))
+        self.assertEqual(statistics, self.generate(db_file='test_output_report.db').get_statistics())
+        self.assertEqual(statistics['companies'], ['siemens', 'valeo', 'we', 'orange'])
+
+        # Updating a record drops the cache, the statistics are recomputed
+        self.db_manager_test.bulk_upsert([('Ann Lee', 'ann@orange.com', '11111', 'Manager')])
+        self.assertIsNone(self.db_manager_test.load_cache_entry('report_statistics'))
+        statistics = self.generate(db_file='test_output_report.db', use_cache=True).get_statistics()
+        self.assertEqual(statistics['title_counts'], {'Engineer': 134, 'Manager': 67})
+        self.logger.info("test_database_cache: passed")
+
+    def test_file_cache(self):
+        expected = self.generate(use_cache=True).get_statistics()
+        self.assertTrue(os.path.exists('test_output_report.pdf.cache.json'))
+        # The unchanged input file isn't read again
+        with patch.object(FileManager, 'iter_csv') as mock_iter_csv:
+            self.assertEqual(self.generate(use_cache=True).get_statistics(), expected)
+            mock_iter_csv.assert_not_called()
+
+        # A changed input file is
+        self.db_manager_test.insert_data([('Ann Lee', 'ann@orange.com', '11111', 'Analyst')])
+        self.db_manager_test.export_to_csv('test_output_report.csv')
+        self.assertEqual(self.generate(use_cache=True).get_total_records(), 201)
+        self.logger.info("test_file_cache: passed")
+
+    def test_generate_report_failure(self):
+        generator = ReportGenerator('test_output_report.csv', 'test_output_report.ndjson',
+                                    os.path.join('test_output_report_missing', 'report.pdf'))
+        with self.assertLogs(level='ERROR'):
+            self.assertFalse(generator.generate_report())
+        self.logger.info("test_generate_report_failure: passed")
+
+    def tearDown(self):
+        # Close the database connection after each test
+        self.db_manager_test.close_connection()
+
+        # Delete the database, the input files, the reports and the report cache after each test
+        for path in os.listdir('.'):
+            if path.startswith('test_output_report'):
+                os.remove(path)
+
+
+if __name__ == "__main__":
+    unittest.main()
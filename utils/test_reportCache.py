@@ -0,0 +1,91 @@
+import os
+import unittest
+from utils.databaseManager import DatabaseManager
+from utils.reportCache import DatabaseReportCache, FileReportCache
+import logging
+class TestReportCache(unittest.TestCase):
+    def setUp(self):
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+        self.logger = logging.getLogger(__name__)
+
+        # Initialize the DatabaseManager
+        self.db_manager_test = DatabaseManager('test_sample.db')
+        self.db_manager_test.create_table()
+
+    def get_full_statistics(self):
+        return {
+            'total_records': self.db_manager_test.count_records(),
+            'sample_records': self.db_manager_test.get_sample_records(3),
+            'companies': self.db_manager_test.get_companies(),
+            'title_counts': self.db_manager_test.get_title_counts(),
+        }
+
+    def test_database_cache_folds_in_new_records(self):
+        cache = DatabaseReportCache(self.db_manager_test, sample_records_limit=3)
+        self.db_manager_test.insert_data([
+            ('John Doe', 'john@siemens.com', '12345', 'Manager'),
+            ('Jane Smith', 'jane@valeo.com', '67890', 'Developer')
+        ])
+        self.assertEqual(cache.get_statistics(), self.get_full_statistics())
+
+        # Only the new records are processed, the result matches a full recomputation
+        self.db_manager_test.insert_data([
+            ('Ian Clarke', 'ian@siemens.com', '11111', 'Manager'),
+            ('George', 'george@we.com', '22222', 'Analyst')
+        ])
+        with self.assertLogs(level='INFO') as log:
+            statistics = cache.get_statistics()
+            self.assertIn("Report cache updated with the records 3 to 4.", log.output[-1])
+        self.assertEqual(statistics, self.get_full_statistics())
+        self.assertEqual(statistics['companies'], ['siemens', 'valeo', 'we'])
+        self.assertEqual(statistics['title_counts'], {'Manager': 2, 'Developer': 1, 'Analyst': 1})
+        self.logger.info("test_database_cache_folds_in_new_records: passed")
+
+    def test_database_cache_invalidation(self):
+        cache = DatabaseReportCache(self.db_manager_test, sample_records_limit=3)
+        self.db_manager_test.insert_data([('John Doe', 'john@siemens.com', '12345', 'Manager')])
+        cache.get_statistics()
+
+        # A schema change invalidates the cache
+        self.db_manager_test.conn.execute("ALTER TABLE data ADD COLUMN phone TEXT")
+        self.db_manager_test.conn.execute("DELETE FROM data")
+        self.db_manager_test.insert_data([('Jane Smith', 'jane@valeo.com', '67890', 'Developer')])
+        statistics = cache.get_statistics()
+        self.assertEqual(statistics['total_records'], 1)
+        self.assertEqual(statistics['companies'], ['valeo'])
+
+        # An explicit invalidation recomputes from the whole table
+        self.db_manager_test.conn.execute("UPDATE data SET title = 'Manager'")
+        self.db_manager_test.conn.commit()
+        cache.invalidate()
+        self.assertEqual(cache.get_statistics()['title_counts'], {'Manager': 1})
+        self.logger.info("test_database_cache_invalidation: passed")
+
+    def test_file_cache(self):
+        with open('test_input.csv', 'w') as file:
+            file.write('id,title\n1,Manager\n')
+        cache = FileReportCache('test_cache.json', 'test_input.csv', ['total_records'])
+        self.assertIsNone(cache.load())
+        cache.save({'total_records': 1})
+        self.assertEqual(cache.load(), {'total_records': 1})
+
+        # Other statistics, or a modified input file, invalidate the cache
+        self.assertIsNone(FileReportCache('test_cache.json', 'test_input.csv', ['companies']).load())
+        with open('test_input.csv', 'a') as file:
+            file.write('2,Developer\n')
+        self.assertIsNone(cache.load())
+        self.logger.info("test_file_cache: passed")
+
+    def tearDown(self):
+        # Close the database connection after each test
+        self.db_manager_test.close_connection()
+
+        # Delete the test database and files after each test
+        for file_name in ('test_sample.db', 'test_input.csv', 'test_cache.json'):
+            if os.path.exists(file_name):
+                os.remove(file_name)
+
+        # print dashes for pretty reading output log
+        print('-------------------------------------------')
+if __name__ == '__main__':
+    unittest.main()
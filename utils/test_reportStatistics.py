@@ -0,0 +1,50 @@
+import unittest
+from utils.reportStatistics import (Accumulator, CompanyAccumulator, CountAccumulator, SampleAccumulator,
+                              StatisticsPipeline, ValueCountAccumulator)
+import logging
+class TestReportStatistics(unittest.TestCase):
+    def setUp(self):
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+        self.logger = logging.getLogger(__name__)
+
+        self.records = [
+            {'id': '1', 'name': 'John Doe', 'email': 'john@siemens.com', 'title': 'Manager'},
+            {'id': '2', 'name': 'Jane Smith', 'email': 'jane@valeo.de', 'title': 'Developer'},
+            {'id': '3', 'name': 'Ian Clarke', 'email': 'ian@siemens.com', 'title': 'Manager'},
+        ]
+
+    def test_pipeline_single_pass(self):
+        pipeline = StatisticsPipeline()
+        pipeline.register('total_records', CountAccumulator())
+        pipeline.register('sample_records', SampleAccumulator(2))
+        pipeline.register('companies', CompanyAccumulator())
+        pipeline.register('title_counts', ValueCountAccumulator('title'))
+
+        # A generator can only be iterated once, so every statistic is updated in the same pass
+        statistics = pipeline.run(record for record in self.records)
+        self.assertEqual(statistics['total_records'], 3)
+        self.assertEqual(statistics['sample_records'], self.records[:2])
+        self.assertEqual(statistics['companies'], ['siemens', 'valeo'])
+        self.assertEqual(statistics['title_counts'], {'Manager': 2, 'Developer': 1})
+        self.logger.info("test_pipeline_single_pass: passed")
+
+    def test_custom_accumulator(self):
+        class LongestNameAccumulator(Accumulator):
+            def __init__(self):
+                self.longest = ''
+
+            def add(self, record):
+                if len(record['name']) > len(self.longest):
+                    self.longest = record['name']
+
+            def result(self):
+                return self.longest
+
+        pipeline = StatisticsPipeline()
+        pipeline.register('longest_name', LongestNameAccumulator())
+        self.assertEqual(pipeline.run(self.records), {'longest_name': 'Jane Smith'})
+        self.logger.info("test_custom_accumulator: passed")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import os
+import unittest
+from utils.resultCache import ResultCache, MISSING, get_file_signature
+import logging
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+        self.logger = logging.getLogger(__name__)
+        self.cache = ResultCache(max_entries=2)
+
+    def test_fingerprint(self):
+        self.cache.put('count', (1, 10), 10)
+        self.assertEqual(self.cache.get('count', (1, 10)), 10)
+        # An entry of another state of the table is dropped
+        self.assertIs(self.cache.get('count', (2, 11)), MISSING)
+        self.assertIs(self.cache.get('count', (1, 10)), MISSING)
+        self.assertIs(self.cache.get('missing', (1, 10)), MISSING)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 3))
+        self.logger.info("test_fingerprint: passed")
+
+    def test_eviction(self):
+        self.cache.put('a', 1, 'a')
+        self.cache.put('b', 1, 'b')
+        self.cache.get('a', 1)
+        # 'b' is the least recently used entry
+        self.cache.put('c', 1, 'c')
+        self.assertEqual(len(self.cache), 2)
+        self.assertIs(self.cache.get('b', 1), MISSING)
+        self.assertEqual(self.cache.get('a', 1), 'a')
+        self.cache.discard('a')
+        self.assertIs(self.cache.get('a', 1), MISSING)
+        self.cache.put('a', 1, 'a')
+        self.cache.clear()
+        self.assertEqual(len(self.cache), 0)
+        with self.assertRaises(ValueError):
+            ResultCache(max_entries=0)
+        self.logger.info("test_eviction: passed")
+
+    def test_copies(self):
+        # Changing a value put or got doesn't change the cached one
+        value = {'Engineer': 2}
+        self.cache.put('titles', 1, value)
+        value['Engineer'] = 3
+        self.cache.get('titles', 1)['Manager'] = 1
+        self.assertEqual(self.cache.get('titles', 1), {'Engineer': 2})
+        self.logger.info("test_copies: passed")
+
+    def test_get_file_signature(self):
+        self.assertIsNone(get_file_signature('test_signature.txt'))
+        with open('test_signature.txt', 'w') as file:
+            file.write('data')
+        signature = get_file_signature('test_signature.txt')
+        self.assertEqual(signature[:2], (os.path.abspath('test_signature.txt'), 4))
+        self.logger.info("test_get_file_signature: passed")
+
+    def tearDown(self):
+        # Delete the file created by the tests
+        if os.path.exists('test_signature.txt'):
+            os.remove('test_signature.txt')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+import os
+import unittest
+from unittest.mock import patch
+import pytest
+from utils.shardedDatabaseManager import ShardedDatabaseManager, get_shard_files
+from utils.databaseManager import DatabaseManager, JsonSink
+from utils.fileManager import FileManager
+import logging
+class TestShardedDatabaseManager(unittest.TestCase):
+    def setUp(self):
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+        self.logger = logging.getLogger(__name__)
+
+        self.db_files = get_shard_files('test_sharded.db', 3)
+        self.sharded_manager = ShardedDatabaseManager(self.db_files)
+        self.sharded_manager.create_table()
+        self.records = [(f'Name {i}', f'user{i}@{("siemens", "valeo", "we")[i % 3]}.com', f'{i:05d}',
+                         ('Engineer', 'Manager')[i % 2]) for i in range(100)]
+
+    def test_get_shard_files(self):
+        self.assertEqual(self.db_files, ['test_sharded.shard0001.db', 'test_sharded.shard0002.db',
+                                         'test_sharded.shard0003.db'])
+        self.logger.info("test_get_shard_files: passed")
+
+    def test_routing(self):
+        self.assertEqual(self.sharded_manager.bulk_insert(self.records, chunk_size=30), 100)
+        self.sharded_manager.insert_data([('Ann Lee', 'ann@we.com', '11111', 'Analyst')])
+        # Every record is in the shard given by its key, and only there
+        for index, shard in enumerate(self.sharded_manager.shards):
+            rows = [(row['name'], row['email'], row['zip_code'], row['title'])
+                    for row in shard.get_sample_records(200)]
+            self.assertTrue(rows)
+            self.assertTrue(all(self.sharded_manager.get_shard_index(row) == index for row in rows))
+        self.assertEqual(sum(shard.count_records() for shard in self.sharded_manager.shards), 101)
+        self.logger.info("test_routing: passed")
+
+    def test_aggregates(self):
+        self.sharded_manager.bulk_insert(self.records)
+        self.assertEqual(self.sharded_manager.count_records(), 100)
+        self.assertEqual(sorted(self.sharded_manager.get_companies()), ['siemens', 'valeo', 'we'])
+        self.assertEqual(self.sharded_manager.get_title_counts(), {'Engineer': 50, 'Manager': 50})
+        self.assertEqual(len(self.sharded_manager.get_sample_records(10)), 10)
+
+        # A failed shard fails the aggregate, as a failed query does on a single database
+        self.sharded_manager.shards[1].conn.execute("DROP TABLE data")
+        with self.assertLogs(level='ERROR'):
+            self.assertIsNone(self.sharded_manager.count_records())
+            self.assertIsNone(self.sharded_manager.get_sample_records(10))
+            self.assertIsNone(self.sharded_manager.get_companies())
+            self.assertIsNone(self.sharded_manager.get_title_counts())
+        self.logger.info("test_aggregates: passed")
+
+    def test_bulk_upsert(self):
+        self.sharded_manager.bulk_upsert(self.records, chunk_size=30)
+        changed = [(name, email, zip_code, 'Director') for name, email, zip_code, _ in self.records[:10]]
+        counts = self.sharded_manager.bulk_upsert(self.records + changed, chunk_size=30)
+        self.assertEqual(counts, {'inserted': 0, 'updated': 10, 'skipped': 100})
+        self.assertEqual(self.sharded_manager.get_title_counts()['Director'], 10)
+
+        # The email doesn't determine the zip code shards
+        sharded_manager = ShardedDatabaseManager(get_shard_files('test_sharded_zip.db', 2), shard_key='zip_code')
+        try:
+            with self.assertRaises(ValueError):
+                sharded_manager.bulk_upsert(self.records, key='email')
+        finally:
+            sharded_manager.close_connection()
+        self.logger.info("test_bulk_upsert: passed")
+
+    def test_single_load_per_shard(self):
+        # Every shard loads all its chunks with one call, its unique index is built once
+        with patch.object(DatabaseManager, 'bulk_upsert', autospec=True,
+                          side_effect=DatabaseManager.bulk_upsert) as mock_bulk_upsert:
+            counts = self.sharded_manager.bulk_upsert(self.records, chunk_size=10)
+        self.assertEqual(counts, {'inserted': 100, 'updated': 0, 'skipped': 0})
+        self.assertEqual(sorted(call.args[0].db_file for call in mock_bulk_upsert.call_args_list), self.db_files)
+
+        # A failed shard stops its load without blocking the others
+        self.sharded_manager.shards[0].conn.execute("DROP TABLE data")
+        self.assertIsNone(self.sharded_manager.bulk_insert(self.records, chunk_size=10))
+        other_records = 100 - len(self.sharded_manager.split(self.records)[0])
+        self.assertEqual(sum(shard.count_records() for shard in self.sharded_manager.shards[1:]), other_records * 2)
+        self.logger.info("test_single_load_per_shard: passed")
+
+    def test_export(self):
+        self.sharded_manager.bulk_insert(self.records)
+        self.assertEqual(self.sharded_manager.export_to_csv('test_sharded.csv'), 100)
+        rows = FileManager().read_csv('test_sharded.csv')
+        self.assertEqual(sorted(row['email'] for row in rows), sorted(email for _, email, _, _ in self.records))
+
+        # Kept as a partitioned output set, one file per shard
+        row_count, shard_files = self.sharded_manager.export_parallel([JsonSink('test_sharded.ndjson',
+                                                                                json_format='ndjson')],
+                                                                      merge=False)
+        self.assertEqual(row_count, 100)
+        self.assertEqual(shard_files, [[f'test_sharded.shard{index:04d}.ndjson' for index in (1, 2, 3)]])
+        self.assertEqual(sum(1 for shard_file in shard_files[0] for _ in FileManager().iter_json(shard_file)), 100)
+        self.logger.info("test_export: passed")
+
+    def test_invalid_settings(self):
+        with self.assertRaises(ValueError):
+            ShardedDatabaseManager([])
+        with self.assertRaises(ValueError):
+            ShardedDatabaseManager(self.db_files, shard_key='title')
+        self.logger.info("test_invalid_settings: passed")
+
+    def test_report(self):
+        report = pytest.importorskip('utils.report')
+        self.sharded_manager.bulk_insert(self.records)
+        generator = report.ReportGenerator('test_sharded.csv', 'test_sharded.json', 'test_sharded.pdf',
+                                           db_manager=self.sharded_manager)
+        self.assertEqual(generator.get_statistics()['title_counts'], {'Engineer': 50, 'Manager': 50})
+        # The options following the ids of a single database are rejected up front
+        for options in ({'use_cache': True}, {'include_records': True}):
+            with self.assertRaises(ValueError):
+                report.ReportGenerator('test_sharded.csv', 'test_sharded.json', 'test_sharded.pdf',
+                                       db_manager=self.sharded_manager, **options)
+        self.logger.info("test_report: passed")
+
+    def tearDown(self):
+        self.sharded_manager.close_connection()
+        # Delete the shard databases, their WAL files and the exported files, not this module
+        for path in os.listdir('.'):
+            if path.startswith(('test_sharded.', 'test_sharded_zip.')):
+                os.remove(path)
+
+
+if __name__ == "__main__":
+    unittest.main()